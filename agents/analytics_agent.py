@@ -5,14 +5,21 @@ import json
 import logging
 from typing import Dict, Any, List, Union, Optional
 from agents.gemini_agent import GeminiAgent
+from utils.query_engine import QueryEngine, result_to_markdown
+from utils.data_profiler import get_profile
+from utils.tracing import traced
 
 class DataAnalyticsAgent:
     """
     Analyzes data and uses the Gemini agent with RAG context to generate insights.
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, approximate: Optional[bool] = None):
         self.gemini_agent = GeminiAgent(api_key=api_key)
+        self.query_engine = QueryEngine()
+        # None lets the profiler switch to sketch-based statistics on very large tables
+        self.approximate = approximate
 
+    @traced("agent.analytics.analyze_data")
     def analyze_data(
         self,
         data: Union[pd.DataFrame, str],
@@ -31,11 +38,11 @@ class DataAnalyticsAgent:
             query_result_df_or_str = self._execute_dataframe_query(data, query)
 
             if isinstance(query_result_df_or_str, pd.DataFrame):
-                processed_data_summary = self._summarize_dataframe(query_result_df_or_str)
+                processed_data_summary = self._summarize_dataframe(data)
 
+                # Only the (small) query result goes into the prompt, never the full table
                 response_table = "Here are the top results from your query:\n\n"
-                markdown_result = query_result_df_or_str.to_markdown(index=False) or ""
-                response_table += markdown_result
+                response_table += result_to_markdown(query_result_df_or_str, self.query_engine.max_result_rows)
                 response_table += "\n\n"
 
                 response_from_gemini = self.gemini_agent.generate_response(
@@ -84,27 +91,48 @@ class DataAnalyticsAgent:
             "recommendations": recommendations,
         }
 
-    # --- Placeholder Methods ---
+    # --- Helper Methods ---
 
     def _execute_dataframe_query(self, df: pd.DataFrame, query: str) -> Union[pd.DataFrame, str]:
-        # Implement logic if needed, else return original df
-        return df
+        """
+        Runs the question as a validated query plan. The rule layer is tried first;
+        the LLM is only asked for a plan when no rule applies. Falls back to a small
+        preview so the prompt never contains the full table.
+        """
+        try:
+            result = self.query_engine.run(query, df)
+            if result is not None:
+                return result
+        except ValueError as e:
+            logging.warning(f"Rule-based query plan rejected: {e}")
+
+        try:
+            raw_plan = self.gemini_agent.generate_query_plan(query, self.query_engine.schema_description(df))
+            plan = self.query_engine.plan_from_dict(raw_plan, df)
+            logging.info(f"QueryEngine executing LLM plan: {plan.to_dict()}")
+            return self.query_engine.execute(plan, df)
+        except Exception as e:
+            logging.warning(f"LLM query plan unavailable, using preview rows: {e}")
+            return df.head(self.query_engine.preview_rows)
 
     def _summarize_dataframe(self, df: pd.DataFrame) -> Dict[str, Any]:
-        return {
-            "rows": len(df),
-            "columns": list(df.columns),
-            "null_counts": df.isnull().sum().to_dict()
-        }
+        return get_profile(df, approximate=self.approximate).summary()
 
     def _extract_key_insights(self, df: pd.DataFrame) -> List[str]:
-        return [f"Most common value in {col}: {df[col].mode()[0]}" for col in df.select_dtypes(include="object").columns]
+        profile = get_profile(df, approximate=self.approximate)
+        suffix = " (approximate)" if profile.approximate else ""
+        return [f"Most common value in {col}: {top}{suffix}" for col, top in profile.top_values().items()]
 
     def _calculate_data_quality(self, df: pd.DataFrame) -> Dict[str, Any]:
-        return {
-            "completeness": 1 - (df.isnull().sum().sum() / (df.shape[0] * df.shape[1])),
-            "unique_ratio": df.nunique().mean() / df.shape[0],
+        profile = get_profile(df, approximate=self.approximate)
+        quality = {
+            "completeness": profile.completeness,
+            "unique_ratio": profile.unique_ratio,
         }
+        if profile.approximate:
+            quality["approximate"] = True
+            quality["error_bounds"] = profile.error_bounds
+        return quality
 
     def _generate_recommendations(self, quality_metrics: Dict[str, Any]) -> List[str]:
         recs = []
@@ -0,0 +1,164 @@
+# agents/conversation_memory.py
+
+import logging
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from utils.column_index import get_column_index
+from utils.football_engine import get_football_analytics
+
+# Messages kept verbatim (user and assistant turns count separately), matching the
+# last-4-messages history window GeminiAgent sends with each prompt
+RECENT_MESSAGES = 4
+# Older messages are folded into the summary in batches of this size
+FOLD_BATCH = 4
+MAX_SUMMARY_CHARS = 2000
+# Most recent values kept per fact category
+MAX_FACT_VALUES = 5
+# Characters of each folded message kept by the fallback (non-LLM) summary
+EXTRACT_CHARS = 200
+# Folds of all conversations share these threads (each conversation folds one batch at a time)
+FOLD_WORKERS = 4
+
+VENUE_PATTERN = re.compile(r"\b(home|away)\b")
+
+Summarizer = Callable[[str, List[Dict[str, str]]], str]
+
+_fold_pool = ThreadPoolExecutor(max_workers=FOLD_WORKERS, thread_name_prefix="memory")
+
+
+class ConversationMemory:
+    """
+    Bounded memory for one chat session. The latest messages are kept
+    verbatim; older ones are folded, in batches and on a background thread,
+    into a running summary (by the summarizer, usually the LLM, or by a
+    simple extract if it is unavailable). Entities mentioned by the user -
+    teams, seasons, venue, columns - are tracked as structured facts. What is
+    sent with each prompt is therefore bounded no matter how long the session
+    runs.
+    """
+
+    def __init__(self, summarizer: Optional[Summarizer] = None, recent_messages: int = RECENT_MESSAGES,
+                 fold_batch: int = FOLD_BATCH, max_summary_chars: int = MAX_SUMMARY_CHARS):
+        self.summarizer = summarizer
+        self.recent_messages = recent_messages
+        self.fold_batch = fold_batch
+        self.max_summary_chars = max_summary_chars
+        self.summary = ""
+        self.facts: Dict[str, List[Any]] = {}
+        self.turns = 0
+        self._generation = 0  # bumped by clear(), so a fold in flight cannot restore old state
+        self._recent: List[Dict[str, str]] = []
+        self._pending: List[Dict[str, str]] = []
+        # The batch being folded, shown like pending messages until its summary is stored
+        self._inflight: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+        self._folding: Optional[Future] = None
+
+    # --- Recording ---
+
+    def add(self, role: str, content: str, data: Any = None):
+        """Records a message; user messages also update the facts in play."""
+        with self._lock:
+            self._recent.append({"role": role, "content": content})
+            self.turns += role == "user"
+            overflow = len(self._recent) - self.recent_messages
+            if overflow > 0:
+                self._pending.extend(self._recent[:overflow])
+                del self._recent[:overflow]
+            fold = len(self._pending) >= self.fold_batch and (self._folding is None or self._folding.done())
+            if fold:
+                batch, self._pending = self._pending, []
+                self._inflight = batch
+                self._folding = _fold_pool.submit(self._fold, batch)
+        if role == "user":
+            self._extract_facts(content, data)
+
+    def _fold(self, batch: List[Dict[str, str]]):
+        with self._lock:
+            summary, generation = self.summary, self._generation
+        try:
+            updated = self.summarizer(summary, batch) if self.summarizer else None
+        except Exception as e:
+            logging.warning(f"Conversation summarizer failed, using an extract instead: {e}")
+            updated = None
+        if not updated:
+            lines = [f"{m['role']}: {self._first_sentence(m['content'])}" for m in batch]
+            updated = "\n".join(([summary] if summary else []) + lines)
+        with self._lock:
+            if generation == self._generation:
+                self.summary = self._trim(updated)
+                self._inflight = []
+
+    def _trim(self, summary: str) -> str:
+        """Keeps the most recent part of an over-long summary, cut at a line break."""
+        if len(summary) <= self.max_summary_chars:
+            return summary
+        summary = summary[-self.max_summary_chars:]
+        return summary[summary.find("\n") + 1:] if "\n" in summary else summary
+
+    @staticmethod
+    def _first_sentence(text: str) -> str:
+        text = " ".join(text.split())
+        cut = re.search(r"(?<=[.!?])\s", text[:EXTRACT_CHARS])
+        return text[:cut.start()] if cut else text[:EXTRACT_CHARS]
+
+    def _extract_facts(self, content: str, data: Any):
+        found: Dict[str, List[Any]] = {}
+        if isinstance(data, pd.DataFrame) and not data.empty:
+            football = get_football_analytics(data)
+            if football is not None:
+                found["teams"] = football.find_teams(content)
+                found["seasons"] = football.find_seasons(content)
+            found["columns"] = get_column_index(list(data.columns)).mentioned(content, min_score=0.9)
+        found["venue"] = VENUE_PATTERN.findall(content.lower())[:1]
+        with self._lock:
+            for category, values in found.items():
+                if not values:
+                    continue
+                # Most recent first; a value mentioned again moves to the front
+                current = [v for v in self.facts.get(category, []) if v not in values]
+                self.facts[category] = (list(values) + current)[:MAX_FACT_VALUES]
+
+    # --- Reading ---
+
+    def recent(self) -> List[Dict[str, str]]:
+        """The verbatim recent messages, oldest first."""
+        with self._lock:
+            return list(self._recent)
+
+    def context(self) -> Dict[str, Any]:
+        """Summary of earlier turns and the facts in play, for the prompt context."""
+        with self._lock:
+            context: Dict[str, Any] = {}
+            earlier = self.summary
+            unfolded = self._inflight + self._pending
+            if unfolded:
+                # Messages not folded yet (or being folded) are still represented, briefly
+                earlier = self._trim("\n".join(([earlier] if earlier else []) + [
+                    f"{m['role']}: {self._first_sentence(m['content'])}" for m in unfolded]))
+            if earlier:
+                context["conversation_summary"] = earlier
+            if self.facts:
+                context["facts_in_play"] = {k: list(v) for k, v in self.facts.items()}
+            return context
+
+    def wait(self, timeout: Optional[float] = None):
+        """Blocks until a background fold in progress has finished."""
+        folding = self._folding
+        if folding is not None:
+            folding.result(timeout=timeout)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.summary = ""
+            self.facts = {}
+            self.turns = 0
+            self._recent = []
+            self._pending = []
+            self._inflight = []
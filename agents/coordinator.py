@@ -1,12 +1,24 @@
 # --- REPLACE THE ENTIRE CONTENT OF coordinator.py WITH THIS ---
 
 from .analytics_agent import DataAnalyticsAgent
-from .visualization_agent import VisualizationAgent
 from .gemini_agent import GeminiAgent  # <-- NEW
-from utils.vector_db_handler import VectorDBHandler
-from utils.db_connector import DBConnector # <-- NEW
+from .query_router import LLM_ROUTE, QueryRouter, RouteStats
+from .conversation_memory import ConversationMemory
+from .session_store import SessionState, SessionStore
+from utils.data_profiler import dataset_fingerprint, get_profile
+from utils.football_engine import get_football_analytics
+from utils.incremental import IncrementalAnalytics
+from utils.chart_recommender import recommend_charts
+from utils.query_engine import result_to_markdown
+from utils.lazy import lazy_property
+from utils.tracing import span, traced, tracer
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import logging
+import os
+import threading
+import time
 import pandas as pd
-from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated
 import operator
 
@@ -17,31 +29,116 @@ class AgentState(TypedDict):
     chat_history: list
     analysis_context: Annotated[list, operator.add]
     response: str
+    route: str
+
+# --- Context branches ---
+# Each branch gathers one kind of context in parallel with the others and is
+# abandoned (contributing nothing) once its timeout, in seconds, runs out.
+# The timeout counts from when the branch starts running, not from when it was queued.
+CONTEXT_BRANCH_TIMEOUTS = {
+    "profile_context": 2.0,
+    "row_context": 3.0,
+    "document_context": 8.0,
+    "football_context": 2.0,
+}
+# Chat requests whose branches can all run at once; the context pool is sized for them
+CONTEXT_CONCURRENT_REQUESTS = int(os.environ.get("CONTEXT_CONCURRENT_REQUESTS", 8))
+# Longest a branch waits for a free context thread before it is skipped
+CONTEXT_QUEUE_TIMEOUT = 5.0
+# Pre-rendering jobs remembered (by dataset and k), so repeated calls share one job
+MAX_PRERENDERED = 16
+# Document indexing jobs remembered (by collection), so each text is embedded once
+MAX_DOCUMENT_INDEXES = 64
+DOCUMENT_COLLECTION_PREFIX = "default"
 
 class AgentCoordinator:
     """
     Coordinates interactions between agents, using a dual RAG pipeline and a stateful graph.
+    One coordinator is shared by all users: the agents and caches it holds are
+    shared and read-only per request, while each user's dataset, document
+    collection and conversation live in a SessionState from self.sessions.
     """
     def __init__(self, gemini_api_key: str):
-        self.analytics_agent = DataAnalyticsAgent(api_key=gemini_api_key)
-        self.visualization_agent = VisualizationAgent(api_key=gemini_api_key)
-        self.gemini_agent = GeminiAgent(api_key=gemini_api_key) # <-- NEW
-        self.vector_db_handler = VectorDBHandler(api_key=gemini_api_key)
-        self.db_connector = DBConnector() # <-- NEW
-        self.active_collection = None
-
-        # --- LangGraph Workflow (Step 8) ---
-        # Note: This is a simplified conceptual graph.
-        # A full implementation would require more complex routing logic.
+        if not gemini_api_key:
+            raise ValueError("Gemini API Key is required.")
+        # Agents, clients, the DB pool and the graph are built on first use (see the
+        # lazy properties below), so constructing the coordinator is instant
+        self.api_key = gemini_api_key
+        self.sessions = SessionStore(new_memory=self.new_conversation)
+        # Warms the figure cache with suggested charts while the user is still reading
+        self._prerender_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prerender")
+        self._prerendered: "OrderedDict[tuple, Future]" = OrderedDict()
+        self._prerendered_lock = threading.Lock()
+
+        # Context branches run their work here, so a slow branch can be abandoned at its timeout
+        self.branch_timeouts = dict(CONTEXT_BRANCH_TIMEOUTS)
+        self._context_pool = ThreadPoolExecutor(max_workers=CONTEXT_CONCURRENT_REQUESTS * len(CONTEXT_BRANCH_TIMEOUTS),
+                                                thread_name_prefix="context")
+        # Indexing has its own pool: a document branch waits for it, so on the branch pool it could deadlock
+        self._indexing_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="indexing")
+        self._document_indexes: "OrderedDict[str, Future]" = OrderedDict()
+        self._document_index_lock = threading.Lock()
+
+        self.route_stats = RouteStats()
+
+    # --- Agents and resources (built on first use) ---
+
+    @lazy_property
+    def analytics_agent(self):
+        return DataAnalyticsAgent(api_key=self.api_key)
+
+    @lazy_property
+    def visualization_agent(self):
+        from .visualization_agent import VisualizationAgent  # pulls in plotly
+        return VisualizationAgent(api_key=self.api_key)
+
+    @lazy_property
+    def gemini_agent(self):
+        return GeminiAgent(api_key=self.api_key)
+
+    @lazy_property
+    def vector_db_handler(self):
+        from utils.vector_db_handler import VectorDBHandler  # pulls in chromadb and the embedding client
+        return VectorDBHandler(api_key=self.api_key)
+
+    @lazy_property
+    def db_connector(self):
+        from utils.db_connector import DBConnector
+        return DBConnector()
+
+    @lazy_property
+    def query_router(self):
+        # Questions that are exact computations are answered without the LLM
+        return QueryRouter(self.analytics_agent.query_engine)
+
+    @lazy_property
+    def graph(self):
+        """
+        The LangGraph workflow (Step 8). The router answers computable
+        questions directly. Otherwise the relevant context branches fan out
+        and run in parallel; their results are merged into analysis_context
+        by its operator.add reducer before llm_call runs.
+        """
+        from langgraph.graph import StateGraph, END
         workflow = StateGraph(AgentState)
-        workflow.add_node("rag_pipeline", self._run_rag_pipeline)
-        workflow.add_node("llm_call", self._run_llm_call)
-        workflow.set_entry_point("rag_pipeline")
-        workflow.add_edge("rag_pipeline", "llm_call")
+        workflow.add_node("route", traced("node.route")(self._run_router))
+        branches = {
+            "profile_context": self._gather_profile,
+            "row_context": self._gather_rows,
+            "document_context": self._gather_documents,
+            "football_context": self._gather_football,
+        }
+        for name, gather in branches.items():
+            workflow.add_node(name, self._context_branch(name, gather))
+            workflow.add_edge(name, "llm_call")
+        workflow.add_node("llm_call", traced("node.llm_call")(self._run_llm_call))
+        workflow.set_entry_point("route")
+        workflow.add_conditional_edges("route", self._select_context_branches,
+                                       list(branches) + ["llm_call", END])
         workflow.add_edge("llm_call", END)
-        self.graph = workflow.compile()
+        graph = workflow.compile()
         print("LangGraph workflow compiled.")
-
+        return graph
 
     def get_data_from_db(self, query: str):
         """Fetches data from the configured PostgreSQL database."""
@@ -50,43 +147,196 @@ class AgentCoordinator:
     def get_analytics_insights(self, data):
         return self.analytics_agent.analyze_data(data)
 
+    def append_data(self, data, new_rows, session: SessionState = None):
+        """
+        Appends new rows (e.g. a new matchweek) to a loaded DataFrame and returns
+        the combined frame. Partial aggregates are kept per season (in the
+        session, when given), so the profile and football tables are updated
+        from the delta only.
+        """
+        incremental = session.incremental if session is not None else None
+        if incremental is None or incremental.fingerprint != dataset_fingerprint(data):
+            incremental = IncrementalAnalytics(data)
+        combined = incremental.append(new_rows)
+        if session is not None:
+            with session.lock:
+                session.incremental = incremental
+                session.data = combined
+        return combined
+
     def generate_visualization(self, data, query):
         return self.visualization_agent.generate_chart(data, query)
 
-    def handle_chat_query(self, data, query, chat_history: list):
+    def suggest_charts(self, data, k: int = 5):
+        """Ranked chart configs for the data, scored from its cached profile (no LLM call)."""
+        return recommend_charts(data, k)
+
+    def prerender_suggestions(self, data, k: int = 3) -> Future:
+        """
+        Builds the top-k suggested charts in the background so that asking for
+        them (or for a chart without naming a type) hits the figure cache.
+        Repeated calls for the same dataset return the pending/finished job.
+        """
+        key = (dataset_fingerprint(data), k)
+        with self._prerendered_lock:
+            future = self._prerendered.get(key)
+            if future is None:
+                future = self._prerendered[key] = self._prerender_pool.submit(self._prerender, data, k)
+                while len(self._prerendered) > MAX_PRERENDERED:
+                    self._prerendered.popitem(last=False)
+            self._prerendered.move_to_end(key)
+        return future
+
+    def _prerender(self, data, k: int) -> list:
+        chart_generator = self.visualization_agent.chart_generator
+        rendered = []
+        for config in recommend_charts(data, k):
+            try:
+                chart_generator.create_chart(data, config)
+                rendered.append(config)
+            except Exception as e:
+                logging.warning(f"Pre-rendering {config.get('type')} chart failed: {e}")
+        logging.info(f"Pre-rendered {len(rendered)} suggested chart(s).")
+        return rendered
+
+    def index_document(self, text: str) -> Future:
         """
-        Handles chat queries by invoking the LangGraph workflow.
+        Embeds a document into its vector store collection in the background
+        and returns the job, whose result is the collection name (None on
+        failure). Each text is embedded once: later calls, and chat questions
+        that time out while it is indexing, share the same job. The collection
+        comes from the text itself, so concurrent sessions never share or
+        replace an "active" index.
+        """
+        collection = self.vector_db_handler.collection_name(text, DOCUMENT_COLLECTION_PREFIX)
+        with self._document_index_lock:
+            indexing = self._document_indexes.get(collection)
+            if indexing is None or (indexing.done() and (indexing.exception() is not None or indexing.result() is None)):
+                indexing = self._document_indexes[collection] = self._indexing_pool.submit(
+                    tracer.bind(self.vector_db_handler.process_text), text, collection_prefix=DOCUMENT_COLLECTION_PREFIX)
+                while len(self._document_indexes) > MAX_DOCUMENT_INDEXES:
+                    self._document_indexes.popitem(last=False)
+            self._document_indexes.move_to_end(collection)
+        return indexing
+
+    def new_conversation(self) -> ConversationMemory:
+        """Bounded memory for one chat session; older turns are summarized by the LLM in the background."""
+        # Looked up at fold time, so opening a session does not build the Gemini client
+        return ConversationMemory(summarizer=lambda summary, messages: self.gemini_agent.summarize_conversation(summary, messages))
+
+    def handle_chat_query(self, data, query, chat_history: list, memory: ConversationMemory = None,
+                          session: SessionState = None):
         """
+        Handles chat queries by invoking the LangGraph workflow. With a
+        ConversationMemory, the prompt gets its recent messages, the summary of
+        earlier ones and the facts in play instead of the raw chat history.
+        With a session, its memory is used and its document collection recorded.
+        """
+        if session is not None:
+            memory = session.memory
+            if isinstance(data, str):
+                session.collection = self.vector_db_handler.collection_name(data, DOCUMENT_COLLECTION_PREFIX)
+        analysis_context = []
+        if memory is not None:
+            memory.add("user", query, data)
+            chat_history = memory.recent()
+            analysis_context = [memory.context()] if memory.context() else []
         initial_state: AgentState = {
             "query": query,
             "data": data,
             "chat_history": chat_history,
-            "analysis_context": [],
-            "response": ""
+            "analysis_context": analysis_context,
+            "response": "",
+            "route": LLM_ROUTE
         }
-        final_state = self.graph.invoke(initial_state)
+        start = time.perf_counter()
+        with span("chat_request", query_chars=len(query), history_messages=len(chat_history)) as request:
+            final_state = self.graph.invoke(initial_state)
+            request.set(route=final_state['route'], response_chars=len(final_state['response']))
+        self.route_stats.record(final_state['route'], time.perf_counter() - start)
+        if memory is not None:
+            memory.add("assistant", final_state['response'])
         return final_state['response']
 
-    def _run_rag_pipeline(self, state: AgentState) -> dict:
-        """Node for the RAG pipeline to gather context."""
-        query = state['query']
-        data = state['data']
-        context = None
+    # --- Context gathering (parallel graph branches) ---
+
+    def _run_router(self, state: AgentState) -> dict:
+        """Entry node: answers exact computations directly (no LLM), else leaves the route as 'llm'."""
+        answer = self.query_router.route(state['query'], state['data'])
+        if answer is None:
+            return {}
+        logging.info(f"Answered on the {answer.route} fast path: {state['query']!r}")
+        return {"response": answer.answer, "route": answer.route}
 
+    def _select_context_branches(self, state: AgentState) -> list:
+        """
+        The context branches that apply to the loaded data: none once the
+        router answered, and straight to the LLM when no branch applies.
+        """
+        if state['route'] != LLM_ROUTE:
+            from langgraph.graph import END
+            return [END]
+        data = state['data']
         if isinstance(data, pd.DataFrame):
-            # Simple RAG for structured data (can be expanded)
-            try:
-                numeric_cols = data.select_dtypes(include=['number']).columns
-                context = {"data_summary": data[numeric_cols].describe().to_dict()}
-            except Exception:
-                context = {"data_summary": "Could not generate summary."}
-        elif isinstance(data, str):
-            # RAG for unstructured data
-            if self.active_collection is None:
-                self.active_collection = self.vector_db_handler.process_text(data, collection_prefix="default")
-            context = self.vector_db_handler.get_context(query)
-
-        return {"analysis_context": [context] if context else []}
+            return ["profile_context", "row_context", "football_context"]
+        if isinstance(data, str):
+            return ["document_context"]
+        return ["llm_call"]
+
+    def _context_branch(self, name: str, gather):
+        """
+        Wraps a gather function as a graph node that gives up after the branch
+        timeout, counted from when the gather starts running. A branch still
+        queued when it gives up is cancelled; one already running cannot be
+        interrupted, and finishes on its thread with its result discarded.
+        """
+        def run(started: threading.Event, query, data):
+            started.set()
+            return gather(query, data)
+
+        def node(state: AgentState) -> dict:
+            with span(f"node.{name}") as branch:
+                started = threading.Event()
+                future = self._context_pool.submit(tracer.bind(run), started, state['query'], state['data'])
+                timeout = self.branch_timeouts.get(name)
+                try:
+                    if not started.wait(timeout=CONTEXT_QUEUE_TIMEOUT):
+                        raise FutureTimeoutError()
+                    context = future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    future.cancel()
+                    waited = f"{timeout}s" if started.is_set() else f"{CONTEXT_QUEUE_TIMEOUT}s queued"
+                    logging.warning(f"Context branch {name} timed out after {waited}; skipping it.")
+                    branch.set(timed_out=True, queued=not started.is_set())
+                    return {"analysis_context": []}
+                except Exception as e:
+                    logging.warning(f"Context branch {name} failed: {e}")
+                    branch.set(error=str(e))
+                    return {"analysis_context": []}
+                return {"analysis_context": [context] if context else []}
+        return node
+
+    def _gather_profile(self, query, data):
+        # The profile is cached per dataset
+        return {"data_summary": get_profile(data).describe().to_dict()}
+
+    def _gather_rows(self, query, data):
+        # Rows/aggregates answering the question, from the rule-based planner (no LLM call)
+        query_engine = self.analytics_agent.query_engine
+        result = query_engine.run(query, data)
+        if result is None or result.empty:
+            return None
+        return {"matching_rows": result_to_markdown(result, query_engine.max_result_rows)}
+
+    def _gather_football(self, query, data):
+        # Match tables get exact, precomputed football facts for the teams/seasons asked about
+        football = get_football_analytics(data)
+        football_context = football.context_for_query(query) if football is not None else None
+        return {"football_facts": football_context} if football_context else None
+
+    def _gather_documents(self, query, data):
+        documents = self.vector_db_handler.get_context(query, self.index_document(data).result())
+        return {"documents": documents} if documents else None
 
     def _run_llm_call(self, state: AgentState) -> dict:
         """Node for calling the LLM with the gathered context."""
@@ -1,19 +1,29 @@
 # --- CREATE THIS NEW FILE ---
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from utils.lazy import lazy_property
+from utils.tracing import span
 import json
 
 class GeminiAgent:
     """
     Integrates the Google Gemini Pro model for advanced language understanding and generation.
+    LangChain and the model client are only loaded on the first call.
     """
     def __init__(self, api_key: str):
         if not api_key:
             raise ValueError("Gemini API Key is required.")
+        self.api_key = api_key
+
+    @lazy_property
+    def llm(self):
+        from langchain_google_genai import ChatGoogleGenerativeAI
         # Use the new Flash model for speed and cost-effectiveness
-        self.llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash-latest", max_tokens=512, top_k=30, top_p=0.95, temperature=0.3)
+        return ChatGoogleGenerativeAI(model="gemini-1.5-flash-latest", max_tokens=512, top_k=30, top_p=0.95, temperature=0.3)
+
+    @staticmethod
+    def _prompt(messages: list):
+        from langchain_core.prompts import ChatPromptTemplate
+        return ChatPromptTemplate.from_messages(messages)
 
     from typing import Optional
 
@@ -38,7 +48,7 @@ class GeminiAgent:
         """
 
         # Build the prompt dynamically
-        prompt_template = ChatPromptTemplate.from_messages([
+        prompt_template = self._prompt([
             ("system", system_prompt),
             # Dynamically add chat history
             *[(msg["role"], msg["content"]) for msg in (chat_history or [])[-4:]],
@@ -51,11 +61,69 @@ class GeminiAgent:
         if context:
             context_str = json.dumps(context, indent=2) if isinstance(context, (dict, list)) else str(context)
 
-        chain = prompt_template | self.llm | StrOutputParser()
-
-        response = chain.invoke({
+        response = self._invoke("gemini.generate_response", prompt_template, {
             "context": context_str,
             "query": query
         })
 
         return response
+
+    def generate_query_plan(self, query: str, schema: dict) -> dict:
+        """
+        Asks the model to translate a question into a JSON query plan.
+        The plan is untrusted and must be validated by the QueryEngine before use.
+        """
+        system_prompt = """
+        You translate questions about a table into a JSON query plan. Reply with JSON only, no prose.
+        Schema: {{"filters": [{{"column": str, "op": one of ==, !=, >, >=, <, <=, in, contains, between, "value": any}}],
+                  "group_by": [str], "aggregations": [{{"column": str, "func": one of sum, mean, median, min, max, count, nunique, std, size, "alias": str}}],
+                  "sort_by": str or null, "ascending": bool, "limit": int or null}}
+        Only use column names from the provided table schema.
+        """
+        prompt_template = self._prompt([
+            ("system", system_prompt),
+            ("user", "TABLE SCHEMA:\n{schema}\n\nQUESTION:\n{query}")
+        ])
+        raw = self._invoke("gemini.generate_query_plan", prompt_template,
+                           {"schema": json.dumps(schema), "query": query}).strip()
+        # Models sometimes wrap JSON in a markdown fence
+        raw = raw.strip("`")
+        if raw.lower().startswith("json"):
+            raw = raw[4:]
+        return json.loads(raw)
+
+    def summarize_conversation(self, summary: str, messages: list) -> str:
+        """
+        Folds older chat messages into a running conversation summary. Only the
+        previous summary and the messages being folded are sent, so the cost of
+        each update does not grow with the length of the session.
+        """
+        system_prompt = """
+        You maintain a running summary of a conversation between a user and a football data analyst.
+        Update the summary with the new messages. Keep every concrete number, team, season and conclusion
+        that a later question could refer to; drop greetings and repetition. Reply with the summary only,
+        at most 150 words.
+        """
+        prompt_template = self._prompt([
+            ("system", system_prompt),
+            ("user", "CURRENT SUMMARY:\n{summary}\n\nNEW MESSAGES:\n{messages}")
+        ])
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        return self._invoke("gemini.summarize_conversation", prompt_template,
+                            {"summary": summary or "(empty)", "messages": transcript}).strip()
+
+    def _invoke(self, span_name: str, prompt_template, variables: dict) -> str:
+        """
+        Formats the prompt and calls the model inside a tracing span that records
+        the prompt size and the token usage reported by the model.
+        """
+        with span(span_name) as call:
+            with span("gemini.build_prompt"):
+                prompt = prompt_template.invoke(variables)
+            message = self.llm.invoke(prompt)
+            usage = getattr(message, "usage_metadata", None) or {}
+            from langchain_core.output_parsers import StrOutputParser
+            response = StrOutputParser().invoke(message)
+            call.set(prompt_chars=len(prompt.to_string()), response_chars=len(response),
+                     input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+            return response
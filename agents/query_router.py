@@ -0,0 +1,433 @@
+# agents/query_router.py
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregation_cube import COUNT_COLUMN, MATCH_LEVEL, MATCH_MEASURES, get_aggregation_cube
+from utils.football_engine import get_football_analytics
+from utils.query_engine import QueryEngine, result_to_markdown
+
+# Routes reported by RouteStats
+FOOTBALL_ROUTE = "football_stats"
+TABLE_ROUTE = "table_query"
+LLM_ROUTE = "llm"
+
+# Questions that ask for a number or a ranking...
+COMPUTATION_PATTERN = re.compile(
+    r"\b(how many|how much|number of|count|total|sum|average|avg|mean|per (match|game)|"
+    r"most|fewest|least|highest|lowest|top \d+|bottom \d+)\b")
+# ...and those that want reasoning, which always go to the LLM
+EXPLANATION_PATTERN = re.compile(
+    r"\b(why|explain|describe|compare|comparison|analy[sz]e|analysis|insight|trend|predict|should|"
+    r"opinion|think|summari[sz]e|tell me about|what happened)\b")
+PER_MATCH_PATTERN = re.compile(r"\b(average|avg|mean|per (match|game))\b")
+RANKING_PATTERN = re.compile(r"\b(most|fewest|least|highest|lowest|(top|bottom) \d+)\b")
+FEWEST_PATTERN = re.compile(r"\b(fewest|least|lowest|bottom \d+)\b")
+# Conditions the cube cannot express ("matches with at least 3 goals")
+THRESHOLD_PATTERN = re.compile(r"\b(at least|at most|more than|fewer than|less than|over \d+|under \d+)\b")
+# "by season", "per team", "for each club": the word after it must be a cube dimension,
+# a measure (the ranking key) or part of a named team, or the question goes to the LLM
+GROUPING_PATTERN = re.compile(r"\b(by|per|each|every)\s+(?:each\s+|every\s+)?(\w+)")
+DIMENSION_WORDS = {
+    "team": "team", "teams": "team", "club": "team", "clubs": "team", "side": "team", "sides": "team",
+    "season": "season", "seasons": "season", "year": "season", "years": "season",
+    "venue": "venue", "venues": "venue", "result": "result", "results": "result",
+    "stage": "stage", "stages": "stage",
+}
+MATCH_WORDS = {"match", "matches", "game", "games", "fixture", "fixtures"}
+# Wording of the entity a ranking question ranks (other than teams' own names)
+RANKED_ENTITIES: List[Tuple[str, str]] = [
+    (r"\b(teams?|clubs?|sides?|who)\b", "team"),
+    (r"\b(seasons?|years?)\b", "season"),
+    (r"\b(match|matches|games?|fixtures?)\b", MATCH_LEVEL),
+]
+ROW_COUNT_PATTERN = re.compile(r"\b(rows|records|entries|matches|games)\b")
+# "How many rows are there?" with nothing else asked, answered by the table length
+TABLE_SIZE_PATTERN = re.compile(r"^how many (rows|records|entries|matches|games)"
+                                r"( are there)?( in (the|this) (table|dataset|data|file))?( are there)?\W*$")
+
+# Question wording -> cube measure, most specific first
+FOOTBALL_MEASURES: List[Tuple[str, str]] = [
+    (r"shots? on target|\bsot\b", "shots_on_target"),
+    (r"\bshots?\b", "shots"),
+    (r"\bconced(ed|e|es)\b|goals against", "goals_conceded"),
+    (r"\bgoals?\b|\bscor(e|ed|es|ing)\b", "goals"),
+    (r"\bcorners?\b", "corners"),
+    (r"\bfouls?\b", "fouls"),
+    (r"yellow cards?|\byellows\b|\bbookings?\b", "yellow_cards"),
+    (r"red cards?|\breds\b|sending offs?|sent off", "red_cards"),
+    (r"\bpoints?\b", "points"),
+]
+# Question wording -> counted match results (None counts every match)
+FOOTBALL_RESULTS: List[Tuple[str, Optional[str]]] = [
+    (r"\b(wins?|won|winning|victories)\b", "W"),
+    (r"\b(draws?|drew|drawn)\b", "D"),
+    (r"\b(lose|loses|losing|loss|losses|lost|defeats?)\b", "L"),
+    (r"\b(matches|games|played)\b", None),
+]
+RESULT_LABELS = {"W": "wins", "D": "draws", "L": "defeats", None: "matches"}
+VENUE_PATTERN = re.compile(r"\b(at home|home|away|on the road)\b")
+# Words a football question may contain besides the parts the fast path parses. Any
+# other word ("first half", "last 5", "penalties", "in 2010", "excluding", a ground's
+# name) is a qualifier the cube cannot apply, so the question goes to the LLM.
+FILLER_WORDS = {
+    "how", "what", "which", "was", "were", "is", "are", "be", "been", "did", "do", "does", "has", "have",
+    "had", "the", "a", "an", "s", "in", "of", "for", "by", "at", "on", "to", "across", "all", "there",
+    "single", "overall", "altogether",
+}
+
+
+class _Question:
+    """
+    A lower-cased question whose parsed parts are blanked out as each parser
+    takes them, so that whatever is left over can be checked at the end.
+    """
+
+    BLANK = "\0"  # neither a word character nor whitespace, so patterns never match across it
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def blank(self, start: int, end: int):
+        self.text = self.text[:start] + self.BLANK * (end - start) + self.text[end:]
+
+    def take(self, pattern) -> List[re.Match]:
+        matches = list(re.finditer(pattern, self.text))
+        for match in matches:
+            self.blank(match.start(), match.end())
+        return matches
+
+    def leftover(self) -> List[str]:
+        return [w for w in re.findall(r"[a-z0-9]+", self.text) if w not in FILLER_WORDS]
+
+
+@dataclass
+class FastAnswer:
+    route: str
+    answer: str
+    result: Any = None  # the computed value or table, for callers that want more than text
+
+
+class QueryRouter:
+    """
+    Answers questions that are pure computations over the loaded table without
+    calling the LLM. Classification is rule-based: a question must ask for a
+    number or a ranking and must not ask for reasoning. Football match tables
+    are answered from the aggregation cube (team/season/venue slices); other
+    tables from the rule-based QueryEngine when it produces an aggregate plan.
+    Anything else returns None and goes through the LLM as before.
+    """
+
+    def __init__(self, query_engine: Optional[QueryEngine] = None):
+        self.query_engine = query_engine or QueryEngine()
+
+    def route(self, query: str, data: Any) -> Optional[FastAnswer]:
+        if not isinstance(data, pd.DataFrame) or data.empty:
+            return None
+        query_lower = query.lower()
+        if EXPLANATION_PATTERN.search(query_lower) or not COMPUTATION_PATTERN.search(query_lower):
+            return None
+        try:
+            engine = get_football_analytics(data)
+            if engine is None:
+                answer = self._table_answer(query, data)
+            else:
+                # A match table the cube declined is not handed to the generic parser, which would
+                # drop the same qualifiers; only the table size is answered from it directly
+                answer = self._football_answer(query, query_lower, data, engine)
+                if answer is None and TABLE_SIZE_PATTERN.match(query_lower.strip()):
+                    answer = self._table_size(data)
+        except Exception as e:  # a fast path must never be worse than the LLM path
+            logging.warning(f"QueryRouter fast path failed, falling back to the LLM: {e}")
+            return None
+        return answer
+
+    # --- Football match tables ---
+
+    def _football_answer(self, query: str, query_lower: str, data: pd.DataFrame, engine) -> Optional[FastAnswer]:
+        """
+        Answers from the match cube only when every part of the question maps
+        onto it: a measure or counted result, team/season/venue slices, a
+        grouping by cube dimensions and, for rankings, the ranked entity
+        (team, season or match). Each of those parsers takes its words from
+        the question, and a question with any other word left over (beyond
+        FILLER_WORDS) returns None, so the LLM answers it.
+        """
+        if THRESHOLD_PATTERN.search(query_lower):
+            return None
+        # Each parser takes the words it understands; a question with words left over goes to the LLM
+        question = _Question(query_lower)
+        for start, end, _ in engine.team_mentions(query_lower) + engine.season_mentions(query_lower):
+            question.blank(start, end)
+        teams, seasons = engine.find_teams(query_lower), engine.find_seasons(query_lower)
+        if len(teams) > 1 or len(seasons) > 1:
+            return None  # head-to-head and multi-season comparisons need the LLM
+        group_by = self._grouping(question)
+        if group_by is None:
+            return None
+        per_match = bool(question.take(PER_MATCH_PATTERN))
+        ranking = bool(question.take(RANKING_PATTERN))
+        measures = {m for pattern, m in FOOTBALL_MEASURES if question.take(pattern)}
+        if "goals_conceded" in measures:
+            measures.discard("goals")  # "conceded the fewest goals"
+        if len(measures) > 1:
+            return None
+        measure = measures.pop() if measures else None
+        results = {r for pattern, r in FOOTBALL_RESULTS if question.take(pattern)}
+        counted = results - {None}
+        if len(counted) > 1:
+            return None
+        result_filter = counted.pop() if counted else None if results else ""
+        if measure is None and result_filter == "":
+            return None
+        venues = {"home" if "home" in m.group(1) else "away" for m in question.take(VENUE_PATTERN)}
+        if len(venues) > 1:
+            return None
+        venue = venues.pop() if venues else None
+        question.take(COMPUTATION_PATTERN)
+        for pattern, _ in RANKED_ENTITIES:
+            question.take(pattern)
+        if question.leftover():
+            logging.info(f"QueryRouter left {question.leftover()} unparsed; the LLM answers {query!r}.")
+            return None
+
+        filters: Dict[str, Any] = {}
+        if teams:
+            filters["team"] = teams[0]
+        if seasons:
+            filters["season"] = seasons[0]
+        if venue:
+            filters["venue"] = venue
+        if result_filter:
+            filters["result"] = result_filter  # "goals in defeats" as well as "how many defeats"
+        if any(d in filters for d in group_by):
+            return None  # "Chelsea's goals by team" names a slice and a grouping of the same dimension
+        cube = get_aggregation_cube(data)
+
+        if ranking:
+            entity = self._ranked_entity(query_lower, measure, teams, seasons)
+            if entity is None or group_by:
+                return None  # "the most goals each season" (a ranking per group) needs the LLM
+            if entity == MATCH_LEVEL:
+                return self._match_ranking(engine, filters, measure, per_match, query_lower)
+            return self._football_ranking(cube, entity, filters, measure, result_filter, per_match, query_lower)
+
+        view = cube.rollup(group_by, filters)
+        if view.empty or view[COUNT_COLUMN].sum() == 0:
+            return None
+        values, games, label = self._measure_values(view, group_by, filters, measure, result_filter, per_match)
+        scope = self._scope(teams, seasons, venue)
+        if group_by:
+            table = view[group_by].assign(**{label: values.round(2) if per_match else values})
+            if measure is not None:
+                table[COUNT_COLUMN] = games.astype(int).to_numpy()
+            heading = f"{scope}: {label} by {', '.join(group_by)}"
+            return FastAnswer(FOOTBALL_ROUTE, f"{heading}\n\n" + result_to_markdown(table), table)
+        value, games = float(values.iloc[0]), float(games.iloc[0])
+        if measure is None:
+            answer = f"{scope}: {value:,.0f} {label}."
+        elif per_match:
+            answer = f"{scope}: {value:.2f} {label} ({float(view[measure].iloc[0]):,.0f} in {games:,.0f} matches)."
+        else:
+            answer = f"{scope}: {value:,.0f} {label} ({games:,.0f} matches)."
+        return FastAnswer(FOOTBALL_ROUTE, answer, value)
+
+    @staticmethod
+    def _grouping(question: _Question) -> Optional[List[str]]:
+        """
+        The cube dimensions a question groups by ("by season", "each team"),
+        taking those clauses from it, or None when a "by/per/each" clause
+        names something the cube does not have ("by player", "each match").
+        Team and season names must already be blanked out.
+        """
+        group_by: List[str] = []
+        for match in list(GROUPING_PATTERN.finditer(question.text)):
+            preposition, word = match.groups()
+            if word in DIMENSION_WORDS:
+                if DIMENSION_WORDS[word] not in group_by:
+                    group_by.append(DIMENSION_WORDS[word])
+                question.blank(match.start(), match.end())
+            elif word in MATCH_WORDS and preposition == "per":
+                continue  # "per match" asks for an average
+            elif preposition == "by" and any(re.search(p, word) for p, _ in FOOTBALL_MEASURES):
+                continue  # "top 5 teams by goals"
+            else:
+                return None
+        return group_by
+
+    @staticmethod
+    def _ranked_entity(query_lower: str, measure: Optional[str], teams: List[str], seasons: List[str]) -> Optional[str]:
+        """
+        What a ranking question ranks: teams, seasons or single matches. A
+        dimension the question already fixes ("in 2004/05") is not ranked, and
+        "matches" is the counted unit, not the entity, in "the most wins/matches".
+        None if that leaves no entity or more than one.
+        """
+        text = PER_MATCH_PATTERN.sub(" ", query_lower)
+        entities = {entity for pattern, entity in RANKED_ENTITIES if re.search(pattern, text)}
+        if teams:
+            entities.discard("team")
+        if seasons:
+            entities.discard("season")
+        if measure is None:
+            entities.discard(MATCH_LEVEL)
+        return entities.pop() if len(entities) == 1 else None
+
+    @staticmethod
+    def _measure_values(view: pd.DataFrame, group_by: List[str], filters: Dict[str, Any], measure: Optional[str],
+                        result_filter: Optional[str], per_match: bool) -> Tuple[pd.Series, pd.Series, str]:
+        """The asked-for value of each cube row, its number of matches, and a label for it."""
+        # Facts are team-matches: unless a team, venue or W/L result singles out one side
+        # (or the rows are per team), every game appears twice
+        one_side = "team" in filters or "venue" in filters or result_filter in ("W", "L") or \
+            any(d in group_by for d in ("team", "venue", "result"))
+        games = view[COUNT_COLUMN] if one_side else view[COUNT_COLUMN] / 2
+        if measure is None:
+            return games, games, RESULT_LABELS[result_filter]
+        label = measure.replace("_", " ")
+        if per_match:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return view[measure] / games.where(games > 0), games, label + " per match"
+        return view[measure], games, label
+
+    def _football_ranking(self, cube, entity, filters, measure, result_filter, per_match, query_lower) -> Optional[FastAnswer]:
+        view = cube.rollup([entity], filters)
+        if view.empty:
+            return None
+        values, games, label = self._measure_values(view, [entity], filters, measure, result_filter, per_match)
+        table = pd.DataFrame({entity: view[entity], label: values, COUNT_COLUMN: games.astype(int)}).dropna()
+        fewest = bool(FEWEST_PATTERN.search(query_lower))
+        top_k = re.search(r"\b(top|bottom)\s+(\d+)\b", query_lower)
+        k = int(top_k.group(2)) if top_k else 1
+        ranked = (table.nsmallest if fewest else table.nlargest)(k, label)
+        if ranked.empty:
+            return None
+        heading = f"{'Fewest' if fewest else 'Most'} {label}"
+        if "team" in filters:
+            heading += f" for {filters['team']}"
+        if filters.get("venue"):
+            heading += f" ({filters['venue']})"
+        heading += f" in {filters['season']}" if "season" in filters else " across all seasons"
+        if k == 1:
+            row = ranked.iloc[0]
+            shown = f"{row[label]:.2f}" if per_match else f"{row[label]:,.0f}"
+            played = f", {row[COUNT_COLUMN]} matches" if measure is not None else ""
+            answer = f"{heading}: {row[entity]} ({shown}{played})."
+        else:
+            answer = f"{heading}:\n\n" + result_to_markdown(ranked)
+        return FastAnswer(FOOTBALL_ROUTE, answer, ranked)
+
+    def _match_ranking(self, engine, filters, measure, per_match, query_lower) -> Optional[FastAnswer]:
+        """
+        "Most goals in a single match": single matches ranked by the measure of
+        both sides together, or of the named team's side.
+        """
+        column = MATCH_MEASURES.get(measure, "")
+        if not column.endswith("_for") or per_match or "result" in filters:
+            return None  # points, goals conceded and averages are not match totals
+        facts = engine.team_matches
+        if "team" in filters:
+            mask = facts["team"].to_numpy() == filters["team"]
+            if "venue" in filters:
+                mask &= facts["venue"].to_numpy() == filters["venue"]
+            values = facts[column]
+        else:
+            if "venue" in filters:
+                return None
+            mask = facts["venue"].to_numpy() == "home"  # one row per match
+            values = facts[column] + facts[column[:-len("_for")] + "_against"]
+        if "season" in filters:
+            mask &= facts["season"].to_numpy() == filters["season"]
+        label = measure.replace("_", " ")
+        matches = facts.loc[mask, ["date", "season", "team", "opponent", "goals_for", "goals_against"]].assign(
+            **{label: values[mask]}).dropna(subset=[label])
+        if matches.empty:
+            return None
+        fewest = bool(FEWEST_PATTERN.search(query_lower))
+        top_k = re.search(r"\b(top|bottom)\s+(\d+)\b", query_lower)
+        k = int(top_k.group(2)) if top_k else 1
+        ranked = (matches.nsmallest if fewest else matches.nlargest)(k, label)
+        heading = f"{'Fewest' if fewest else 'Most'} {label} in a match"
+        if "team" in filters:
+            heading += f" for {filters['team']}" + (f" ({filters['venue']})" if "venue" in filters else "")
+        heading += f" in {filters['season']}" if "season" in filters else " across all seasons"
+        if k == 1:
+            row = ranked.iloc[0]
+            answer = (f"{heading}: {row['team']} {row['goals_for']:.0f}-{row['goals_against']:.0f} {row['opponent']} "
+                      f"on {row['date']:%Y-%m-%d} ({row[label]:,.0f} {label}).")
+        else:
+            answer = f"{heading}:\n\n" + result_to_markdown(ranked)
+        return FastAnswer(FOOTBALL_ROUTE, answer, ranked)
+
+    @staticmethod
+    def _scope(teams: List[str], seasons: List[str], venue: Optional[str]) -> str:
+        scope = teams[0] if teams else "All teams"
+        if venue:
+            scope += f" ({venue})"
+        return scope + (f" in {seasons[0]}" if seasons else " across all seasons")
+
+    # --- Other tables ---
+
+    @staticmethod
+    def _table_size(data: pd.DataFrame) -> FastAnswer:
+        return FastAnswer(TABLE_ROUTE, f"The table has {len(data):,} rows.", len(data))
+
+    def _table_answer(self, query: str, data: pd.DataFrame) -> Optional[FastAnswer]:
+        counts_rows = bool(ROW_COUNT_PATTERN.search(query.lower()))
+        plan = self.query_engine.parse(query, data)
+        if plan is None and TABLE_SIZE_PATTERN.match(query.lower().strip()):
+            return self._table_size(data)
+        # Only aggregate plans are exact answers; row previews still need the LLM
+        if plan is None or not plan.aggregations:
+            return None
+        if not counts_rows and all(a["func"] == "size" for a in plan.aggregations):
+            return None  # "how many goals ..." counted as rows would be wrong
+        result = self.query_engine.execute(plan, data)
+        if result.empty:
+            return None
+        if result.shape == (1, 1):
+            value = result.iloc[0, 0]
+            shown = f"{value:,.2f}" if isinstance(value, (float, np.floating)) else f"{value:,}" \
+                if isinstance(value, (int, np.integer)) else str(value)
+            return FastAnswer(TABLE_ROUTE, f"{result.columns[0]}: {shown}", value)
+        return FastAnswer(TABLE_ROUTE, result_to_markdown(result, self.query_engine.max_result_rows), result)
+
+
+class RouteStats:
+    """Per-route request counts and latencies (thread-safe), for reporting the fast-path hit rate."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._latencies: Dict[str, List[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, seconds: float):
+        with self._lock:
+            self._counts[route] = self._counts.get(route, 0) + 1
+            latencies = self._latencies.setdefault(route, [])
+            latencies.append(seconds)
+            if len(latencies) > self.window:
+                del latencies[:len(latencies) - self.window]
+
+    def summary(self) -> pd.DataFrame:
+        """One row per route: requests, share of all requests, mean and p95 latency (ms)."""
+        with self._lock:
+            counts = dict(self._counts)
+            latencies = {route: np.array(values) for route, values in self._latencies.items()}
+        total = sum(counts.values())
+        rows = [{
+            "route": route,
+            "requests": count,
+            "share": count / total,
+            "mean_ms": float(latencies[route].mean() * 1000),
+            "p95_ms": float(np.percentile(latencies[route], 95) * 1000),
+        } for route, count in sorted(counts.items())]
+        return pd.DataFrame(rows, columns=["route", "requests", "share", "mean_ms", "p95_ms"])
+
@@ -0,0 +1,100 @@
+# agents/session_store.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .conversation_memory import ConversationMemory
+
+# Sessions idle for longer than this (seconds) are dropped
+SESSION_IDLE_TIMEOUT = 30 * 60
+# Hard cap; the least recently used session is dropped beyond it
+MAX_SESSIONS = 1000
+# Idle sessions are looked for at most this often (seconds), on access
+SWEEP_INTERVAL = 60
+
+
+@dataclass
+class SessionState:
+    """
+    Everything that belongs to one user session. The agents, caches and
+    connection pools of the coordinator are shared and hold no per-user state.
+    """
+    session_id: str
+    memory: ConversationMemory
+    data: Any = None
+    collection: Optional[str] = None  # vector store collection of the session's document
+    incremental: Any = None  # IncrementalAnalytics of the session's table, once rows are appended
+    last_seen: float = field(default_factory=time.monotonic)
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def set_data(self, data: Any):
+        """Switches the active dataset; the conversation and per-dataset handles start over."""
+        with self.lock:
+            self.data = data
+            self.collection = None
+            self.incremental = None
+            self.memory.clear()
+
+
+class SessionStore:
+    """
+    Session-scoped state, keyed by session id, with idle-timeout and LRU
+    eviction. Lookups are O(1); idle sessions are swept from the LRU end on
+    access (at most every SWEEP_INTERVAL seconds), so no background thread
+    is needed and memory stays bounded with hundreds of sessions.
+    """
+
+    def __init__(self, new_memory: Callable[[], ConversationMemory], idle_timeout: float = SESSION_IDLE_TIMEOUT,
+                 max_sessions: int = MAX_SESSIONS, sweep_interval: float = SWEEP_INTERVAL):
+        self.new_memory = new_memory
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def get(self, session_id: str) -> SessionState:
+        """The session's state, created on first use; marks the session as active."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = SessionState(session_id, memory=self.new_memory())
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = now
+            evicted = self._evict(now)
+        if evicted:
+            logging.info(f"Evicted {evicted} idle session(s); {len(self._sessions)} active.")
+        return session
+
+    def close(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict(self, now: float) -> int:
+        evicted = 0
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            evicted += 1
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            # Sessions are in last-access order, so the idle ones are at the front
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if now - oldest.last_seen < self.idle_timeout:
+                    break
+                self._sessions.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
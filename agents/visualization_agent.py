@@ -3,6 +3,10 @@ import numpy as np
 from typing import Any, Dict, List, Tuple, Union
 from agents.gemini_agent import GeminiAgent  # Ensure this file is in the same directory
 from utils.chart_generator import ChartGenerator  # Reuse chart logic
+from utils.chart_recommender import recommend_charts
+from utils.data_profiler import get_profile
+from utils.column_index import MIN_MATCH_SCORE, STRICT_MATCH_SCORE, get_column_index
+from utils.tracing import traced
 import logging
 
 # Configure logging
@@ -24,6 +28,7 @@ class VisualizationAgent:
         self.chart_generator = ChartGenerator()
         logging.info("VisualizationAgent initialized.")
 
+    @traced("agent.visualization.generate_chart")
     def generate_chart(self, data: Union[pd.DataFrame, str, None], query: str, context: Any = None, chat_history: List[Dict[str, str]] = []) -> Tuple[Any, str]:
         """
         Generates a chart based on the query and data. If data is a DataFrame,
@@ -126,26 +131,30 @@ class VisualizationAgent:
             chart_type = "bar"
         logging.debug(f"Initial determined chart type: {chart_type} from query: {query}")
 
-        columns = data.columns.tolist()
-        numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-        categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
+        profile = get_profile(data)
+        columns = list(profile.columns)
+        numeric_cols = profile.numeric_columns
+        categorical_cols = profile.categorical_columns
 
         x_col, y_col, names_col, values_col = None, None, None, None # Initialize all
         chart_title = ""
         reason = None
 
-        # Helper to find column by name, prioritizing exact then case-insensitive match from query
-        def find_col_in_query(query_text_lower, col_list):
-            for c in col_list:
-                if c.lower() in query_text_lower: # Check if column name (or part of it) is in query
-                    return c
-            return None
+        # Resolves column mentions (normalized names, synonyms, typos) via an index built once per schema
+        column_index = get_column_index(columns)
+
+        # Query words already resolved to a column, so one mention never fills two roles
+        used_positions = set()
+
+        def find_col_in_query(query_text, col_list, exclude=(), min_score=MIN_MATCH_SCORE):
+            return column_index.best(query_text, candidates=col_list, exclude=exclude,
+                                     used_positions=used_positions, min_score=min_score)
 
         # --- Intelligent Column Selection based on Chart Type ---
         if chart_type in ["bar", "line", "scatter", "area", "box", "violin"]:
             # Attempt to find columns from query
-            x_col = find_col_in_query(query_lower, columns)
-            y_col = find_col_in_query(query_lower, numeric_cols) # Prefer numeric for Y
+            y_col = find_col_in_query(query, numeric_cols) # Prefer numeric for Y
+            x_col = find_col_in_query(query, columns, exclude=[y_col] if y_col else [])
 
             # Fallback if not found in query
             if x_col is None and columns: x_col = columns[0]
@@ -161,7 +170,7 @@ class VisualizationAgent:
             chart_title = f"{chart_type.capitalize()} of {y_col} by {x_col}"
 
         elif chart_type == "histogram":
-            x_col = find_col_in_query(query_lower, numeric_cols)
+            x_col = find_col_in_query(query, numeric_cols)
             if x_col is None and numeric_cols: x_col = numeric_cols[0] # Fallback to first numeric column
 
             if not x_col:
@@ -173,12 +182,12 @@ class VisualizationAgent:
             chart_title = f"Distribution of {x_col}"
 
         elif chart_type in ["pie", "sunburst"]:
-            names_col = find_col_in_query(query_lower, categorical_cols)
+            names_col = find_col_in_query(query, categorical_cols)
             if names_col is None and categorical_cols: names_col = categorical_cols[0]
             elif names_col is None and columns: names_col = columns[0] # Fallback to first available if no categorical
 
-            # Check for explicit values column in query
-            values_col = find_col_in_query(query_lower, numeric_cols)
+            # Check for explicit values column in query (optional, so only a close match counts)
+            values_col = find_col_in_query(query, numeric_cols, min_score=STRICT_MATCH_SCORE)
 
             if not names_col:
                 reason = f"{chart_type} chart requires a column for categories/names. Could not identify one."
@@ -200,23 +209,17 @@ class VisualizationAgent:
         # If no specific chart type was determined or columns couldn't be found for the chosen type,
         # fallback to a default or return "none"
         if chart_type is None:
-            # If no chart type was explicitly requested, try to suggest a bar chart if columns are suitable
-            if categorical_cols and numeric_cols:
-                chart_type = "bar"
-                x_col = categorical_cols[0]
-                y_col = numeric_cols[0]
-                chart_title = f"Default Bar Chart: {y_col} by {x_col}"
-            elif numeric_cols: # If only numeric, suggest histogram
-                chart_type = "histogram"
-                x_col = numeric_cols[0]
-                chart_title = f"Default Histogram: Distribution of {x_col}"
-            elif categorical_cols: # If only categorical, suggest pie chart
-                chart_type = "pie"
-                names_col = categorical_cols[0]
-                chart_title = f"Default Pie Chart: Proportion by {names_col}"
-            else:
-                reason = "Could not infer a suitable chart type or columns from your query and data. Please be more specific."
-                return {"type": "none", "title": "No Suitable Chart Found", "reason": reason}
+            # No chart type requested: take the highest-ranked suggestion for this data, among
+            # those using a column the query mentions. Returned as-is so it shares the figure
+            # cache entry warmed by pre-rendering.
+            mentioned = column_index.mentioned(query, min_score=0.6)
+            suggestions = recommend_charts(data, k=1, columns=mentioned) if mentioned else []
+            if not suggestions:
+                suggestions = recommend_charts(data, k=1)
+            if suggestions:
+                return {**suggestions[0], "reason": None}
+            reason = "Could not infer a suitable chart type or columns from your query and data. Please be more specific."
+            return {"type": "none", "title": "No Suitable Chart Found", "reason": reason}
 
         # Final construction of chart_config_output
         chart_config_output = {
@@ -0,0 +1,323 @@
+# api_server.py
+#
+# Headless HTTP service around AgentCoordinator, for dashboards and bots.
+# Run with:  GEMINI_API_KEY=... uvicorn api_server:app --port 8000
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from agents.coordinator import AgentCoordinator
+from utils.data_profiler import dataset_fingerprint
+from utils.file_processor import FileProcessor
+
+# Pandas/plotly work runs on one thread per core; LLM and DB calls, which mostly
+# wait on the network, on a larger pool
+CPU_WORKERS = int(os.environ.get("API_CPU_WORKERS", os.cpu_count() or 4))
+IO_WORKERS = int(os.environ.get("API_IO_WORKERS", 32))
+# Requests processed at once; further requests wait in a bounded queue and are
+# turned away with 503 when it is full or they have waited too long
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("API_MAX_CONCURRENT", CPU_WORKERS + IO_WORKERS))
+MAX_QUEUED_REQUESTS = int(os.environ.get("API_MAX_QUEUED", 256))
+QUEUE_TIMEOUT = float(os.environ.get("API_QUEUE_TIMEOUT", 30))
+
+MAX_DATASETS = 16
+# Named database sources, as offered by the app (the API never runs client SQL)
+DB_SOURCES = {
+    "epl": "SELECT * FROM epl_match",
+    "ucl": "SELECT * FROM ucl_matches",
+}
+
+
+class AdmissionQueue:
+    """
+    Bounds the requests being processed and the requests waiting for a slot.
+    A request that finds the queue full, or waits longer than the timeout, is
+    rejected with 503 and a Retry-After header instead of piling up.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    @asynccontextmanager
+    async def slot(self):
+        if not self._slots.locked():
+            await self._slots.acquire()  # a free slot is taken without suspending
+        else:
+            if self.waiting >= self.max_queued:
+                self.rejected += 1
+                raise HTTPException(503, "Server is busy, retry later.", headers={"Retry-After": "1"})
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise HTTPException(503, "Timed out waiting for a worker, retry later.", headers={"Retry-After": "5"})
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+
+class LRUStore:
+    """A small thread-safe LRU map of the loaded datasets (shared, read-only, by content fingerprint)."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# --- Request models ---
+
+class DatabaseLoad(BaseModel):
+    source: str
+
+
+class QueryRequest(BaseModel):
+    dataset_id: str
+    query: str
+
+
+class ChartRequest(BaseModel):
+    dataset_id: str
+    config: Dict[str, Any]
+
+
+class ChatRequest(BaseModel):
+    dataset_id: str
+    query: str
+    session_id: Optional[str] = None
+
+
+# --- Service state ---
+
+class _State:
+    coordinator: AgentCoordinator = None
+    cpu_pool: ThreadPoolExecutor = None
+    io_pool: ThreadPoolExecutor = None
+    admission: AdmissionQueue = None
+    datasets = LRUStore(MAX_DATASETS)
+
+
+state = _State()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("Set GEMINI_API_KEY to start the API server.")
+    state.coordinator = AgentCoordinator(gemini_api_key=api_key)
+    state.cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="api-cpu")
+    state.io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="api-io")
+    state.admission = AdmissionQueue(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, QUEUE_TIMEOUT)
+    logging.info(f"API server ready: {CPU_WORKERS} CPU workers, {IO_WORKERS} I/O workers, "
+                 f"{MAX_CONCURRENT_REQUESTS} concurrent / {MAX_QUEUED_REQUESTS} queued requests.")
+    yield
+    state.cpu_pool.shutdown(wait=False, cancel_futures=True)
+    state.io_pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="Football Analytics Agent API", lifespan=lifespan)
+
+
+async def run_cpu(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(state.cpu_pool, func, *args)
+
+
+async def run_io(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(state.io_pool, func, *args)
+
+
+def _dataset(dataset_id: str) -> Any:
+    data = state.datasets.get(dataset_id)
+    if data is None:
+        raise HTTPException(404, f"Unknown dataset '{dataset_id}'; load it first.")
+    return data
+
+
+def _register(data: Any) -> Dict[str, Any]:
+    """Stores a loaded dataset under its content fingerprint (reloading the same data reuses the id)."""
+    if isinstance(data, pd.DataFrame):
+        dataset_id = dataset_fingerprint(data)
+    else:
+        dataset_id = hashlib.blake2b(str(data).encode("utf-8"), digest_size=16).hexdigest()
+    state.datasets.put(dataset_id, data)
+    return {"dataset_id": dataset_id, **_describe(data)}
+
+
+def _describe(data: Any) -> Dict[str, Any]:
+    if isinstance(data, pd.DataFrame):
+        return {"kind": "table", "rows": len(data), "columns": [str(c) for c in data.columns]}
+    return {"kind": "text", "characters": len(str(data))}
+
+
+def _to_jsonable(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict(orient="records")
+    return str(value)
+
+
+def _json(payload: Any) -> Response:
+    # Agent results contain numpy scalars and frames, which FastAPI's encoder rejects
+    return Response(json.dumps(payload, default=_to_jsonable), media_type="application/json")
+
+
+# --- Endpoints ---
+
+@app.get("/health")
+async def health():
+    admission = state.admission
+    return {
+        "active_requests": admission.active,
+        "queued_requests": admission.waiting,
+        "rejected_requests": admission.rejected,
+        "datasets": len(state.datasets),
+        "sessions": len(state.coordinator.sessions),
+    }
+
+
+@app.post("/datasets")
+async def load_file(file: UploadFile = File(...)):
+    """Loads an uploaded CSV, DOCX or PDF file; returns its dataset id."""
+    content = await file.read()
+    upload = io.BytesIO(content)
+    upload.name = file.filename or "upload.csv"
+    upload.size = len(content)
+    async with state.admission.slot():
+        try:
+            data = await run_cpu(FileProcessor().process, upload)
+        except Exception as e:
+            raise HTTPException(400, str(e))
+        return await run_cpu(_register, data)
+
+
+@app.post("/datasets/db")
+async def load_database(request: DatabaseLoad):
+    """Loads one of the named database sources (see DB_SOURCES); returns its dataset id."""
+    if request.source not in DB_SOURCES:
+        raise HTTPException(400, f"Unknown source '{request.source}'; choose one of {sorted(DB_SOURCES)}.")
+    async with state.admission.slot():
+        data = await run_io(state.coordinator.get_data_from_db, DB_SOURCES[request.source])
+        return await run_cpu(_register, data)
+
+
+@app.get("/datasets/{dataset_id}")
+async def describe_dataset(dataset_id: str):
+    return {"dataset_id": dataset_id, **_describe(_dataset(dataset_id))}
+
+
+@app.get("/datasets/{dataset_id}/suggestions")
+async def suggest_charts(dataset_id: str, k: int = 5):
+    """Ranked chart configs for the dataset (no LLM call)."""
+    data = _dataset(dataset_id)
+    async with state.admission.slot():
+        return _json(await run_cpu(state.coordinator.suggest_charts, data, k))
+
+
+@app.post("/analyze")
+async def analyze(request: QueryRequest):
+    data = _dataset(request.dataset_id)
+    async with state.admission.slot():
+        # Pandas work and the LLM explanation are interleaved inside the agent, so it runs on the I/O pool
+        result = await run_io(state.coordinator.analytics_agent.analyze_data, data, request.query)
+        return _json(result)
+
+
+@app.post("/visualize")
+async def visualize(request: QueryRequest):
+    """Builds the chart a question asks for (as Plotly JSON, null if none fits) and explains it."""
+    data = _dataset(request.dataset_id)
+    if not isinstance(data, pd.DataFrame):
+        raise HTTPException(400, "Charts need a tabular dataset.")
+    async with state.admission.slot():
+        # Mostly waiting on the LLM's explanation, so it runs on the I/O pool
+        figure, explanation = await run_io(state.coordinator.generate_visualization, data, request.query)
+        # The figure's JSON is spliced in as-is rather than parsed and serialized again
+        body = f'{{"figure": {figure.to_json() if figure is not None else "null"}, "explanation": {json.dumps(explanation)}}}'
+        return Response(body, media_type="application/json")
+
+
+@app.post("/charts")
+async def build_chart(request: ChartRequest):
+    """Builds a chart from an explicit config (as used by the app and the suggestions endpoint)."""
+    data = _dataset(request.dataset_id)
+    if not isinstance(data, pd.DataFrame):
+        raise HTTPException(400, "Charts need a tabular dataset.")
+    async with state.admission.slot():
+        figure = await run_cpu(state.coordinator.visualization_agent.chart_generator.create_chart, data, request.config)
+        return Response(figure.to_json(), media_type="application/json")
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest):
+    """
+    Answers a chat question. Pass the returned session_id with follow-up
+    questions to keep the conversation's memory. A session answers one
+    question at a time; a question sent while another is in flight gets 409.
+    """
+    data = _dataset(request.dataset_id)
+    session_id = request.session_id or uuid.uuid4().hex
+    session = state.coordinator.sessions.get(session_id)
+
+    def answer_question():
+        # Taken on the worker thread: the lock is reentrant, so the event loop thread would always get it
+        if not session.lock.acquire(blocking=False):
+            raise HTTPException(409, "This session is still answering a question; retry when it has finished.")
+        try:
+            if session.data is not data:
+                session.set_data(data)  # a session follows one dataset; switching starts a new conversation
+            return state.coordinator.handle_chat_query(data, request.query, [], session=session)
+        finally:
+            session.lock.release()
+
+    async with state.admission.slot():
+        answer = await run_io(answer_question)
+        return {"session_id": session_id, "answer": answer}
@@ -1,11 +1,15 @@
 # --- REPLACE THE ENTIRE CONTENT OF app.py WITH THIS ---
 
 import streamlit as st
+import uuid
 import pandas as pd
 from agents.coordinator import AgentCoordinator
 from utils.file_processor import FileProcessor
-from ydata_profiling import ProfileReport
-from streamlit_pandas_profiling import st_profile_report
+from utils.data_profiler import get_profile
+from utils.aggregation_cube import DEFAULT_DRILL_PATH, MATCH_LEVEL, get_aggregation_cube
+from utils.job_queue import CANCELLED, FAILED, get_job_queue
+from utils.metadata_report import get_metadata_reports
+from utils.tracing import tracer
 
 # --- Page Configuration & Styling ---
 st.set_page_config(
@@ -91,8 +95,110 @@ if 'data' not in st.session_state:
     st.session_state.data = None
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
-if 'analysis_results' not in st.session_state:
-    st.session_state.analysis_results = None
+if 'report_charts' not in st.session_state:
+    st.session_state.report_charts = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+# The coordinator is shared by all users; this user's dataset handles and conversation memory
+# live in its session store (and are evicted once the session has been idle for a while)
+session = coordinator.sessions.get(st.session_state.session_id)
+# Only the display keeps old messages; the prompt uses the bounded conversation memory
+MAX_DISPLAYED_MESSAGES = 200
+
+# --- Metadata Report ---
+def metadata_report_panel(data):
+    """
+    The Metadata Analysis tab. The report is built by a background worker
+    process and cached, so revisits (from any session) show it at once.
+    """
+    reports = get_metadata_reports()
+    html = reports.cached(data)
+    if html is not None:
+        import streamlit.components.v1 as components
+        components.html(html, height=900, scrolling=True)
+        return
+    job = reports.job(data)
+    if job is not None and job.stage != "Failed":
+        metadata_report_progress(data)
+        return
+    if job is not None:
+        st.error(f"The report could not be generated: {job.future.exception()}")
+    if st.button("Generate Metadata Report", type="primary"):
+        reports.submit(data)
+        st.rerun()
+    else:
+        st.info("Click the button to generate a detailed metadata and statistical report.")
+
+@st.fragment(run_every=1.0)
+def metadata_report_progress(data):
+    """Polls the running report job once a second without rerunning the rest of the page."""
+    job = get_metadata_reports().job(data)
+    if job is None or job.future.done():
+        st.rerun()  # the whole page, which then shows the report (or the error)
+    st.progress(job.progress, text=f"{job.stage}...")
+    if job.sampled:
+        st.caption(f"Profiling a sample of {job.sampled_rows:,} of {job.total_rows:,} rows.")
+    st.caption("The report is built in the background; you can keep using the other tabs.")
+
+# --- Background Jobs ---
+# Long-running work runs on the shared job queue instead of inline under a spinner, so a
+# rerun or tab switch neither cancels nor restarts it; the page polls the job instead.
+# Identical work (same kind and inputs) joins the running job or reuses its result.
+jobs = get_job_queue()
+
+def start_job(name, kind, func, *args):
+    """Submits func(job, *args) and remembers it as this session's `name` job."""
+    job = jobs.submit(kind, func, *args, subscriber=st.session_state.session_id)
+    st.session_state.setdefault("jobs", {})[name] = job.id
+
+def session_job(name):
+    job_id = st.session_state.get("jobs", {}).get(name)
+    return jobs.get(job_id) if job_id else None
+
+def job_panel(name, label):
+    """Shows the session's `name` job: progress while it runs, then any error. Returns its result once done."""
+    job = session_job(name)
+    if job is None:
+        return None
+    if not job.done:
+        job_progress(name, label)
+    elif job.status == FAILED:
+        st.error(f"{label} failed: {job.error}")
+    elif job.status == CANCELLED:
+        st.info(f"{label} was cancelled.")
+    return job.result
+
+@st.fragment(run_every=1.0)
+def job_progress(name, label):
+    """Polls a running job once a second without rerunning the rest of the page."""
+    job = session_job(name)
+    if job is None or job.done:
+        st.rerun()  # the whole page, which then shows the result (or the error)
+    st.progress(job.progress, text=f"{label}: {job.stage}...")
+    if st.button("Cancel", key=f"cancel_{name}"):
+        jobs.cancel(job.id, subscriber=st.session_state.session_id)  # other sessions waiting for it keep it running
+        st.session_state.jobs.pop(name, None)
+        st.rerun()
+
+def run_analytics(job, data):
+    job.progress(0.1, "Analytics agent is processing your data")
+    return coordinator.get_analytics_insights(data)
+
+def index_document(job, text):
+    job.progress(0.1, "Embedding document chunks")
+    # Shares the coordinator's indexing job, which chat questions on the document also wait for
+    collection = coordinator.index_document(text).result()
+    if collection is None:
+        raise RuntimeError("the document could not be indexed (see the logs)")
+    return collection
+
+def export_report(job, figures, export_format):
+    job.progress(0.1, f"Rendering {len(figures)} charts")
+    generator = coordinator.visualization_agent.chart_generator
+    if export_format == "Multi-page PDF":
+        return "report.pdf", generator.export_charts(figures, archive='pdf')
+    fmt = export_format.split()[0].lower()
+    return "report.zip", generator.export_charts(figures, [fmt])
 
 # --- Sidebar ---
 with st.sidebar:
@@ -110,6 +216,8 @@ with st.sidebar:
             with st.spinner("Loading EPL match data from database..."):
                 st.session_state.data = coordinator.get_data_from_db("SELECT * FROM epl_match")
                 st.session_state.chat_history = []
+                st.session_state.loaded_file_id = None
+                session.set_data(st.session_state.data)
                 data_loaded = True
 
     elif data_source == "UCL Match Data":
@@ -117,6 +225,8 @@ with st.sidebar:
             with st.spinner("Loading UCL match data from database..."):
                 st.session_state.data = coordinator.get_data_from_db("SELECT * FROM ucl_matches")
                 st.session_state.chat_history = []
+                st.session_state.loaded_file_id = None
+                session.set_data(st.session_state.data)
                 data_loaded = True
 
     elif data_source == "Upload a Custom File":
@@ -125,15 +235,22 @@ with st.sidebar:
             type=['csv', 'doc', 'docx', 'pdf'],
             help="Upload match data, player stats, or scouting reports."
         )
-        if uploaded_file:
+        # Only a newly uploaded file resets the conversation, not every rerun with the file still selected
+        if uploaded_file and uploaded_file.file_id != st.session_state.get('loaded_file_id'):
             with st.spinner("Processing file..."):
                 st.session_state.data = process_uploaded_file(uploaded_file)
                 st.session_state.file_name = uploaded_file.name
                 st.session_state.chat_history = []
+                session.set_data(st.session_state.data)
                 if st.session_state.data is not None:
+                    st.session_state.loaded_file_id = uploaded_file.file_id
                     data_loaded = True
+                if isinstance(st.session_state.data, str):
+                    # Indexed in the background, so the first chat question does not wait for all of it
+                    start_job("indexing", "document_index", index_document, st.session_state.data)
 
     if data_loaded:
+        st.session_state.get("jobs", {}).pop("analytics", None)  # results of the previous dataset
         st.success("✅ Data loaded successfully!")
 
     if st.session_state.data is not None:
@@ -141,15 +258,35 @@ with st.sidebar:
         if isinstance(st.session_state.data, pd.DataFrame):
             st.write(f"**Shape:** {st.session_state.data.shape}")
             st.write(f"**Columns:** {len(st.session_state.data.columns)}")
+            new_rows_file = st.file_uploader("➕ Append new rows (CSV)", type=['csv'], key="append_file",
+                                             help="Add new matchweeks without recomputing the full history.")
+            if new_rows_file and new_rows_file.file_id not in st.session_state.setdefault('appended_files', set()):
+                new_rows = process_uploaded_file(new_rows_file)
+                if isinstance(new_rows, pd.DataFrame):
+                    with st.spinner("Updating analytics with new rows..."):
+                        st.session_state.data = coordinator.append_data(st.session_state.data, new_rows, session=session)
+                    st.session_state.appended_files.add(new_rows_file.file_id)
+                    st.session_state.get("jobs", {}).pop("analytics", None)
+                    st.success(f"✅ Appended {len(new_rows)} rows.")
         else:
             st.write(f"**Type:** Text document")
             st.write(f"**Length:** {len(str(st.session_state.data))} characters")
+            if job_panel("indexing", "Indexing"):
+                st.caption("✅ Indexed for chat")
 
     st.divider()
     st.header("⚙️ Settings")
     if st.button("Toggle Dark/Light Mode"):
         st.session_state.dark_mode = not st.session_state.dark_mode
         st.rerun()
+    route_summary = coordinator.route_stats.summary()
+    if not route_summary.empty:
+        with st.expander("⚡ Chat routing"):
+            st.caption("Share of chat questions answered by each route, and their latency.")
+            st.dataframe(route_summary.style.format({"share": "{:.0%}", "mean_ms": "{:.0f}", "p95_ms": "{:.0f}"}),
+                         hide_index=True, use_container_width=True)
+    st.toggle("🐞 Show request traces", key="debug_tracing",
+              help="Per-request timing waterfall and latency percentiles of the agent pipeline.")
 
 
 # --- Main Content Area ---
@@ -165,22 +302,20 @@ if st.session_state.data is not None:
         if isinstance(st.session_state.data, pd.DataFrame):
             st.subheader("Raw Data")
             st.dataframe(st.session_state.data.head(100), use_container_width=True)
+            # Cached per dataset, so reruns don't rescan the data
+            profile = get_profile(st.session_state.data)
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("📈 Basic Statistics")
-                numeric_cols = st.session_state.data.select_dtypes(include=['number']).columns
-                if not numeric_cols.empty:
-                    st.dataframe(st.session_state.data[numeric_cols].describe())
+                if profile.numeric_columns:
+                    st.dataframe(profile.describe())
+                    if profile.approximate:
+                        st.caption("Quartiles and distinct counts are approximate (streamed sketches) for this large dataset.")
                 else:
                     st.info("No numeric columns found for statistics.")
             with col2:
                 st.subheader("🔢 Data Types & Null Values")
-                dtype_df = pd.DataFrame({
-                    'Type': st.session_state.data.dtypes.astype(str),
-                    'Non-Null Count': st.session_state.data.count(),
-                    'Null Count': st.session_state.data.isnull().sum()
-                }).reset_index()
-                st.dataframe(dtype_df, use_container_width=True)
+                st.dataframe(profile.dtype_table(), use_container_width=True)
         else:
             st.subheader("Document Content")
             st.text_area("Content Preview", str(st.session_state.data)[:5000], height=400)
@@ -188,24 +323,18 @@ if st.session_state.data is not None:
     with tab2:
         st.header("🔬 Metadata Analysis")
         if isinstance(st.session_state.data, pd.DataFrame):
-            if st.button("Generate Metadata Report", type="primary"):
-                with st.spinner("Generating detailed report..."):
-                    pr = ProfileReport(st.session_state.data, title="Metadata Report", minimal=True)
-                    st_profile_report(pr)
-            else:
-                st.info("Click the button to generate a detailed metadata and statistical report.")
+            metadata_report_panel(st.session_state.data)
         else:
             st.info("Metadata analysis is only available for tabular data (e.g., CSVs).")
 
     with tab3:
         st.header("🔍 Data Analytics Agent")
         if st.button("🚀 Generate Analytics Report", type="primary"):
-            with st.spinner("Analytics agent is processing your data..."):
-                analysis_results = coordinator.get_analytics_insights(st.session_state.data)
-                st.session_state.analysis_results = analysis_results
-        if st.session_state.analysis_results:
+            start_job("analytics", "analytics_report", run_analytics, st.session_state.data)
+        analysis_results = job_panel("analytics", "Analytics report")
+        if analysis_results:
             st.subheader("📋 Analysis Results")
-            st.write(st.session_state.analysis_results)
+            st.write(analysis_results)
 
     with tab4:
         st.header("📈 Data Visualization Agent")
@@ -216,6 +345,8 @@ if st.session_state.data is not None:
                 # If chart_result is a tuple (chart, explanation), access by index
                 if isinstance(chart_result, tuple) and len(chart_result) >= 1:
                     st.plotly_chart(chart_result[0], use_container_width=True)
+                    if chart_result[0] is not None:
+                        st.session_state.report_charts.append(chart_result[0])
                     if len(chart_result) > 1 and chart_result[1]:
                         st.info(chart_result[1])
                 # If chart_result is a dict (legacy), fallback to old logic
@@ -226,6 +357,61 @@ if st.session_state.data is not None:
                 else:
                     st.warning("Could not generate visualization. Try a different query.")
 
+        if isinstance(st.session_state.data, pd.DataFrame):
+            # Ranked from the cached profile; the top ones are built in the background
+            suggestions = coordinator.suggest_charts(st.session_state.data, k=3)
+            coordinator.prerender_suggestions(st.session_state.data, k=3)
+            if suggestions:
+                st.caption("💡 Suggested charts")
+                for column, suggestion in zip(st.columns(len(suggestions)), suggestions):
+                    if column.button(suggestion['title'], help=suggestion['description'], use_container_width=True):
+                        fig = coordinator.visualization_agent.chart_generator.create_chart(st.session_state.data, suggestion)
+                        st.plotly_chart(fig, use_container_width=True)
+                        st.session_state.report_charts.append(fig)
+                        st.info(suggestion['description'])
+
+        # Season -> team -> match drill-down, served from the precomputed aggregation cube
+        cube = get_aggregation_cube(st.session_state.data)
+        if cube is not None:
+            with st.expander("🔎 Drill down: season → team → match"):
+                selection = st.session_state.setdefault("drill_selection", {})
+                if any(value not in cube.members(level) for level, value in selection.items()):
+                    selection.clear()  # a different dataset was loaded
+                col1, col2 = st.columns(2)
+                measure = col1.selectbox("Measure", list(cube.measures), format_func=lambda m: m.replace('_', ' ').title())
+                statistic = col2.radio("Show", ["sum", "per_match"], horizontal=True,
+                                       format_func=lambda s: "Total" if s == "sum" else "Per match")
+                if selection:
+                    crumbs = st.columns(len(selection))
+                    if crumbs[0].button("⬆️ Top"):
+                        selection.clear()
+                        st.rerun()
+                    for crumb, (level, value) in zip(crumbs[1:], list(selection.items())[:-1]):
+                        if crumb.button(f"⬆️ {value}", key=f"drill_up_{level}"):
+                            # Roll up to this level: keep the selections above it
+                            keep = list(selection)[:list(selection).index(level) + 1]
+                            st.session_state.drill_selection = {d: selection[d] for d in keep}
+                            st.rerun()
+                drill_config = {'type': 'drilldown', 'measure': measure, 'statistic': statistic, 'selection': dict(selection)}
+                fig = coordinator.visualization_agent.chart_generator.create_chart(st.session_state.data, drill_config)
+                event = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points",
+                                        key="drill_chart_" + "_".join(map(str, selection.values())))
+                level = next((d for d in DEFAULT_DRILL_PATH if d not in selection), None)
+                points = event.selection.points if event and event.selection else []
+                if points and level not in (None, MATCH_LEVEL):
+                    selection[level] = points[0]["x"]
+                    st.rerun()
+
+        if st.session_state.report_charts:
+            with st.expander(f"📦 Export report ({len(st.session_state.report_charts)} charts)"):
+                export_format = st.selectbox("Format", ["Multi-page PDF", "PNG (zip)", "SVG (zip)", "HTML (zip)"])
+                if st.button("Prepare export"):
+                    start_job("export", "report_export", export_report, list(st.session_state.report_charts), export_format)
+                report_export = job_panel("export", "Export")
+                if report_export:
+                    file_name, payload = report_export
+                    st.download_button("⬇️ Download", payload, file_name=file_name)
+
     with tab5:
         st.header("💬 Chat with your Data")
         for message in st.session_state.chat_history:
@@ -240,11 +426,47 @@ if st.session_state.data is not None:
             with st.chat_message("assistant"):
                 with st.spinner("Agent is thinking..."):
                     response = coordinator.handle_chat_query(
-                        st.session_state.data, user_query, st.session_state.chat_history
+                        st.session_state.data, user_query, st.session_state.chat_history,
+                        session=session
                     )
                     st.markdown(response)
                     st.session_state.chat_history.append({'role': 'assistant', 'content': response})
+                    del st.session_state.chat_history[:-MAX_DISPLAYED_MESSAGES]
 
 else:
     st.header("Welcome to the Football Analytics Agent")
     st.markdown("Please select a dataset from the sidebar on the left to begin.")
+
+
+# --- Debug Panel ---
+if st.session_state.get("debug_tracing"):
+    with st.expander("🐞 Request traces", expanded=True):
+        traces = tracer.traces()
+        if not traces:
+            st.info("No traces recorded yet. Ask a question or build a chart.")
+        else:
+            labels = {t["trace_id"]: f"{t['name']} · {pd.Timestamp(t['start_ns'], unit='ns'):%H:%M:%S} · {t['wall_ms']:.0f} ms"
+                      for t in traces}
+            trace_id = st.selectbox("Request", list(labels), format_func=labels.get)
+            waterfall = tracer.waterfall(trace_id)
+            import plotly.graph_objects as go
+            names = ["\u2003" * depth + name for depth, name in zip(waterfall["depth"], waterfall["name"])]
+            # One row per span, even when a span name repeats within the request
+            fig = go.Figure(go.Bar(
+                y=list(range(len(names))), x=waterfall["wall_ms"], base=waterfall["offset_ms"], orientation="h",
+                marker_color=["#d62728" if status == "error" else "#1f77b4" for status in waterfall["status"]],
+                customdata=waterfall[["cpu_ms"]].to_numpy(),
+                text=names, textposition="none",
+                hovertemplate="%{text}<br>start %{base:.1f} ms, wall %{x:.1f} ms, cpu %{customdata[0]:.1f} ms<extra></extra>",
+            ))
+            fig.update_layout(xaxis_title="ms since request start",
+                              yaxis=dict(tickvals=list(range(len(names))), ticktext=names, autorange="reversed"),
+                              height=120 + 24 * len(waterfall), margin=dict(l=10, r=10, t=10, b=40))
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(waterfall.assign(attributes=waterfall["attributes"].astype(str)),
+                         hide_index=True, use_container_width=True)
+        st.subheader("Latency by span (rolling)")
+        st.dataframe(tracer.latency_summary().style.format({"p50_ms": "{:.1f}", "p95_ms": "{:.1f}", "p99_ms": "{:.1f}"}),
+                     hide_index=True, use_container_width=True)
+        if tracer.export_path:
+            st.caption(f"Spans are also exported to {tracer.export_path} (OTLP JSON, one span per line).")
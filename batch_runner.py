@@ -0,0 +1,199 @@
+# batch_runner.py
+#
+# Runs a file of scripted questions (e.g. a weekly club report) against one
+# dataset and writes answers, charts and timings to an output directory.
+#
+#   python batch_runner.py attached_assets/epl_final.csv questions.txt --out reports/week12 -j 8
+#
+# Questions are read one per line (blank lines and lines starting with '#' are
+# skipped); a line starting with "chart:" asks for a chart instead of an answer.
+# Re-running with the same output directory skips the questions already answered.
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from agents.coordinator import AgentCoordinator
+from utils.data_profiler import get_profile
+from utils.file_processor import FileProcessor
+
+CHART_PREFIX = "chart:"
+RESULTS_FILE = "results.jsonl"
+DB_SOURCES = {
+    "epl": "SELECT * FROM epl_match",
+    "ucl": "SELECT * FROM ucl_matches",
+}
+
+
+def read_questions(path: str) -> List[Dict[str, str]]:
+    """
+    The questions of a file, each with a stable id (a digest of the text, and
+    for a repeated question its occurrence number), so a resumed run
+    recognizes the ones already answered even if questions were inserted,
+    removed or reordered.
+    """
+    questions = []
+    occurrences: Dict[str, int] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            kind = "chart" if text.lower().startswith(CHART_PREFIX) else "chat"
+            if kind == "chart":
+                text = text[len(CHART_PREFIX):].strip()
+            digest = hashlib.blake2b(f"{kind}:{text}".encode("utf-8"), digest_size=6).hexdigest()
+            occurrences[digest] = occurrences.get(digest, 0) + 1
+            question_id = f"q{digest}" if occurrences[digest] == 1 else f"q{digest}-{occurrences[digest]}"
+            questions.append({"id": question_id, "kind": kind, "question": text})
+    return questions
+
+
+def load_dataset(coordinator: AgentCoordinator, path: Optional[str], db_source: Optional[str]) -> Any:
+    if db_source:
+        return coordinator.get_data_from_db(DB_SOURCES[db_source])
+    with open(path, "rb") as f:
+        return FileProcessor().process(f)
+
+
+class BatchRunner:
+    """
+    Runs questions through the coordinator on a thread pool. Every finished
+    question is appended (and flushed) to results.jsonl at once, so an
+    interrupted run loses at most the questions in flight.
+    """
+
+    def __init__(self, coordinator: AgentCoordinator, data: Any, out_dir: str, concurrency: int = 4):
+        self.coordinator = coordinator
+        self.data = data
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.join(out_dir, "answers"), exist_ok=True)
+        os.makedirs(os.path.join(out_dir, "charts"), exist_ok=True)
+
+    @property
+    def results_path(self) -> str:
+        return os.path.join(self.out_dir, RESULTS_FILE)
+
+    def completed(self) -> set:
+        """Ids of the questions answered successfully by earlier runs."""
+        if not os.path.exists(self.results_path):
+            return set()
+        done = set()
+        with open(self.results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interruption
+                if record.get("status") == "ok":
+                    done.add(record["id"])
+        return done
+
+    def run(self, questions: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        done = self.completed()
+        pending = [q for q in questions if q["id"] not in done]
+        logging.info(f"{len(questions)} question(s): {len(done & {q['id'] for q in questions})} already answered, "
+                     f"{len(pending)} to run with concurrency {self.concurrency}.")
+        if isinstance(self.data, pd.DataFrame):
+            get_profile(self.data)  # built once here instead of by the first concurrent questions
+        records = []
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch")
+        try:
+            futures = {pool.submit(self._run_one, q): q for q in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                records.append(record)
+                logging.info(f"[{i}/{len(pending)}] {record['id']} {record['status']} in {record['seconds']:.1f}s")
+        except KeyboardInterrupt:
+            logging.warning("Interrupted; answered questions are saved, re-run to resume.")
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+        return records
+
+    def _run_one(self, question: Dict[str, str]) -> Dict[str, Any]:
+        record = {**question, "status": "ok", "answer_file": None, "chart_file": None, "error": None}
+        start = time.perf_counter()
+        try:
+            if question["kind"] == "chart":
+                fig, answer = self.coordinator.generate_visualization(self.data, question["question"])
+                if fig is not None:
+                    record["chart_file"] = os.path.join("charts", f"{question['id']}.html")
+                    fig.write_html(os.path.join(self.out_dir, record["chart_file"]), include_plotlyjs="cdn")
+            else:
+                answer = self.coordinator.handle_chat_query(self.data, question["question"], [])
+            record["answer_file"] = os.path.join("answers", f"{question['id']}.md")
+            with open(os.path.join(self.out_dir, record["answer_file"]), "w", encoding="utf-8") as f:
+                f.write(f"# {question['question']}\n\n{answer}\n")
+        except Exception as e:
+            logging.error(f"Question {question['id']} failed: {e}")
+            record.update(status="error", error=str(e))
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        with self._write_lock:
+            with open(self.results_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+        return record
+
+    def write_summary(self, questions: List[Dict[str, str]]) -> pd.DataFrame:
+        """timings.csv: the latest result of every question in the file, in file order."""
+        latest = {}
+        with open(self.results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                latest[record["id"]] = record
+        rows = [latest[q["id"]] for q in questions if q["id"] in latest]
+        summary = pd.DataFrame(rows, columns=["id", "kind", "question", "status", "seconds",
+                                              "answer_file", "chart_file", "error"])
+        summary.to_csv(os.path.join(self.out_dir, "timings.csv"), index=False)
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a file of questions against a dataset.")
+    parser.add_argument("dataset", nargs="?", help="CSV, DOCX or PDF file to analyze")
+    parser.add_argument("questions", help="Text file with one question per line ('chart:' prefix for charts)")
+    parser.add_argument("--db-source", choices=sorted(DB_SOURCES), help="Load a database table instead of a file")
+    parser.add_argument("--out", default="batch_output", help="Output directory (re-use it to resume)")
+    parser.add_argument("-j", "--concurrency", type=int, default=4, help="Questions run at once")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"), help="Gemini API key (default: $GEMINI_API_KEY)")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("a Gemini API key is required (--api-key or GEMINI_API_KEY)")
+    if bool(args.dataset) == bool(args.db_source):
+        parser.error("give either a dataset file or --db-source")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    questions = read_questions(args.questions)
+    coordinator = AgentCoordinator(gemini_api_key=args.api_key)
+    data = load_dataset(coordinator, args.dataset, args.db_source)
+    runner = BatchRunner(coordinator, data, args.out, concurrency=max(1, args.concurrency))
+    try:
+        runner.run(questions)
+    except KeyboardInterrupt:
+        return 130
+    summary = runner.write_summary(questions)
+    failed = int((summary["status"] != "ok").sum())
+    ok_times = summary.loc[summary["status"] == "ok", "seconds"]
+    logging.info(f"Done: {len(summary) - failed} answered, {failed} failed; "
+                 f"median {ok_times.median():.1f}s per question. Results in {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
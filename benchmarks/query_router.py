@@ -0,0 +1,87 @@
+# benchmarks/query_router.py
+#
+# Runs a fixed set of chat questions through the QueryRouter against the EPL
+# match table and reports, per question, the route taken and its latency. Each
+# question has an expected outcome (a fragment of the fast-path answer, or
+# None when it must be left to the LLM), so wrong fast-path answers show up as
+# failures; the exit status is non-zero if any question fails.
+# Run from the repository root:  python -m benchmarks.query_router [path/to/epl_final.csv]
+
+import sys
+import time
+
+import pandas as pd
+
+from agents.query_router import QueryRouter
+
+DEFAULT_DATASET = "attached_assets/epl_final.csv"
+# Question -> expected answer fragment (None: must fall back to the LLM)
+CASES = [
+    # Rankings are over the entity the question names
+    ("which season had the most goals", "2023/24 (1,246"),
+    ("most goals in a single match", "Portsmouth 7-4 Reading"),
+    ("which match had the most red cards", "in a match"),
+    ("which team scored the most goals in 2004/05", "Arsenal (73"),
+    ("which season did Chelsea score the most goals", "2009/10 (103"),
+    ("which team won the most matches", "Most wins across all seasons: Man United"),
+    ("top 5 teams by goals", "| Chelsea"),
+    ("bottom 3 teams by points per match", "points per match"),
+    ("who conceded the fewest goals in 2010/11", "Chelsea (33"),
+    ("which was Chelsea's highest scoring match", "Chelsea 8-0 Wigan"),
+    # Groupings are kept
+    ("total goals scored by each team", "goals by team"),
+    ("how many goals per season", "goals by season"),
+    ("average goals per match by season", "goals per match by season"),
+    ("how many red cards each season", "red cards by season"),
+    # Slices
+    ("how many goals did Chelsea score at home in 2004/05", "Chelsea (home) in 2004/05: 31 goals"),
+    ("how many matches did Arsenal win", "534 wins"),
+    ("how many goals did Arsenal score in defeats", "120 goals"),
+    ("average goals per match", "2.72 goals per match"),
+    ("how many rows are there?", "9,380 rows"),
+    # Anything the cube cannot express goes to the LLM
+    ("which player scored the most goals", None),
+    ("how many goals by player", None),
+    ("how many matches had at least 3 goals", None),
+    ("which team scored the most goals each season", None),
+    ("why did Arsenal score so many goals in 2004/05", None),
+    # Qualifiers the cube has no dimension for must not be dropped
+    ("how many goals were scored in the first half", None),
+    ("how many goals did Chelsea score in the last 5 games", None),
+    ("how many penalties did Arsenal score", None),
+    ("how many goals did Arsenal score in 2010", None),
+    ("how many goals were scored in 2010/11 excluding Arsenal", None),
+    ("how many games did Chelsea lose at Stamford Bridge", None),
+    ("how many goals did Chelsea score in May", None),
+    ("how many goals did they score", None),
+    ("how many games did Chelsea lose at home", "60 defeats"),
+]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    data = pd.read_csv(argv[0] if argv else DEFAULT_DATASET)
+    router = QueryRouter()
+    router.route(CASES[0][0], data)  # builds the football engine and cube outside the timings
+    failures = 0
+    print(f"{'question':<56}{'route':>16}{'ms':>8}  result")
+    for question, expected in CASES:
+        start = time.perf_counter()
+        answer = router.route(question, data)
+        elapsed = (time.perf_counter() - start) * 1000
+        if expected is None:
+            ok = answer is None
+        else:
+            ok = answer is not None and expected in answer.answer
+        failures += not ok
+        route = answer.route if answer is not None else "llm"
+        print(f"{question[:55]:<56}{route:>16}{elapsed:>8.1f}  {'ok' if ok else 'FAIL'}")
+        if not ok:
+            print(f"    expected {expected!r}, got {answer.answer if answer is not None else None!r}")
+    fast = sum(expected is not None for _, expected in CASES)
+    print(f"\n{len(CASES) - failures}/{len(CASES)} as expected ({fast} fast-path questions).")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
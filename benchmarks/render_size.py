@@ -0,0 +1,48 @@
+# benchmarks/render_size.py
+#
+# Reports figure payload size and build time for the large-data chart paths
+# (WebGL traces, density binning, pre-plot reduction) as the row count grows.
+# Run from the repository root:  python -m benchmarks.render_size
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.chart_generator import ChartGenerator
+
+ROW_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+CONFIGS = [
+    {'type': 'scatter', 'x_column': 'x', 'y_column': 'y', 'title': 'Scatter'},
+    {'type': 'line', 'x_column': 't', 'y_column': 'y', 'title': 'Line'},
+    {'type': 'bar', 'x_column': 'team', 'y_column': 'y', 'title': 'Bar'},
+]
+
+
+def make_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=rows)
+    return pd.DataFrame({
+        'x': x,
+        'y': x * 0.5 + rng.normal(size=rows),
+        't': np.arange(rows),
+        'team': rng.choice([f'Team {i}' for i in range(40)], size=rows),
+    })
+
+
+def main():
+    generator = ChartGenerator()
+    print(f"{'chart':<8}{'rows':>10}{'trace':>12}{'payload KB':>12}{'build ms':>10}")
+    for rows in ROW_COUNTS:
+        data = make_data(rows)
+        for config in CONFIGS:
+            start = time.perf_counter()
+            fig = generator.create_chart(data, config)
+            elapsed = (time.perf_counter() - start) * 1000
+            payload = len(fig.to_json())
+            trace = fig.data[0].type if fig.data else '-'
+            print(f"{config['type']:<8}{rows:>10}{trace:>12}{payload / 1024:>12.1f}{elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
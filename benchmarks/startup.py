@@ -0,0 +1,108 @@
+# benchmarks/startup.py
+#
+# Reports cold-start cost: the import time of the modules the app loads at
+# startup (and of the heavy ones that should only load on demand), plus the
+# time to construct an AgentCoordinator. Each measurement runs in a fresh
+# interpreter, so nothing is already imported.
+# Run from the repository root:  python -m benchmarks.startup
+
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# What `streamlit run app.py` imports before the first page is drawn
+STARTUP_MODULES = [
+    "agents.coordinator",
+    "utils.file_processor",
+    "utils.data_profiler",
+    "utils.aggregation_cube",
+    "utils.tracing",
+]
+# Heavy modules that should now only be imported when first needed
+DEFERRED_MODULES = [
+    "plotly.subplots",
+    "langgraph.graph",
+    "langchain_core.prompts",
+    "langchain_google_genai",
+    "langchain_community.vectorstores",
+    "chromadb",
+    "psycopg2",
+    "PyPDF2",
+    "docx",
+    "ydata_profiling",
+    "streamlit_pandas_profiling",
+]
+TOP_PACKAGES = 12
+
+
+def import_profile(statement: str) -> Optional[Tuple[float, Dict[str, float]]]:
+    """
+    Runs `statement` under `python -X importtime` in a fresh interpreter.
+    Returns the total import time (ms) and the time spent in the modules of
+    each top-level package (ms), or None if the statement failed (e.g. a module is not installed).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    packages: Dict[str, float] = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = (part for part in line[len("import time:"):].split("|"))
+        # Each module's own time (excluding what it imports), charged to its top-level package
+        packages[name.strip().split(".")[0]] += int(own) / 1000
+    return sum(packages.values()), dict(packages)
+
+
+def coordinator_construction_ms() -> Optional[float]:
+    statement = ("import time; from agents.coordinator import AgentCoordinator; s = time.perf_counter(); "
+                 "AgentCoordinator(gemini_api_key='benchmark'); print((time.perf_counter() - s) * 1000)")
+    result = subprocess.run([sys.executable, "-c", statement], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Import time and construction cost at app startup.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement (best is kept)")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+
+    def best(statement: str):
+        runs = [import_profile(statement) for _ in range(args.repeat)]
+        runs = [r for r in runs if r is not None]
+        return min(runs, key=lambda r: r[0]) if runs else None
+
+    print(f"{'module':<36}{'import ms':>12}")
+    for module in STARTUP_MODULES + DEFERRED_MODULES:
+        profile = best(f"import {module}")
+        shown = f"{profile[0]:>12.0f}" if profile else f"{'import failed':>12}"
+        marker = "  (deferred)" if module in DEFERRED_MODULES else ""
+        print(f"{module:<36}{shown}{marker}")
+
+    profile = best("; ".join(f"import {m}" for m in STARTUP_MODULES))
+    if profile is None:
+        print("\nThe startup modules could not all be imported here.")
+        return
+    total, packages = profile
+    print(f"\nApp startup imports: {total:.0f} ms in total; slowest top-level packages:")
+    for package, ms in sorted(packages.items(), key=lambda item: -item[1])[:TOP_PACKAGES]:
+        print(f"  {package:<34}{ms:>12.0f}")
+    loaded = [m for m in DEFERRED_MODULES
+              if subprocess.run([sys.executable, "-c", "import sys; " + "; ".join(f"import {s}" for s in STARTUP_MODULES)
+                                 + f"; sys.exit({m!r} in sys.modules)"]).returncode == 1]
+    print(f"Deferred modules loaded at startup: {', '.join(loaded) or 'none'}")
+
+    construction = coordinator_construction_ms()
+    shown = f"{construction:.1f} ms" if construction is not None else "failed (missing dependencies?)"
+    print(f"AgentCoordinator construction: {shown}")
+    print(f"(benchmark took {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
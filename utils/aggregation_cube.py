@@ -0,0 +1,183 @@
+# utils/aggregation_cube.py
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.data_profiler import dataset_fingerprint
+from utils.football_engine import FootballAnalytics, get_football_analytics
+
+# Dimensions and measures of the football cube, over FootballAnalytics.team_matches
+# (one row per team per match, so "home"/"away" and W/D/L are per-team facts)
+MATCH_DIMENSIONS = ["season", "stage", "team", "venue", "result"]
+MATCH_MEASURES = {
+    "goals": "goals_for",
+    "goals_conceded": "goals_against",
+    "shots": "shots_for",
+    "shots_on_target": "shots_on_target_for",
+    "corners": "corners_for",
+    "fouls": "fouls_for",
+    "yellow_cards": "yellow_for",
+    "red_cards": "red_for",
+    "points": "points",
+}
+# The finest drill level: the individual matches behind a cube cell
+MATCH_LEVEL = "match"
+DEFAULT_DRILL_PATH = ["season", "team", MATCH_LEVEL]
+
+COUNT_COLUMN = "matches"
+PER_MATCH_SUFFIX = "_per_match"
+MAX_CACHED_CUBES = 4
+MAX_CACHED_VIEWS = 256
+
+_lock = threading.Lock()
+_cube_cache: "OrderedDict[str, AggregationCube]" = OrderedDict()
+
+
+class AggregationCube:
+    """
+    OLAP-style aggregation cube over a long-format fact table. The base cuboid
+    holds the sum and non-missing count of every measure for each combination
+    of the dimensions; every roll-up (any subset of dimensions, optionally
+    sliced by dimension values) is aggregated from that small table instead of
+    the raw rows, and memoized. Drilling down or rolling up therefore costs
+    milliseconds whatever the number of rows.
+    """
+
+    def __init__(self, facts: pd.DataFrame, dimensions: Sequence[str], measures: Dict[str, str],
+                 detail_columns: Optional[Sequence[str]] = None):
+        """
+        Args:
+            facts: One row per fact (e.g. one team in one match)
+            dimensions: Columns of facts to aggregate by
+            measures: Measure name -> numeric column of facts
+            detail_columns: Columns listed for individual facts at the finest drill level
+        """
+        self.dimensions = list(dimensions)
+        self.measures = dict(measures)
+        self.detail_columns = list(detail_columns or [])
+
+        values = {name: pd.to_numeric(facts[column], errors="coerce") for name, column in self.measures.items()}
+        frame = pd.DataFrame({**{d: facts[d].to_numpy() for d in self.dimensions}, **values})
+        for name in self.measures:
+            frame[f"{name}__n"] = frame[name].notna()
+        frame[COUNT_COLUMN] = 1
+        self.base = frame.groupby(self.dimensions, sort=True, observed=True, dropna=False).sum().reset_index()
+        self._facts = facts
+        self._views: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self._views_lock = threading.Lock()
+        logging.info(f"AggregationCube built: {len(facts)} facts -> {len(self.base)} base cells "
+                     f"over {self.dimensions}.")
+
+    @classmethod
+    def from_football(cls, engine: FootballAnalytics) -> "AggregationCube":
+        """The match cube of a FootballAnalytics engine (season, stage, team, venue, result)."""
+        facts = engine.team_matches
+        return cls(facts, MATCH_DIMENSIONS, MATCH_MEASURES,
+                   detail_columns=["date", "opponent", "venue", "result", "goals_for", "goals_against"])
+
+    # --- Queries ---
+
+    def members(self, dimension: str, filters: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """The values a dimension takes (within a slice), in cube order."""
+        return self.rollup([dimension], filters)[dimension].tolist()
+
+    def rollup(self, by: Sequence[str], filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Totals of every measure grouped by `by`, restricted to the cells matching
+        `filters` ({dimension: value or list of values}). Besides the sum of each
+        measure the result has the number of facts ('matches') and per-fact
+        averages ('<measure>_per_match', over the facts where it is recorded).
+        """
+        by = list(by)
+        unknown = [d for d in by + list(filters or {}) if d not in self.dimensions]
+        if unknown:
+            raise ValueError(f"Unknown cube dimension(s): {unknown}")
+        key = (tuple(by), self._filter_key(filters))
+        with self._views_lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+
+        cells = self.base[self._mask(self.base, filters)]
+        if by:
+            summed = cells.groupby(by, sort=True, observed=True, dropna=False).sum(numeric_only=True).reset_index()
+        else:
+            summed = cells.drop(columns=self.dimensions).sum().to_frame().T
+        view = summed[by + [COUNT_COLUMN]].astype({COUNT_COLUMN: int})
+        for name in self.measures:
+            counts = summed[f"{name}__n"].to_numpy(dtype=float)
+            view[name] = summed[name].to_numpy()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                view[name + PER_MATCH_SUFFIX] = np.where(counts > 0, summed[name].to_numpy() / counts, np.nan)
+
+        with self._views_lock:
+            self._views[key] = view
+            while len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+        return view
+
+    def details(self, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """The individual facts behind a slice (the finest drill level)."""
+        facts = self._facts[self._mask(self._facts, filters)]
+        measure_columns = [c for c in self.measures.values() if c not in self.detail_columns]
+        return facts[self.detail_columns + measure_columns].rename(
+            columns={column: name for name, column in self.measures.items()})
+
+    def drill(self, path: Sequence[str] = DEFAULT_DRILL_PATH,
+              selection: Optional[Dict[str, Any]] = None) -> Tuple[str, pd.DataFrame]:
+        """
+        The view one level below the current selection along a drill path, e.g.
+        path ['season', 'team', 'match'] with selection {'season': '2010/11'}
+        gives ('team', per-team totals for 2010/11). Rolling up is drilling
+        with the last selected level removed from the selection.
+        """
+        selection = {d: v for d, v in (selection or {}).items() if v is not None}
+        level = next((d for d in path if d not in selection), path[-1])
+        filters = {d: v for d, v in selection.items() if d != level}
+        if level == MATCH_LEVEL:
+            return level, self.details(filters)
+        return level, self.rollup([level], filters)
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _filter_key(filters: Optional[Dict[str, Any]]) -> tuple:
+        return tuple(sorted((d, tuple(v) if isinstance(v, (list, tuple, set)) else (v,))
+                            for d, v in (filters or {}).items()))
+
+    @staticmethod
+    def _mask(frame: pd.DataFrame, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = np.ones(len(frame), dtype=bool)
+        for dimension, value in (filters or {}).items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            mask &= frame[dimension].isin(values).to_numpy()
+        return mask
+
+
+def get_aggregation_cube(df: Any) -> Optional[AggregationCube]:
+    """
+    Returns the match cube for a match table, cached by dataset fingerprint, or
+    None if df is not a match table. Built from the (also cached) football
+    engine, so the raw rows are only normalized once.
+    """
+    engine = get_football_analytics(df)
+    if engine is None:
+        return None
+    fingerprint = dataset_fingerprint(df)
+    with _lock:
+        cube = _cube_cache.get(fingerprint)
+        if cube is not None:
+            _cube_cache.move_to_end(fingerprint)
+            return cube
+    cube = AggregationCube.from_football(engine)
+    with _lock:
+        _cube_cache[fingerprint] = cube
+        while len(_cube_cache) > MAX_CACHED_CUBES:
+            _cube_cache.popitem(last=False)
+    return cube
@@ -0,0 +1,240 @@
+# utils/chart_exporter.py
+
+import atexit
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Formats rendered by kaleido (a headless browser) in the worker processes
+IMAGE_FORMATS = {"png", "jpeg", "webp", "svg", "pdf"}
+# Formats serialized directly in the calling process
+TEXT_FORMATS = {"html", "json"}
+EXPORT_FORMATS = IMAGE_FORMATS | TEXT_FORMATS
+# Already-compressed formats are stored as-is in zip archives
+STORED_FORMATS = {"png", "jpeg", "webp", "pdf"}
+
+DEFAULT_CACHE_BYTES = int(os.environ.get("CHART_EXPORT_CACHE_MB", 128)) * 1024 * 1024
+
+FigureInput = Union[Sequence[go.Figure], Sequence[Tuple[str, go.Figure]], Dict[str, go.Figure]]
+
+
+def _init_renderer():
+    """Worker initializer: starts kaleido's renderer once, so jobs never pay its startup."""
+    try:
+        import kaleido
+        if hasattr(kaleido, "start_sync_server"):
+            # kaleido >= 1 otherwise launches a fresh browser for every to_image call
+            kaleido.start_sync_server(silence_warnings=True)
+        pio.to_image(go.Figure(), format="png", width=10, height=10)
+    except Exception as e:  # the job itself will report a missing/broken kaleido
+        logging.warning(f"Chart renderer warm-up failed: {e}")
+
+
+def _render(fig_json: str, fmt: str, width: int, height: int, scale: float) -> bytes:
+    fig = pio.from_json(fig_json, skip_invalid=True)
+    return pio.to_image(fig, format=fmt, width=width, height=height, scale=scale)
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", name).strip("_")[:80] or "chart"
+
+
+class BatchChartExporter:
+    """
+    Renders many figures to image/PDF/HTML bytes. Image rendering runs in a
+    pool of worker processes that each keep a warm kaleido renderer, and every
+    rendered result is cached by a hash of the figure and export options, so
+    re-exporting an unchanged report costs nothing.
+    """
+
+    def __init__(self, workers: Optional[int] = None, cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 width: int = 800, height: int = 600, scale: float = 1.0):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.cache_bytes = cache_bytes
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self._cache_lock = threading.Lock()
+
+    # --- Public API ---
+
+    def export(self, fig: go.Figure, fmt: str = "png", width: Optional[int] = None,
+               height: Optional[int] = None) -> bytes:
+        """Renders a single figure (cached)."""
+        for _, _, content in self.render([("chart", fig)], [fmt], width, height):
+            return content
+        raise RuntimeError("Export produced no output.")
+
+    def render(self, figures: FigureInput, formats: Iterable[str] = ("png",), width: Optional[int] = None,
+               height: Optional[int] = None) -> Iterator[Tuple[str, str, bytes]]:
+        """
+        Yields (figure name, format, bytes) for every figure/format pair as soon
+        as it is ready, so callers can stream results instead of waiting for
+        the whole batch.
+        """
+        return self._render_named(self._named(figures), formats, width, height)
+
+    def export_zip(self, figures: FigureInput, formats: Iterable[str] = ("png",), fileobj: Optional[BinaryIO] = None,
+                   width: Optional[int] = None, height: Optional[int] = None) -> Optional[bytes]:
+        """
+        Writes every figure in every format into a zip archive as the renders
+        complete. Returns the archive bytes, or None when writing to fileobj.
+        """
+        target = fileobj if fileobj is not None else io.BytesIO()
+        with zipfile.ZipFile(target, "w") as archive:
+            for name, fmt, content in self.render(figures, formats, width, height):
+                compression = zipfile.ZIP_STORED if fmt in STORED_FORMATS else zipfile.ZIP_DEFLATED
+                archive.writestr(f"{name}.{fmt}", content, compress_type=compression)
+        return target.getvalue() if fileobj is None else None
+
+    def export_pdf(self, figures: FigureInput, fileobj: Optional[BinaryIO] = None,
+                   width: Optional[int] = None, height: Optional[int] = None) -> Optional[bytes]:
+        """Renders every figure as a PDF page and merges them, in input order, into one document."""
+        from PyPDF2 import PdfWriter
+
+        named = self._named(figures)
+        pages = {name: content for name, _, content in self._render_named(named, ["pdf"], width, height)}
+        writer = PdfWriter()
+        for name, _ in named:
+            writer.append(io.BytesIO(pages[name]))
+        target = fileobj if fileobj is not None else io.BytesIO()
+        writer.write(target)
+        return target.getvalue() if fileobj is None else None
+
+    def close(self):
+        with self._pool_lock:
+            self._discard_pool(self._pool)
+
+    # --- Helpers ---
+
+    def _render_named(self, named: List[Tuple[str, go.Figure]], formats: Iterable[str], width: Optional[int],
+                      height: Optional[int]) -> Iterator[Tuple[str, str, bytes]]:
+        formats = list(dict.fromkeys(formats))
+        unsupported = [f for f in formats if f not in EXPORT_FORMATS]
+        if unsupported:
+            raise ValueError(f"Unsupported export format(s): {unsupported}")
+        width, height = width or self.width, height or self.height
+
+        pending: Dict[Future, Tuple[str, str, str, ProcessPoolExecutor]] = {}
+        for name, fig in named:
+            fig_json = fig.to_json()
+            for fmt in formats:
+                key = self._cache_key(fig_json, fmt, width, height)
+                cached = self._cache_get(key)
+                if cached is not None:
+                    yield name, fmt, cached
+                elif fmt in TEXT_FORMATS:
+                    content = self._serialize(fig, fig_json, fmt)
+                    self._cache_put(key, content)
+                    yield name, fmt, content
+                else:
+                    future, pool = self._submit(fig_json, fmt, width, height)
+                    pending[future] = (name, fmt, key, pool)
+
+        for future in as_completed(pending):
+            name, fmt, key, pool = pending[future]
+            try:
+                content = future.result()
+            except BrokenProcessPool:
+                with self._pool_lock:
+                    self._discard_pool(pool)  # the next export starts a new pool
+                raise
+            self._cache_put(key, content)
+            yield name, fmt, content
+
+    def _named(self, figures: FigureInput) -> List[Tuple[str, go.Figure]]:
+        """Unique, file-name-safe names for the figures, numbered in input order."""
+        items = list(figures.items()) if isinstance(figures, dict) else list(figures)
+        named = []
+        for i, item in enumerate(items, start=1):
+            name, fig = item if isinstance(item, tuple) else (None, item)
+            if name is None:
+                name = fig.layout.title.text or "chart"
+            named.append((f"{i:02d}_{_safe_name(str(name))}", fig))
+        return named
+
+    def _submit(self, fig_json: str, fmt: str, width: int, height: int) -> Tuple[Future, ProcessPoolExecutor]:
+        with self._pool_lock:
+            pool = self._renderer_pool()
+            try:
+                future = pool.submit(_render, fig_json, fmt, width, height, self.scale)
+            except BrokenProcessPool:
+                # A renderer died (e.g. the headless browser crashed) since the last export
+                self._discard_pool(pool)
+                pool = self._renderer_pool()
+                future = pool.submit(_render, fig_json, fmt, width, height, self.scale)
+            return future, pool
+
+    def _renderer_pool(self) -> ProcessPoolExecutor:
+        # Called with the lock held
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_renderer)
+            logging.info(f"Started chart export pool with {self.workers} renderer process(es).")
+        return self._pool
+
+    def _discard_pool(self, pool: Optional[ProcessPoolExecutor]):
+        # Called with the lock held; a pool already replaced is left alone
+        if pool is not None and pool is self._pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def _serialize(fig: go.Figure, fig_json: str, fmt: str) -> bytes:
+        if fmt == "json":
+            return fig_json.encode("utf-8")
+        # Batch HTML exports load plotly.js from the CDN instead of embedding ~3.5 MB per file
+        return pio.to_html(fig, include_plotlyjs="cdn", full_html=True).encode("utf-8")
+
+    def _cache_key(self, fig_json: str, fmt: str, width: int, height: int) -> str:
+        digest = hashlib.blake2b(fig_json.encode("utf-8"), digest_size=16)
+        digest.update(f"|{fmt}|{width}|{height}|{self.scale}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[bytes]:
+        with self._cache_lock:
+            content = self._cache.get(key)
+            if content is not None:
+                self._cache.move_to_end(key)
+            return content
+
+    def _cache_put(self, key: str, content: bytes):
+        if len(content) > self.cache_bytes:
+            return
+        with self._cache_lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._cached_bytes -= len(previous)
+            self._cache[key] = content
+            self._cached_bytes += len(content)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+
+
+_shared_exporter: Optional[BatchChartExporter] = None
+_shared_lock = threading.Lock()
+
+
+def get_chart_exporter() -> BatchChartExporter:
+    """The process-wide exporter, whose renderer pool is started on first use."""
+    global _shared_exporter
+    with _shared_lock:
+        if _shared_exporter is None:
+            _shared_exporter = BatchChartExporter()
+            atexit.register(_shared_exporter.close)
+        return _shared_exporter
@@ -1,16 +1,67 @@
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils.aggregation_cube import COUNT_COLUMN, DEFAULT_DRILL_PATH, MATCH_LEVEL, PER_MATCH_SUFFIX, get_aggregation_cube
+from utils.chart_exporter import get_chart_exporter
+from utils.chart_recommender import recommend_charts
+from utils.chart_reduction import (
+    aggregate_by, as_temporal, box_summary, downsample_series, group_values, histogram_counts,
+    is_categorical, kde_curve, limit_categories,
+)
+from utils.correlation import cluster_order, correlation_matrix, select_columns_for_display
+from utils.data_profiler import dataset_fingerprint
+from utils.figure_cache import FigureCache, shared_figure_cache
+from utils.tracing import span
+
+# Private config flags used while assembling dashboards
+PANEL_KEY = '_panel'
+REDUCED_KEY = '_reduced'
+# Chart types whose traces need a 'domain' subplot cell
+DOMAIN_CHART_TYPES = {'pie', 'sunburst'}
+# Panel axis settings that place the axis in the panel's own figure; the subplot grid sets its own
+GRID_AXIS_KEYS = {'domain', 'anchor', 'overlaying', 'matches', 'scaleanchor', 'position'}
+# Chart types the dashboard pre-aggregates, with their default aggregation
+SHARED_AGGREGATIONS = {'bar': 'sum', 'line': 'mean', 'area': 'sum'}
 
 class ChartGenerator:
     """
     Utility class for generating various types of charts and visualizations.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        point_budget: int = 2000,
+        max_categories: int = 50,
+        webgl_threshold: int = 5000,
+        density_threshold: int = 100000,
+        density_bins: int = 100,
+        max_heatmap_columns: int = 40,
+        heatmap_annotation_limit: int = 20,
+        max_workers: Optional[int] = None,
+        figure_cache: Optional[FigureCache] = None,
+    ):
+        # Upper bounds on what is shipped to the browser; charts can override
+        # them with 'point_budget' / 'max_categories' in their config
+        self.point_budget = point_budget
+        self.max_categories = max_categories
+        # Scatter/line traces switch to WebGL above webgl_threshold points, and
+        # scatters are binned into a density heatmap above density_threshold
+        self.webgl_threshold = webgl_threshold
+        self.density_threshold = density_threshold
+        self.density_bins = density_bins
+        # Correlation heatmaps show at most max_heatmap_columns columns and
+        # label cells with their values only up to heatmap_annotation_limit
+        self.max_heatmap_columns = max_heatmap_columns
+        self.heatmap_annotation_limit = heatmap_annotation_limit
+        # Worker threads used to build dashboard panels concurrently
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+
         # Color scheme matching the application theme
         self.color_palette = [
             '#2E86AB',  # Primary blue
@@ -29,6 +80,25 @@ class ChartGenerator:
             'font_color': '#212529',
             'gridcolor': '#E9ECEF'
         }
+
+        # The theme layout is built once and merged into every figure; the theme
+        # key separates cached figures drawn with different palettes/themes
+        self._theme_layout = self._build_theme_layout()
+        self.theme_key = json.dumps([self.color_palette, self.layout_theme], sort_keys=True)
+        self.figure_cache = figure_cache if figure_cache is not None else shared_figure_cache
+
+    @property
+    def reduction_settings(self) -> Dict[str, Any]:
+        """The limits that change what is drawn for a config; part of every figure cache key."""
+        return {
+            'point_budget': self.point_budget,
+            'max_categories': self.max_categories,
+            'webgl_threshold': self.webgl_threshold,
+            'density_threshold': self.density_threshold,
+            'density_bins': self.density_bins,
+            'max_heatmap_columns': self.max_heatmap_columns,
+            'heatmap_annotation_limit': self.heatmap_annotation_limit,
+        }
     
     def create_chart(self, data: pd.DataFrame, chart_config: Dict[str, Any]) -> go.Figure:
         """
@@ -41,34 +111,57 @@ class ChartGenerator:
         Returns:
             Plotly figure object
         """
-        try:
-            chart_type = chart_config.get('type', 'bar')
-            
-            if chart_type == 'bar':
-                return self.create_bar_chart(data, chart_config)
-            elif chart_type == 'line':
-                return self.create_line_chart(data, chart_config)
-            elif chart_type == 'scatter':
-                return self.create_scatter_plot(data, chart_config)
-            elif chart_type == 'pie':
-                return self.create_pie_chart(data, chart_config)
-            elif chart_type == 'histogram':
-                return self.create_histogram(data, chart_config)
-            elif chart_type == 'box':
-                return self.create_box_plot(data, chart_config)
-            elif chart_type == 'heatmap':
-                return self.create_heatmap(data, chart_config)
-            elif chart_type == 'area':
-                return self.create_area_chart(data, chart_config)
-            elif chart_type == 'violin':
-                return self.create_violin_plot(data, chart_config)
-            elif chart_type == 'sunburst':
-                return self.create_sunburst_chart(data, chart_config)
-            else:
-                raise ValueError(f"Unsupported chart type: {chart_type}")
-                
-        except Exception as e:
-            return self._create_error_chart(f"Error creating chart: {str(e)}")
+        with span("chart.build", chart_type=chart_config.get('type'), rows=len(data)) as build:
+            cache_key = None
+            try:
+                cache_key = self.figure_cache.make_key(dataset_fingerprint(data), chart_config, self.theme_key,
+                                                       self.reduction_settings)
+                cached = self.figure_cache.get(cache_key)
+                if cached is not None:
+                    build.set(cache_hit=True)
+                    return cached
+            except Exception as e:
+                logging.warning(f"Figure cache lookup failed: {e}")
+
+            try:
+                fig = self._build_chart(data, chart_config)
+            except Exception as e:
+                build.set(error=str(e))
+                return self._create_error_chart(f"Error creating chart: {str(e)}")
+
+            build.set(cache_hit=False, points=sum(len(trace.x) for trace in fig.data if getattr(trace, 'x', None) is not None))
+            if cache_key is not None:
+                self.figure_cache.put(cache_key, fig)
+            return fig
+
+    def _build_chart(self, data: pd.DataFrame, chart_config: Dict[str, Any]) -> go.Figure:
+        """Dispatches to the chart builder for the configured type."""
+        chart_type = chart_config.get('type', 'bar')
+        
+        if chart_type == 'bar':
+            return self.create_bar_chart(data, chart_config)
+        elif chart_type == 'line':
+            return self.create_line_chart(data, chart_config)
+        elif chart_type == 'scatter':
+            return self.create_scatter_plot(data, chart_config)
+        elif chart_type == 'pie':
+            return self.create_pie_chart(data, chart_config)
+        elif chart_type == 'histogram':
+            return self.create_histogram(data, chart_config)
+        elif chart_type == 'box':
+            return self.create_box_plot(data, chart_config)
+        elif chart_type == 'heatmap':
+            return self.create_heatmap(data, chart_config)
+        elif chart_type == 'area':
+            return self.create_area_chart(data, chart_config)
+        elif chart_type == 'violin':
+            return self.create_violin_plot(data, chart_config)
+        elif chart_type == 'sunburst':
+            return self.create_sunburst_chart(data, chart_config)
+        elif chart_type == 'drilldown':
+            return self.create_drilldown_chart(data, chart_config)
+        else:
+            raise ValueError(f"Unsupported chart type: {chart_type}")
     
     def create_bar_chart(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
         """Create a bar chart"""
@@ -78,16 +171,19 @@ class ChartGenerator:
         color_col = config.get('color_column')
         title = config.get('title', 'Bar Chart')
         orientation = config.get('orientation', 'vertical')
+        data, y_col = self._reduce_for_plot(data, config, default_aggregation='sum')
         
         if orientation == 'horizontal':
             fig = px.bar(data, y=x_col, x=y_col, color=color_col, 
                         title=title, color_discrete_sequence=self.color_palette,
+                        template=self._px_template(config),
                         orientation='h')
         else:
             fig = px.bar(data, x=x_col, y=y_col, color=color_col,
-                        title=title, color_discrete_sequence=self.color_palette)
+                        title=title, color_discrete_sequence=self.color_palette,
+                        template=self._px_template(config))
         
-        self._apply_theme(fig)
+        self._apply_theme(fig, config)
         return fig
     
     def create_line_chart(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
@@ -97,14 +193,17 @@ class ChartGenerator:
         y_col = config.get('y_column')
         color_col = config.get('color_column')
         title = config.get('title', 'Line Chart')
+        data, y_col = self._reduce_for_plot(data, config, default_aggregation='mean', series=True)
         
         fig = px.line(data, x=x_col, y=y_col, color=color_col,
-                     title=title, color_discrete_sequence=self.color_palette)
+                     title=title, color_discrete_sequence=self.color_palette,
+                     template=self._px_template(config),
+                     render_mode=self._render_mode(len(data), config))
         
         # Add markers
         fig.update_traces(mode='lines+markers')
         
-        self._apply_theme(fig)
+        self._apply_theme(fig, config)
         return fig
     
     def create_scatter_plot(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
@@ -115,16 +214,47 @@ class ChartGenerator:
         color_col = config.get('color_column')
         size_col = config.get('size_column')
         title = config.get('title', 'Scatter Plot')
+        density_threshold = config.get('density_threshold', self.density_threshold)
         
-        fig = px.scatter(data, x=x_col, y=y_col, color=color_col, size=size_col,
-                        title=title, color_discrete_sequence=self.color_palette)
+        if (len(data) > density_threshold and color_col is None and size_col is None
+                and pd.api.types.is_numeric_dtype(data[x_col]) and pd.api.types.is_numeric_dtype(data[y_col])):
+            fig = self._create_density_heatmap(data, x_col, y_col, title, config.get('density_bins', self.density_bins))
+        else:
+            fig = px.scatter(data, x=x_col, y=y_col, color=color_col, size=size_col,
+                            title=title, color_discrete_sequence=self.color_palette,
+                            template=self._px_template(config),
+                            render_mode=self._render_mode(len(data), config))
         
-        # Add trendline if requested
+        # Add a least-squares trendline if requested (two points, whatever the data size)
         if config.get('trendline'):
-            fig.add_scatter(x=data[x_col], y=data[y_col], mode='lines', 
-                          name='Trendline', line=dict(color='red', dash='dash'))
-        
-        self._apply_theme(fig)
+            points = data[[x_col, y_col]].dropna()
+            if len(points) > 1 and pd.api.types.is_numeric_dtype(points[x_col]):
+                slope, intercept = np.polyfit(points[x_col].to_numpy(dtype=float), points[y_col].to_numpy(dtype=float), 1)
+                x_range = np.array([points[x_col].min(), points[x_col].max()], dtype=float)
+                fig.add_scatter(x=x_range, y=slope * x_range + intercept, mode='lines',
+                              name='Trendline', line=dict(color='red', dash='dash'))
+        
+        self._apply_theme(fig, config)
+        return fig
+
+    def _render_mode(self, n_points: int, config: Dict[str, Any]) -> str:
+        """SVG for small traces, WebGL ('scattergl') once the browser would struggle."""
+        return 'webgl' if n_points > config.get('webgl_threshold', self.webgl_threshold) else 'svg'
+
+    def _create_density_heatmap(self, data: pd.DataFrame, x_col: str, y_col: str, title: str, bins: int) -> go.Figure:
+        """Bins a very dense scatter server-side (2D histogram) and ships only the counts."""
+        points = data[[x_col, y_col]].dropna()
+        counts, x_edges, y_edges = np.histogram2d(points[x_col].to_numpy(dtype=float),
+                                                  points[y_col].to_numpy(dtype=float), bins=bins)
+        fig = go.Figure(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            z=np.where(counts.T > 0, counts.T, np.nan),
+            colorscale='Blues',
+            colorbar=dict(title='Count'),
+            hovertemplate=f'{x_col}: %{{x}}<br>{y_col}: %{{y}}<br>Count: %{{z}}<extra></extra>',
+        ))
+        fig.update_layout(title=title, xaxis_title=x_col, yaxis_title=y_col)
         return fig
     
     def create_pie_chart(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
@@ -139,61 +269,131 @@ class ChartGenerator:
             pie_data = data[names_col].value_counts().reset_index()
             pie_data.columns = ['names', 'values']
             fig = px.pie(pie_data, values='values', names='names', title=title,
-                        color_discrete_sequence=self.color_palette)
+                        color_discrete_sequence=self.color_palette,
+                        template=self._px_template(config))
         else:
             fig = px.pie(data, values=values_col, names=names_col, title=title,
-                        color_discrete_sequence=self.color_palette)
+                        color_discrete_sequence=self.color_palette,
+                        template=self._px_template(config))
         
-        self._apply_theme(fig)
+        self._apply_theme(fig, config)
         return fig
     
     def create_histogram(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
-        """Create a histogram"""
+        """Create a histogram (binned server-side, so only bin counts are shipped)"""
         
         x_col = config.get('x_column')
         color_col = config.get('color_column')
         title = config.get('title', 'Histogram')
         bins = config.get('bins', 30)
         
-        fig = px.histogram(data, x=x_col, color=color_col, title=title,
-                          nbins=bins, color_discrete_sequence=self.color_palette)
+        if is_categorical(data[x_col]):
+            # One bar per category
+            counts = limit_categories(data, x_col, None, config.get('max_categories', self.max_categories),
+                                      'count', color_col)
+            fig = px.bar(counts, x=x_col, y='count', color=color_col, title=title,
+                         color_discrete_sequence=self.color_palette,
+                         template=self._px_template(config))
+            self._apply_theme(fig, config)
+            return fig
+        
+        temporal = pd.api.types.is_datetime64_any_dtype(data[x_col])
+        if temporal:
+            nanoseconds = data[x_col].to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64)
+            nanoseconds[data[x_col].isna().to_numpy()] = np.nan
+            data = data.assign(**{x_col: nanoseconds})
+        keys = [color_col] if color_col and color_col != x_col else []
+        groups = group_values(data, x_col, keys, config.get('max_categories', self.max_categories))
+        non_empty = [values for _, values in groups if len(values)]
+        value_range = (min(v.min() for v in non_empty), max(v.max() for v in non_empty)) if non_empty else None
         
-        self._apply_theme(fig)
+        fig = go.Figure()
+        for i, (key, values) in enumerate(groups):
+            counts, edges = histogram_counts(values, bins, value_range)
+            centers, widths = (edges[:-1] + edges[1:]) / 2, np.diff(edges)
+            if temporal:
+                # Date axes take bar widths in milliseconds
+                centers, widths = pd.to_datetime(centers), widths / 1e6
+            fig.add_bar(x=centers, y=counts, width=widths, name=str(key[0]) if key else x_col,
+                        marker_color=self.color_palette[i % len(self.color_palette)], showlegend=bool(key))
+        fig.update_layout(title=title, barmode='stack', bargap=0, xaxis_title=x_col, yaxis_title='count',
+                          legend_title_text=color_col if keys else None)
+        
+        self._apply_theme(fig, config)
         return fig
     
     def create_box_plot(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
-        """Create a box plot"""
+        """Create a box plot from precomputed quartiles, fences and a sample of outliers"""
         
         x_col = config.get('x_column')
         y_col = config.get('y_column')
         color_col = config.get('color_column')
         title = config.get('title', 'Box Plot')
+        max_outliers = config.get('max_outliers', 100)
         
-        fig = px.box(data, x=x_col, y=y_col, color=color_col, title=title,
-                    color_discrete_sequence=self.color_palette)
-        
-        self._apply_theme(fig)
+        x_key, color_key, groups = self._distribution_groups(data, config)
+        fig = go.Figure()
+        for i, (color_value, items) in enumerate(groups.items()):
+            # The outlier budget is shared by all boxes of a trace
+            per_box = max(5, max_outliers // max(1, len(items)))
+            summaries = [(x_value, box_summary(values, per_box)) for x_value, values in items]
+            summaries = [(x_value, summary) for x_value, summary in summaries if summary is not None]
+            if not summaries:
+                continue
+            color = self.color_palette[i % len(self.color_palette)]
+            name = str(color_value) if color_key else y_col
+            positions = [str(x_value) for x_value, _ in summaries]
+            fig.add_trace(go.Box(
+                x=positions, name=name, marker_color=color, offsetgroup=name, legendgroup=name,
+                **{stat: [summary[stat] for _, summary in summaries]
+                   for stat in ('q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean')},
+            ))
+            outlier_x = [p for p, (_, summary) in zip(positions, summaries) for _ in summary['outliers']]
+            if outlier_x:
+                fig.add_scatter(x=outlier_x, y=np.concatenate([summary['outliers'] for _, summary in summaries]),
+                                mode='markers', marker=dict(color=color, size=4), name=name,
+                                offsetgroup=name, legendgroup=name, showlegend=False)
+        fig.update_layout(title=title, boxmode='group', scattermode='group',
+                          xaxis_title=x_col if x_key else None, yaxis_title=y_col,
+                          legend_title_text=color_col if color_key else None, showlegend=bool(color_key))
+        
+        self._apply_theme(fig, config)
         return fig
     
     def create_heatmap(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
-        """Create a heatmap"""
+        """Create a correlation heatmap"""
         
         title = config.get('title', 'Heatmap')
+        method = config.get('method', 'pearson')
+        max_columns = config.get('max_columns', self.max_heatmap_columns)
         
-        # Create correlation matrix for numeric columns
-        numeric_cols = data.select_dtypes(include=[np.number]).columns
+        # Correlation matrix for numeric columns (cached per dataset)
+        numeric_cols = config.get('columns') or data.select_dtypes(include=[np.number]).columns.tolist()
         if len(numeric_cols) < 2:
             return self._create_error_chart("Heatmap requires at least 2 numeric columns")
         
-        corr_matrix = data[numeric_cols].corrwith(data[numeric_cols], method='pearson')
-        fig = px.imshow(corr_matrix, title=title, color_continuous_scale='RdBu_r',
-                       aspect='auto')
-        
-        # Add correlation values as text
-        fig.update_traces(text=np.around(np.array(corr_matrix.values), decimals=2),
-                         texttemplate="%{text}")
+        corr_matrix = correlation_matrix(data, method=method, columns=numeric_cols)
+        # Wide tables: only the columns involved in the strongest pairs are drawn
+        shown = select_columns_for_display(corr_matrix, max_columns)
+        corr_matrix = corr_matrix.loc[shown, shown]
+        if config.get('cluster', len(shown) > 10):
+            order = cluster_order(corr_matrix)
+            corr_matrix = corr_matrix.loc[order, order]
+        
+        z = np.round(corr_matrix.to_numpy(), 2)
+        labels = [str(c) for c in corr_matrix.columns]
+        heatmap = go.Heatmap(
+            z=z, x=labels, y=labels, zmin=-1, zmax=1,
+            colorscale='RdBu_r', colorbar=dict(title=method.capitalize()),
+            hovertemplate='%{y} / %{x}: %{z}<extra></extra>',
+        )
+        # Per-cell text labels only while they stay readable (and cheap)
+        if len(labels) <= config.get('annotation_limit', self.heatmap_annotation_limit):
+            heatmap.update(text=z, texttemplate="%{text}")
+        fig = go.Figure(heatmap)
+        fig.update_layout(title=title, yaxis=dict(autorange='reversed'))
         
-        self._apply_theme(fig)
+        self._apply_theme(fig, config)
         return fig
     
     def create_area_chart(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
@@ -203,27 +403,83 @@ class ChartGenerator:
         y_col = config.get('y_column')
         color_col = config.get('color_column')
         title = config.get('title', 'Area Chart')
+        data, y_col = self._reduce_for_plot(data, config, default_aggregation='sum', series=True,
+                                            downsample_method='minmax')
         
         fig = px.area(data, x=x_col, y=y_col, color=color_col, title=title,
-                     color_discrete_sequence=self.color_palette)
+                     color_discrete_sequence=self.color_palette,
+                     template=self._px_template(config))
         
-        self._apply_theme(fig)
+        self._apply_theme(fig, config)
         return fig
     
     def create_violin_plot(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
-        """Create a violin plot"""
+        """Create a violin plot from precomputed KDE curves, drawn as filled outlines"""
         
         x_col = config.get('x_column')
         y_col = config.get('y_column')
         color_col = config.get('color_column')
         title = config.get('title', 'Violin Plot')
+        points = config.get('kde_points', 60)
         
-        fig = px.violin(data, x=x_col, y=y_col, color=color_col, title=title,
-                       color_discrete_sequence=self.color_palette)
+        x_key, color_key, groups = self._distribution_groups(data, config)
+        x_labels = list(dict.fromkeys(str(x_value) for items in groups.values() for x_value, _ in items))
+        slot = 0.8 / max(1, len(groups))  # width available to each color within a category
         
-        self._apply_theme(fig)
+        fig = go.Figure()
+        for i, (color_value, items) in enumerate(groups.items()):
+            color = self.color_palette[i % len(self.color_palette)]
+            name = str(color_value) if color_key else y_col
+            for j, (x_value, values) in enumerate(items):
+                curve = kde_curve(values, points)
+                if curve is None:
+                    continue
+                grid, density = curve
+                center = x_labels.index(str(x_value)) - 0.4 + slot * (i + 0.5)
+                half_width = density / density.max() * slot * 0.45
+                fig.add_scatter(
+                    x=np.round(np.concatenate([center - half_width, (center + half_width)[::-1]]), 4),
+                    y=np.round(np.concatenate([grid, grid[::-1]]), 4),
+                    fill='toself', mode='lines', line=dict(color=color, width=1), name=name,
+                    legendgroup=name, showlegend=j == 0 and bool(color_key),
+                    hovertemplate=f'{x_value}<br>{y_col}: %{{y}}<extra>{name}</extra>',
+                )
+                fig.add_scatter(x=[center], y=[np.median(values)], mode='markers', legendgroup=name,
+                                marker=dict(color='white', line=dict(color=color, width=1), size=7),
+                                showlegend=False, hovertemplate=f'median: %{{y}}<extra>{x_value}</extra>')
+        fig.update_layout(title=title, xaxis=dict(tickvals=list(range(len(x_labels))), ticktext=x_labels,
+                                                  title=x_col if x_key else None),
+                          yaxis_title=y_col, legend_title_text=color_col if color_key else None)
+        
+        self._apply_theme(fig, config)
         return fig
     
+    def _distribution_groups(self, data: pd.DataFrame, config: Dict[str, Any]):
+        """
+        Splits y values for box/violin plots by color and then by x. Columns are
+        only used for grouping when they are categorical or low-cardinality.
+        Returns (x column or None, color column or None, {color: [(x, values)]}).
+        """
+        
+        x_col = config.get('x_column')
+        y_col = config.get('y_column')
+        color_col = config.get('color_column')
+        max_categories = config.get('max_categories', self.max_categories)
+        
+        def is_group_column(col):
+            return (col is not None and col != y_col and col in data.columns
+                    and (is_categorical(data[col]) or data[col].nunique() <= max_categories))
+        
+        x_key = x_col if is_group_column(x_col) else None
+        color_key = color_col if is_group_column(color_col) and color_col != x_key else None
+        keys = [c for c in (color_key, x_key) if c]
+        groups: Dict[Any, List[Tuple[Any, np.ndarray]]] = {}
+        for key, values in group_values(data, y_col, keys, max_categories * (max_categories if len(keys) > 1 else 1)):
+            color_value = key[0] if color_key else None
+            x_value = key[-1] if x_key else y_col
+            groups.setdefault(color_value, []).append((x_value, values))
+        return x_key, color_key, groups
+    
     def create_sunburst_chart(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
         """Create a sunburst chart"""
         
@@ -235,17 +491,78 @@ class ChartGenerator:
             return self._create_error_chart("Sunburst chart requires path columns")
         
         fig = px.sunburst(data, path=path_cols, values=values_col, title=title,
-                         color_discrete_sequence=self.color_palette)
+                         color_discrete_sequence=self.color_palette,
+                         template=self._px_template(config))
         
-        self._apply_theme(fig)
+        self._apply_theme(fig, config)
+        return fig
+    
+    def create_drilldown_chart(self, data: pd.DataFrame, config: Dict[str, Any]) -> go.Figure:
+        """
+        Create a drill-down bar chart of a match table, served from its aggregation
+        cube: one bar per member of the next level of the drill path below the
+        selection (e.g. seasons, then the teams of a season, then a team's matches).
+        """
+        
+        cube = get_aggregation_cube(data)
+        if cube is None:
+            return self._create_error_chart("Drill-down charts require a football match table")
+        
+        measure = config.get('measure', 'goals')
+        if measure not in cube.measures:
+            return self._create_error_chart(f"Unknown measure: {measure}")
+        path = config.get('path', DEFAULT_DRILL_PATH)
+        selection = config.get('selection') or {}
+        level, view = cube.drill(path, selection)
+        label = measure.replace('_', ' ').title()
+        
+        if level == MATCH_LEVEL:
+            view = view.sort_values('date', kind='mergesort')
+            x = view['date'].dt.strftime('%Y-%m-%d') + ' ' + view['venue'].map({'home': 'vs', 'away': '@'}) + ' ' + view['opponent']
+            y = view[measure]
+            hover = view['result']
+        else:
+            column = measure + PER_MATCH_SUFFIX if config.get('statistic') == 'per_match' else measure
+            if level != 'season':
+                view = view.sort_values(column, ascending=False, kind='mergesort')
+            x, y = view[level].astype(str), view[column]
+            hover = view[COUNT_COLUMN].astype(str) + ' matches'
+            if column != measure:
+                label += ' per match'
+        
+        breadcrumb = ' › '.join(str(selection[d]) for d in path if d in selection)
+        title = config.get('title') or f"{label} by {level}" + (f" — {breadcrumb}" if breadcrumb else '')
+        fig = go.Figure(go.Bar(
+            x=x.to_numpy(), y=y.to_numpy(), hovertext=hover.to_numpy(),
+            marker_color=self.color_palette[0], name=label,
+        ))
+        fig.update_layout(title=title, xaxis_title=level.title(), yaxis_title=label)
+        
+        self._apply_theme(fig, config)
         return fig
     
     def create_multi_chart(self, data: pd.DataFrame, configs: List[Dict[str, Any]]) -> go.Figure:
-        """Create a multi-chart layout"""
+        """
+        Create a multi-chart layout. Panels sharing a categorical x-axis are
+        aggregated together in one pass, the panels are built concurrently
+        without theming, and their traces go straight into the subplot grid
+        along with each panel's axis settings and color scale.
+        """
         
         if not configs:
             return self._create_error_chart("No chart configurations provided")
         
+        cache_key = None
+        try:
+            cache_key = self.figure_cache.make_key(
+                dataset_fingerprint(data), {'type': 'multi', 'panels': configs}, self.theme_key,
+                self.reduction_settings)
+            cached = self.figure_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logging.warning(f"Figure cache lookup failed: {e}")
+        
         # Determine subplot layout
         n_charts = len(configs)
         if n_charts == 1:
@@ -258,36 +575,162 @@ class ChartGenerator:
             rows = int(np.ceil(n_charts / 3))
             cols = min(3, n_charts)
         
-        # Create subplots
+        # Pie and sunburst traces live in 'domain' cells rather than x/y axes
+        specs = [[None] * cols for _ in range(rows)]
+        for i, config in enumerate(configs):
+            specs[i // cols][i % cols] = {'type': 'domain' if config.get('type') in DOMAIN_CHART_TYPES else 'xy'}
+        for i in range(n_charts, rows * cols):
+            specs[i // cols][i % cols] = {'type': 'xy'}
+        
+        from plotly.subplots import make_subplots  # only dashboards need it; loaded on first use
         fig = make_subplots(
-            rows=rows, cols=cols,
+            rows=rows, cols=cols, specs=specs,
             subplot_titles=[config.get('title', f'Chart {i+1}') for i, config in enumerate(configs)]
         )
         
-        # Add charts to subplots
-        for i, config in enumerate(configs):
-            row = (i // cols) + 1
-            col = (i % cols) + 1
-            
-            # Create individual chart
-            chart = self.create_chart(data, config)
-            
-            # Add traces to subplot
-            for trace in chart.data:
-                fig.add_trace(trace, row=row, col=col)
+        panels = self._build_panels(data, configs)
+        traces, trace_rows, trace_cols = [], [], []
+        coloraxes = 0
+        for i, panel in enumerate(panels):
+            row, col = (i // cols) + 1, (i % cols) + 1
+            if isinstance(panel, Exception):
+                if specs[row - 1][col - 1]['type'] == 'xy':
+                    fig.add_annotation(text=f"Error: {panel}", x=0.5, y=0.5, xref='x domain', yref='y domain',
+                                       showarrow=False, font=dict(color='red'), row=row, col=col)
+                continue
+            coloraxes += self._place_panel_layout(fig, panel, row, col, coloraxes + 1)
+            traces.extend(panel.data)
+            trace_rows.extend([row] * len(panel.data))
+            trace_cols.extend([col] * len(panel.data))
+        if traces:
+            fig.add_traces(traces, rows=trace_rows, cols=trace_cols)
         
         # Update layout
         fig.update_layout(
             title_text="Multi-Chart Dashboard",
             showlegend=True,
+            height=max(600, 350 * rows),
             plot_bgcolor=self.layout_theme['plot_bgcolor'],
             paper_bgcolor=self.layout_theme['paper_bgcolor'],
             font_color=self.layout_theme['font_color'],
-            gridcolor=self.layout_theme['gridcolor']
         )
+        fig.update_xaxes(gridcolor=self.layout_theme['gridcolor'])
+        fig.update_yaxes(gridcolor=self.layout_theme['gridcolor'])
         
+        if cache_key is not None and not any(isinstance(panel, Exception) for panel in panels):
+            self.figure_cache.put(cache_key, fig)
         return fig
     
+    @staticmethod
+    def _place_panel_layout(fig: go.Figure, panel: go.Figure, row: int, col: int, coloraxis_number: int) -> int:
+        """
+        Copies a panel's axis settings (titles, category order, tick labels,
+        reversed ranges) onto its subplot axes and moves its color scale into
+        the grid: the panel's coloraxis becomes coloraxis{n} and every colorbar
+        is drawn beside the panel's cell. Returns the number of coloraxes added.
+        """
+        subplot = fig.get_subplot(row, col)
+        if hasattr(subplot, 'xaxis'):
+            for axis, panel_axis in ((subplot.xaxis, panel.layout.xaxis), (subplot.yaxis, panel.layout.yaxis)):
+                settings = {k: v for k, v in panel_axis.to_plotly_json().items() if k not in GRID_AXIS_KEYS}
+                axis.update(settings)
+            x_domain, y_domain = subplot.xaxis.domain, subplot.yaxis.domain
+        else:
+            x_domain, y_domain = subplot.x, subplot.y
+        colorbar = dict(x=x_domain[1] + 0.01, xanchor='left', y=sum(y_domain) / 2, yanchor='middle',
+                        len=y_domain[1] - y_domain[0], thickness=12)
+        
+        for trace in panel.data:
+            if 'colorbar' in trace:
+                trace.colorbar.update(colorbar)
+        uses_coloraxis = any(trace['coloraxis'] if 'coloraxis' in trace else
+                             ('marker' in trace and 'coloraxis' in trace.marker and trace.marker.coloraxis)
+                             for trace in panel.data)
+        if not uses_coloraxis:
+            return 0
+        name = 'coloraxis' if coloraxis_number == 1 else f'coloraxis{coloraxis_number}'
+        for trace in panel.data:
+            if 'coloraxis' in trace and trace.coloraxis:
+                trace.coloraxis = name
+            if 'marker' in trace and 'coloraxis' in trace.marker and trace.marker.coloraxis:
+                trace.marker.coloraxis = name
+        coloraxis = panel.layout.coloraxis.to_plotly_json()
+        coloraxis.setdefault('colorbar', {}).update(colorbar)
+        fig.layout[name] = coloraxis
+        return 1
+    
+    def _build_panels(self, data: pd.DataFrame, configs: List[Dict[str, Any]]) -> List[Union[go.Figure, Exception]]:
+        """Builds un-themed panel figures in a thread pool; failed panels come back as their exception."""
+        
+        reduced = self._shared_reductions(data, configs)
+        jobs = []
+        for i, config in enumerate(configs):
+            panel_config = dict(config, **{PANEL_KEY: True})
+            panel_data = data
+            if i in reduced:
+                panel_data = reduced[i]
+                panel_config[REDUCED_KEY] = True
+            jobs.append((panel_data, panel_config))
+        
+        def build(job):
+            try:
+                return self._build_chart(*job)
+            except Exception as e:
+                logging.warning(f"Dashboard panel '{job[1].get('title')}' failed: {e}")
+                return e
+        
+        workers = min(len(jobs), self.max_workers)
+        if workers <= 1:
+            return [build(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(build, jobs))
+    
+    def _shared_reductions(self, data: pd.DataFrame, configs: List[Dict[str, Any]]) -> Dict[int, pd.DataFrame]:
+        """
+        Aggregates every bar/line/area panel that groups by the same categorical
+        x (and color) with one groupby over all of their y columns. Returns the
+        reduced data per panel index; other panels reduce their own data.
+        """
+        
+        groups: Dict[Tuple, List[Tuple[int, str]]] = {}
+        temporal: Dict[str, bool] = {}
+        for i, config in enumerate(configs):
+            chart_type = config.get('type')
+            if chart_type not in SHARED_AGGREGATIONS:
+                continue
+            x_col, y_col, color_col = config.get('x_column'), config.get('y_column'), config.get('color_column')
+            aggregation = config.get('aggregation', SHARED_AGGREGATIONS[chart_type])
+            if (x_col not in data.columns or y_col not in data.columns or x_col == y_col
+                    or (color_col is not None and color_col not in data.columns)
+                    or aggregation == 'count' or not is_categorical(data[x_col])):
+                continue
+            if chart_type != 'bar':
+                # Text dates are plotted as time series by the panel itself
+                if x_col not in temporal:
+                    temporal[x_col] = as_temporal(data[x_col]) is not None
+                if temporal[x_col]:
+                    continue
+            groups.setdefault((x_col, color_col, aggregation), []).append((i, y_col))
+        
+        reduced = {}
+        for (x_col, color_col, aggregation), panels in groups.items():
+            keys = [x_col] + ([color_col] if color_col and color_col != x_col else [])
+            y_cols = list(dict.fromkeys(y for _, y in panels if y not in keys))
+            if not y_cols:
+                continue
+            table = (data.groupby(keys, observed=True, sort=True, dropna=False)[y_cols]
+                     .agg(aggregation).reset_index())
+            for i, y_col in panels:
+                if y_col not in y_cols:
+                    continue
+                max_categories = configs[i].get('max_categories', self.max_categories)
+                if table[x_col].nunique(dropna=False) <= max_categories:
+                    reduced[i] = table[keys + [y_col]]
+                else:
+                    # Rare: the panel folds its own rows into 'Other', so that bar is exact for its aggregation
+                    reduced[i] = limit_categories(data[keys + [y_col]], x_col, y_col, max_categories, aggregation, color_col)
+        return reduced
+    
     def create_dashboard(self, data: pd.DataFrame, dashboard_config: Dict[str, Any]) -> go.Figure:
         """Create a comprehensive dashboard"""
         
@@ -324,29 +767,85 @@ class ChartGenerator:
         # Create multi-chart layout
         return self.create_multi_chart(data, charts)
     
-    def _apply_theme(self, fig: go.Figure):
-        """Apply consistent theme to charts"""
+    def _reduce_for_plot(
+        self,
+        data: pd.DataFrame,
+        config: Dict[str, Any],
+        default_aggregation: str = 'sum',
+        series: bool = False,
+        downsample_method: str = 'lttb',
+    ) -> Tuple[pd.DataFrame, Optional[str]]:
+        """
+        Shrinks the data to what the chart can actually show before it is handed
+        to plotly: categorical x-axes are aggregated to one value per category
+        (capped at max_categories), and long series are aggregated per x value and
+        downsampled to the point budget. Returns the reduced data and the y column.
+        """
+        x_col = config.get('x_column')
+        y_col = config.get('y_column')
+        color_col = config.get('color_column')
+        if x_col is None or x_col not in data.columns:
+            return data, y_col
+        if config.get(REDUCED_KEY):
+            return data, y_col  # already aggregated by the dashboard's shared pass
+
+        aggregation = config.get('aggregation', default_aggregation)
+        point_budget = config.get('point_budget', self.point_budget)
+        max_categories = config.get('max_categories', self.max_categories)
+        columns = [c for c in dict.fromkeys([x_col, y_col, color_col]) if c]
+        data = data[columns]
+
+        if series and is_categorical(data[x_col]):
+            # Text dates (e.g. MatchDate in the EPL CSV) are plotted as a time series
+            temporal = as_temporal(data[x_col])
+            if temporal is not None:
+                data = data.assign(**{x_col: temporal})
+
+        if is_categorical(data[x_col]):
+            reduced = limit_categories(data, x_col, y_col, max_categories, aggregation, color_col)
+            return reduced, y_col or 'count'
+
+        if len(data) <= point_budget or y_col is None:
+            return data, y_col
+        reduced = aggregate_by(data, x_col, y_col, color_col, aggregation)
+        if len(reduced) > point_budget:
+            reduced = downsample_series(reduced, x_col, y_col, point_budget, color_col, downsample_method)
+        return reduced, y_col
+
+    def _build_theme_layout(self) -> Dict[str, Any]:
+        """Layout properties shared by every themed chart"""
         
-        fig.update_layout(
+        return dict(
             plot_bgcolor=self.layout_theme['plot_bgcolor'],
             paper_bgcolor=self.layout_theme['paper_bgcolor'],
             font=dict(color=self.layout_theme['font_color']),
-            title=dict(
-                text=fig.layout["title"]["text"] if "title" in fig.layout and "text" in fig.layout["title"] else '',
-                font=dict(size=20, color=self.layout_theme['font_color'])
-            ),
+            title=dict(font=dict(size=16, color=self.layout_theme['font_color'])),
             legend=dict(
                 title=dict(text='Legend', font=dict(size=14, color=self.layout_theme['font_color'])),
                 font=dict(size=12, color=self.layout_theme['font_color'])
             ),
             height=600,
             width=800,
-            title_font_size=16,
-            title_font_color=self.layout_theme['font_color'],
             xaxis=dict(gridcolor=self.layout_theme['gridcolor']),
             yaxis=dict(gridcolor=self.layout_theme['gridcolor'])
         )
     
+    def _px_template(self, config: Dict[str, Any]) -> Optional[str]:
+        """
+        Dashboard panels are built without a template: only their traces are
+        kept, and the assembled figure carries the template. Building plotly's
+        default template dominates the cost of small express figures.
+        """
+        return 'none' if config.get(PANEL_KEY) else None
+    
+    def _apply_theme(self, fig: go.Figure, config: Optional[Dict[str, Any]] = None):
+        """Apply consistent theme to charts"""
+        
+        if config and config.get(PANEL_KEY):
+            return  # dashboard panels are themed once, on the assembled figure
+        # update_layout merges nested dicts, so the existing title text is kept
+        fig.update_layout(self._theme_layout)
+    
     def _create_error_chart(self, error_message: str) -> go.Figure:
         """Create an error chart when visualization fails"""
         
@@ -364,78 +863,40 @@ class ChartGenerator:
             plot_bgcolor=self.layout_theme['plot_bgcolor'],
             paper_bgcolor=self.layout_theme['paper_bgcolor'],
             font_color=self.layout_theme['font_color'],
-            gridcolor=self.layout_theme['gridcolor'],
+            xaxis=dict(gridcolor=self.layout_theme['gridcolor']),
+            yaxis=dict(gridcolor=self.layout_theme['gridcolor']),
             height=400,
             width=600
-    
         )
         
         return fig
     
-    def get_chart_suggestions(self, data: pd.DataFrame) -> List[Dict[str, Any]]:
-        """Get suggested chart configurations based on data characteristics"""
+    def get_chart_suggestions(self, data: pd.DataFrame, k: int = 6) -> List[Dict[str, Any]]:
+        """Get suggested chart configurations, ranked by how informative they are for this data"""
         
-        suggestions = []
-        
-        numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-        categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
-        
-        # Bar chart suggestions
-        if categorical_cols and numeric_cols:
-            suggestions.append({
-                'type': 'bar',
-                'x_column': categorical_cols[0],
-                'y_column': numeric_cols[0],
-                'title': f'{numeric_cols[0]} by {categorical_cols[0]}',
-                'description': 'Compare values across categories'
-            })
-        
-        # Scatter plot suggestions
-        if len(numeric_cols) >= 2:
-            suggestions.append({
-                'type': 'scatter',
-                'x_column': numeric_cols[0],
-                'y_column': numeric_cols[1],
-                'title': f'{numeric_cols[1]} vs {numeric_cols[0]}',
-                'description': 'Explore relationship between two variables'
-            })
-        
-        # Histogram suggestions
-        for col in numeric_cols[:2]:
-            suggestions.append({
-                'type': 'histogram',
-                'x_column': col,
-                'title': f'Distribution of {col}',
-                'description': 'Understand data distribution'
-            })
-        
-        # Pie chart suggestions
-        for col in categorical_cols[:2]:
-            suggestions.append({
-                'type': 'pie',
-                'names_column': col,
-                'title': f'{col} Distribution',
-                'description': 'Show category proportions'
-            })
-        
-        # Correlation heatmap
-        if len(numeric_cols) > 2:
-            suggestions.append({
-                'type': 'heatmap',
-                'title': 'Correlation Heatmap',
-                'description': 'Identify relationships between variables'
-            })
-        
-        return suggestions
+        # Scored from the cached profile (cardinality, spread, mutual information, time axes)
+        return recommend_charts(data, k)
     
     def export_chart(self, fig: go.Figure, format: str = 'png', width: int = 800, height: int = 600) -> bytes:
         """Export chart as image or HTML"""
         
-        if format == 'png':
-            return fig.to_image(format='png', width=width, height=height)
-        elif format == 'html':
+        if format == 'html':
             return fig.to_html().encode('utf-8')
-        elif format == 'svg':
-            return fig.to_image(format='svg', width=width, height=height)
+        elif format in ('png', 'svg', 'pdf'):
+            # Rendered by the shared exporter's warm renderer processes, and cached
+            return get_chart_exporter().export(fig, format, width=width, height=height)
         else:
             raise ValueError(f"Unsupported export format: {format}")
+    
+    def export_charts(self, figures: List[go.Figure], formats: Optional[List[str]] = None, archive: str = 'zip',
+                      width: int = 800, height: int = 600) -> bytes:
+        """Export several charts at once, as a zip of files (PNG by default) or as a multi-page PDF"""
+        
+        formats = formats if formats is not None else ['png']
+        exporter = get_chart_exporter()
+        if archive == 'zip':
+            return exporter.export_zip(figures, formats, width=width, height=height)
+        elif archive == 'pdf':
+            return exporter.export_pdf(figures, width=width, height=height)
+        else:
+            raise ValueError(f"Unsupported export archive: {archive}")
@@ -0,0 +1,300 @@
+# utils/chart_recommender.py
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.chart_reduction import as_temporal
+from utils.correlation import correlation_matrix, strongest_pairs
+from utils.data_profiler import DatasetProfile, get_profile
+from utils.query_engine import normalize_column_name
+
+MAX_CACHED_RECOMMENDATIONS = 16
+# A time axis is named after its unit: "MatchDate", "Season", "date_of_birth" (not "FullTimeGoals")
+TEMPORAL_LAST_WORDS = {"date", "time", "timestamp", "datetime", "season", "year", "month", "week", "day", "period"}
+TEMPORAL_FIRST_WORDS = {"date", "datetime", "timestamp", "season", "year", "month"}
+# Numeric codes that are not quantities ("NationalityId", "PostCode", "player_no")
+IDENTIFIER_NAME_PATTERN = re.compile(r"(id|code|number|no)$", re.IGNORECASE)
+# Words that split one measure into variants ("FullTimeHomeGoals", "HalfTimeAwayGoals" are both goals)
+MEASURE_VARIANT_WORDS = {"home", "away", "full", "half", "time", "ht", "ft", "for", "against", "total"}
+
+_lock = threading.Lock()
+_candidate_cache: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+
+
+def _entropy(counts: np.ndarray) -> float:
+    p = counts[counts > 0] / counts.sum()
+    return float(-(p * np.log(p)).sum())
+
+
+def mutual_information(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Share of b's entropy explained by a (both integer codes >= 0), with the
+    Miller-Madow correction so high-cardinality keys are not favoured by
+    chance alone. Returns a value in [0, 1].
+    """
+    na, nb = int(a.max()) + 1, int(b.max()) + 1
+    joint = np.bincount(a * nb + b, minlength=na * nb).reshape(na, nb).astype(np.float64)
+    n = joint.sum()
+    h_b = _entropy(joint.sum(axis=0))
+    if not n or h_b <= 0:
+        return 0.0
+    mi = _entropy(joint.sum(axis=0)) + _entropy(joint.sum(axis=1)) - _entropy(joint.ravel())
+    occupied_a, occupied_b = np.count_nonzero(joint.sum(axis=1)), np.count_nonzero(joint.sum(axis=0))
+    mi -= (occupied_a - 1) * (occupied_b - 1) / (2 * n)
+    return float(np.clip(mi / h_b, 0.0, 1.0))
+
+
+def _is_temporal_name(column) -> bool:
+    words = normalize_column_name(column).split()
+    return bool(words) and (words[-1] in TEMPORAL_LAST_WORDS or words[0] in TEMPORAL_FIRST_WORDS)
+
+
+def _chart_columns(config: Dict[str, Any]) -> List[str]:
+    return [config[f] for f in ('x_column', 'y_column', 'names_column') if config.get(f) is not None]
+
+
+def _measure_family(column) -> str:
+    words = [w for w in normalize_column_name(column).split() if w not in MEASURE_VARIANT_WORDS]
+    return " ".join(words) or normalize_column_name(column)
+
+
+def _category_codes(series: pd.Series) -> np.ndarray:
+    codes = pd.factorize(series, use_na_sentinel=True)[0]
+    return np.where(codes < 0, codes.max() + 1, codes)
+
+
+def _quantile_codes(values: np.ndarray, bins: int) -> np.ndarray:
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return np.zeros(len(values), dtype=np.int64)
+    edges = np.unique(np.quantile(values[valid], np.linspace(0, 1, bins + 1)[1:-1]))
+    codes = np.searchsorted(edges, values, side="right")
+    return np.where(valid, codes, len(edges) + 1)
+
+
+class ChartRecommender:
+    """
+    Ranks candidate charts for a dataset. Column roles (measure, dimension,
+    time axis, identifier) come from the cached dataset profile; pairs are
+    scored on a row sample by how much a dimension explains a measure
+    (normalized mutual information) and by correlation strength, so a
+    ranking costs milliseconds and never an LLM call.
+    """
+
+    def __init__(self, sample_rows: int = 20000, max_categories: int = 50, measure_bins: int = 10):
+        self.sample_rows = sample_rows
+        self.max_categories = max_categories
+        self.measure_bins = measure_bins
+
+    def recommend(self, data: pd.DataFrame, k: int = 5, columns: Optional[Iterable] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k chart configs, best first, each with a 'score' and a 'description'.
+        `columns` keeps only the charts that use as many of those columns as
+        any chart does (both of "shots by season" before either alone). Focus
+        columns no ranked chart uses (e.g. ones too sparse to score) still get
+        single-column charts, and a scatter for a pair of numeric ones.
+        """
+        candidates = self._ranked_candidates(data)
+        if columns is not None:
+            focus = {c for c in columns if c in data.columns}
+            candidates = candidates + self._focus_candidates(data, focus, candidates)
+            candidates.sort(key=lambda c: -c['score'])
+            coverage = [len(focus & set(_chart_columns(c))) for c in candidates]
+            most = max(coverage, default=0)
+            candidates = [c for c, covered in zip(candidates, coverage) if covered and covered == most]
+        return [dict(c) for c in self._diversify(candidates, k)]
+
+    def _ranked_candidates(self, data: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Every scored candidate for the dataset, best first; cached per dataset fingerprint."""
+        profile = get_profile(data)
+        key = (profile.fingerprint, self.sample_rows, self.max_categories, self.measure_bins)
+        with _lock:
+            cached = _candidate_cache.get(key)
+            if cached is not None:
+                _candidate_cache.move_to_end(key)
+                return cached
+
+        candidates = sorted(self._candidates(data, profile), key=lambda c: -c['score'])
+        logging.info(f"ChartRecommender scored {len(candidates)} candidate charts for {len(profile.columns)} columns.")
+        with _lock:
+            _candidate_cache[key] = candidates
+            while len(_candidate_cache) > MAX_CACHED_RECOMMENDATIONS:
+                _candidate_cache.popitem(last=False)
+        return candidates
+
+    def _focus_candidates(self, data: pd.DataFrame, focus: set, ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Charts built on demand for focus columns, unless the ranked candidates already cover them."""
+        covered = {c for candidate in ranked for c in _chart_columns(candidate)}
+        profile = get_profile(data)
+        numeric = [c for c in data.columns if c in focus and profile.column_profiles[c].is_numeric]
+        extra = []
+        for c in data.columns:
+            if c not in focus or c in covered:
+                continue
+            p = profile.column_profiles[c]
+            if p.count == 0:
+                continue
+            if p.is_numeric:
+                extra.append(self._config('histogram', 0.2, f"Shape of the {c} distribution",
+                                          x_column=c, title=f"Distribution of {c}"))
+            elif p.unique <= 8:
+                extra.append(self._config('pie', 0.2, f"Share of rows in each {c} category",
+                                          names_column=c, title=f"{c} distribution"))
+            else:
+                # No y column: the bar chart counts rows per category, keeping the largest ones
+                extra.append(self._config('bar', 0.2, f"Rows per {c}, most frequent first",
+                                          x_column=c, title=f"Rows per {c}"))
+        scattered = {frozenset((c['x_column'], c['y_column'])) for c in ranked if c['type'] == 'scatter'}
+        if len(numeric) >= 2 and frozenset(numeric[:2]) not in scattered:
+            a, b = numeric[:2]
+            r = data[a].corr(data[b])
+            r = 0.0 if pd.isna(r) else float(r)
+            extra.append(self._config('scatter', abs(r), f"{a} and {b} (r = {r:.2f})",
+                                      x_column=a, y_column=b, title=f"{b} vs {a}"))
+        return extra
+
+    # --- Column roles ---
+
+    def _roles(self, sample: pd.DataFrame, profile: DatasetProfile) -> Tuple[List[str], List[str], Dict[str, np.ndarray]]:
+        """
+        Splits columns into measures, dimensions and time axes (with the sample's
+        rows bucketed along each time axis); identifiers are dropped.
+        """
+        measures, dimensions, temporal = [], [], {}
+        for c in profile.columns:
+            p = profile.column_profiles[c]
+            if p.count == 0 or p.unique <= 1:
+                continue
+            if p.is_numeric:
+                if _is_temporal_name(c) and p.unique <= self.max_categories:
+                    temporal[c] = _category_codes(sample[c])  # e.g. a "Year" column
+                elif p.std and p.unique > 2 and not IDENTIFIER_NAME_PATTERN.search(str(c)):
+                    measures.append(c)
+                if p.unique <= min(self.max_categories, 12):
+                    dimensions.append(c)  # small integer codes also work as categories
+                continue
+            parsed = as_temporal(sample[c]) if _is_temporal_name(c) or \
+                pd.api.types.is_datetime64_any_dtype(sample[c]) else None
+            if parsed is not None:
+                points = parsed.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64)
+                points[parsed.isna().to_numpy()] = np.nan
+                temporal[c] = _quantile_codes(points, 20)
+            elif _is_temporal_name(c) and p.unique <= self.max_categories:
+                # Ordered period labels that are not dates, e.g. seasons like "2000/01"
+                temporal[c] = _category_codes(sample[c])
+            elif p.unique <= self.max_categories and p.unique < 0.9 * p.count:
+                dimensions.append(c)
+        return measures, dimensions, temporal
+
+    # --- Scoring ---
+
+    def _candidates(self, data: pd.DataFrame, profile: DatasetProfile) -> List[Dict[str, Any]]:
+        sample = data if len(data) <= self.sample_rows else data.sample(self.sample_rows, random_state=0)
+        measures, dimensions, temporal = self._roles(sample, profile)
+        measure_codes = {m: _quantile_codes(sample[m].to_numpy(dtype=np.float64, na_value=np.nan), self.measure_bins)
+                         for m in measures}
+        candidates = []
+
+        for d in dimensions:
+            unique = profile.column_profiles[d].unique
+            codes = _category_codes(sample[d])
+            # Bars read best with a handful to a few dozen categories
+            readability = 1.0 if 3 <= unique <= 20 else (0.8 if unique == 2 else 0.7)
+            for m in measures:
+                if m == d:
+                    continue
+                mi = mutual_information(codes, measure_codes[m])
+                candidates.append(self._config(
+                    'bar', mi * readability, f"{d} explains {mi:.0%} of the variation in {m}",
+                    x_column=d, y_column=m, aggregation='mean', title=f"Average {m} by {d}"))
+                if unique <= 12:
+                    candidates.append(self._config(
+                        'box', mi * readability * 0.9, f"Distribution of {m} differs across {d}",
+                        x_column=d, y_column=m, title=f"{m} by {d}"))
+
+        for t, codes in temporal.items():
+            for m in measures:
+                mi = mutual_information(codes, measure_codes[m])
+                # Trends over time are worth showing even when the change is modest
+                candidates.append(self._config(
+                    'line', 0.15 + mi, f"{m} changes over {t} ({mi:.0%} of its variation)",
+                    x_column=t, y_column=m, title=f"{m} over {t}"))
+
+        for d in dimensions:
+            p = profile.column_profiles[d]
+            if 2 <= p.unique <= 8 and not p.is_numeric:
+                counts = sample[d].value_counts().to_numpy()
+                balance = _entropy(counts) / np.log(len(counts)) if len(counts) > 1 else 0.0
+                candidates.append(self._config(
+                    'pie', 0.35 * balance, f"Share of rows in each {d} category",
+                    names_column=d, title=f"{d} distribution"))
+
+        for m in measures:
+            p = profile.column_profiles[m]
+            skew = abs(p.mean - p.median) / p.std if p.std and p.median is not None else 0.0
+            candidates.append(self._config(
+                'histogram', 0.25 + 0.2 * min(1.0, p.unique / 50) + 0.2 * min(1.0, skew),
+                f"Shape of the {m} distribution", x_column=m, title=f"Distribution of {m}"))
+
+        if len(measures) >= 2:
+            matrix = correlation_matrix(data, columns=measures)
+            pairs = strongest_pairs(matrix, top_n=10)
+            for a, b, r in pairs.itertuples(index=False):
+                if 0.3 <= abs(r) < 0.98:  # near-perfect correlations are usually derived columns
+                    candidates.append(self._config(
+                        'scatter', abs(r), f"{a} and {b} are {'positively' if r > 0 else 'negatively'} "
+                        f"correlated (r = {r:.2f})", x_column=a, y_column=b, title=f"{b} vs {a}"))
+            if len(measures) >= 4:
+                top = np.abs(pairs['correlation'].to_numpy()[:5])
+                candidates.append(self._config(
+                    'heatmap', float(top.mean()) * 0.8 if len(top) else 0.0,
+                    "How the numeric columns relate to each other", title="Correlation Heatmap"))
+
+        return candidates
+
+    @staticmethod
+    def _config(chart_type: str, score: float, description: str, **params) -> Dict[str, Any]:
+        return {'type': chart_type, **params, 'score': round(float(score), 4), 'description': description}
+
+    @staticmethod
+    def _diversify(candidates: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """
+        Greedy top-k over score-sorted candidates that discounts chart types,
+        columns and measure families (all the goals columns, say) already picked.
+        """
+        remaining = list(candidates)
+        picked: List[Dict[str, Any]] = []
+        type_uses: Dict[str, int] = {}
+        column_uses: Dict[str, int] = {}
+        family_uses: Dict[str, int] = {}
+
+        def adjusted(candidate):
+            columns = _chart_columns(candidate)
+            reuse = sum(column_uses.get(c, 0) for c in columns)
+            family_reuse = sum(family_uses.get(f, 0) for f in {_measure_family(c) for c in columns})
+            return candidate['score'] * 0.7 ** type_uses.get(candidate['type'], 0) * 0.85 ** reuse * 0.7 ** family_reuse
+
+        while remaining and len(picked) < k:
+            best = max(range(len(remaining)), key=lambda i: adjusted(remaining[i]))
+            choice = remaining.pop(best)
+            picked.append(choice)
+            type_uses[choice['type']] = type_uses.get(choice['type'], 0) + 1
+            for c in _chart_columns(choice):
+                column_uses[c] = column_uses.get(c, 0) + 1
+            for f in {_measure_family(c) for c in _chart_columns(choice)}:
+                family_uses[f] = family_uses.get(f, 0) + 1
+        return picked
+
+
+_default_recommender = ChartRecommender()
+
+
+def recommend_charts(data: pd.DataFrame, k: int = 5, columns: Optional[Iterable] = None) -> List[Dict[str, Any]]:
+    """Ranked chart suggestions from the shared recommender (scored once per dataset)."""
+    return _default_recommender.recommend(data, k, columns)
@@ -0,0 +1,223 @@
+# utils/chart_reduction.py
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+AGGREGATIONS = {"sum", "mean", "median", "min", "max", "count"}
+
+
+def is_categorical(series: pd.Series) -> bool:
+    """True for text, category and bool columns."""
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series):
+        return True
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+        return False
+    return True
+
+
+def as_temporal(series: pd.Series, min_parsed_ratio: float = 0.9) -> Optional[pd.Series]:
+    """Parses a text column as dates if nearly all values parse; otherwise returns None."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if pd.api.types.is_numeric_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+    if not len(series):
+        return None
+    # Parse each distinct value once; text date columns repeat heavily
+    codes, uniques = pd.factorize(series)
+    parsed_uniques = pd.to_datetime(pd.Series(uniques), errors="coerce", format="mixed")
+    if parsed_uniques.notna().mean() < min_parsed_ratio:
+        return None
+    parsed = parsed_uniques.to_numpy()[np.where(codes >= 0, codes, 0)]
+    parsed[codes < 0] = np.datetime64("NaT")
+    return pd.Series(parsed, index=series.index, name=series.name)
+
+
+def aggregate_by(
+    data: pd.DataFrame,
+    x: str,
+    y: Optional[str],
+    color: Optional[str] = None,
+    agg: str = "sum",
+) -> pd.DataFrame:
+    """One row per (x, color) with y aggregated; rows are counted when y is missing."""
+    keys = [x] + ([color] if color and color != x else [])
+    grouped = data.groupby(keys, observed=True, sort=True, dropna=False)
+    if y is None or agg == "count":
+        out = grouped.size().rename(y or "count").reset_index()
+    else:
+        out = grouped[y].agg(agg if agg in AGGREGATIONS else "sum").reset_index()
+    return out
+
+
+def limit_categories(
+    data: pd.DataFrame,
+    x: str,
+    y: Optional[str],
+    max_categories: int,
+    agg: str = "sum",
+    color: Optional[str] = None,
+    other_label: str = "Other",
+) -> pd.DataFrame:
+    """
+    aggregate_by(data, x, y, color, agg) with at most max_categories x values:
+    the categories ranking highest by the same aggregation are kept and the
+    rest become one 'Other' bar. Other is aggregated from the folded rows
+    themselves, so it is exact for every aggregation (the mean of all their
+    rows, not a sum or mean of category means).
+    """
+    reduced = aggregate_by(data, x, y, color, agg)
+    if reduced[x].nunique(dropna=False) <= max_categories:
+        return reduced
+    scores = aggregate_by(data, x, y, None, agg)
+    keep = scores.nlargest(max_categories - 1, y or "count")[x]
+    mask = data[x].isin(keep)
+    other = aggregate_by(data.loc[~mask].assign(**{x: other_label}), x, y, color, agg)
+    return pd.concat([reduced[reduced[x].isin(keep)], other[reduced.columns]], ignore_index=True)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of the
+    n_out points that best preserve the visual shape of the (x-sorted) series.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area)) if len(area) else start
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Keeps the minimum and maximum of each of n_out / 2 buckets (preserves spikes)."""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    buckets = np.arange(n) * (n_out // 2) // n
+    frame = pd.DataFrame({"y": y, "bucket": buckets})
+    grouped = frame.groupby("bucket")["y"]
+    picked = np.concatenate([grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy()])
+    return np.unique(picked)
+
+
+def downsample_series(
+    data: pd.DataFrame,
+    x: str,
+    y: str,
+    point_budget: int,
+    color: Optional[str] = None,
+    method: str = "lttb",
+) -> pd.DataFrame:
+    """Sorts by x and downsamples each color series to its share of the point budget."""
+    data = data.sort_values(x, kind="mergesort")
+    groups: List[pd.DataFrame] = [g for _, g in data.groupby(color, observed=True, sort=False)] if color else [data]
+    per_series = max(3, point_budget // max(1, len(groups)))
+    parts = []
+    for group in groups:
+        values = group[y].to_numpy(dtype=np.float64, na_value=np.nan)
+        if len(group) <= per_series:
+            parts.append(group)
+            continue
+        if method == "minmax":
+            idx = minmax_indices(values, per_series)
+        else:
+            positions = group[x]
+            x_values = positions.to_numpy().astype("datetime64[ns]").astype(np.int64) \
+                if pd.api.types.is_datetime64_any_dtype(positions) else positions.to_numpy(dtype=np.float64)
+            idx = lttb_indices(x_values, np.nan_to_num(values), per_series)
+        parts.append(group.iloc[idx])
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+
+
+def group_values(
+    data: pd.DataFrame,
+    value_column: str,
+    keys: List[str],
+    max_groups: Optional[int] = None,
+) -> List[Tuple[tuple, np.ndarray]]:
+    """
+    Splits a numeric column by the key columns without copying the frame.
+    Returns (key tuple, non-null float values) pairs in key order, keeping the
+    max_groups largest groups.
+    """
+    values = data[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    if not keys:
+        return [((), values[~np.isnan(values)])]
+    indices = data.groupby(keys, observed=True, sort=True, dropna=False).indices
+    if max_groups is not None and len(indices) > max_groups:
+        largest = sorted(indices, key=lambda k: len(indices[k]), reverse=True)[:max_groups]
+        indices = {k: indices[k] for k in sorted(largest, key=str)}
+    groups = []
+    for key, idx in indices.items():
+        group = values[idx]
+        groups.append((key if isinstance(key, tuple) else (key,), group[~np.isnan(group)]))
+    return groups
+
+
+def histogram_counts(values: np.ndarray, bins: int, value_range: Optional[Tuple[float, float]] = None):
+    """Bin counts and edges for non-null values (np.histogram)."""
+    values = values[~np.isnan(values)]
+    if value_range is None and len(values):
+        value_range = (float(values.min()), float(values.max()))
+    return np.histogram(values, bins=bins, range=value_range)
+
+
+def box_summary(values: np.ndarray, max_outliers: int = 100) -> Optional[Dict[str, Any]]:
+    """
+    Five-number summary with Tukey fences (1.5 IQR, clipped to the data) and
+    the mean, plus at most max_outliers outliers spread over their range.
+    """
+    if not len(values):
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = np.sort(values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)])
+    if len(outliers) > max_outliers:
+        # Evenly spaced picks keep the most extreme values on both ends
+        outliers = outliers[np.linspace(0, len(outliers) - 1, max_outliers).round().astype(int)]
+    return {
+        "q1": float(q1), "median": float(median), "q3": float(q3),
+        "lowerfence": float(inside.min()), "upperfence": float(inside.max()),
+        "mean": float(values.mean()), "outliers": outliers, "count": int(len(values)),
+    }
+
+
+def kde_curve(values: np.ndarray, points: int = 100, grid_size: int = 512) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Gaussian kernel density estimate over [min, max], evaluated on a binned
+    grid (histogram + kernel convolution), so the cost is linear in the number
+    of values. Uses Silverman's rule for the bandwidth.
+    """
+    if not len(values):
+        return None
+    low, high = float(values.min()), float(values.max())
+    spread = min(values.std(), (np.percentile(values, 75) - np.percentile(values, 25)) / 1.34) or values.std()
+    bandwidth = 0.9 * spread * len(values) ** -0.2 if spread > 0 else 0.0
+    if bandwidth <= 0 or high == low:
+        return np.array([low, high]), np.array([1.0, 1.0])
+
+    counts, edges = np.histogram(values, bins=grid_size, range=(low - 3 * bandwidth, high + 3 * bandwidth))
+    step = edges[1] - edges[0]
+    half_width = int(np.ceil(4 * bandwidth / step))
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(counts, kernel / (kernel.sum() * step), mode="same") / len(values)
+    centers = (edges[:-1] + edges[1:]) / 2
+    grid = np.linspace(low, high, points)
+    return grid, np.interp(grid, centers, density)
@@ -0,0 +1,288 @@
+# utils/column_index.py
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from utils.query_engine import normalize_column_name
+
+# Ignored on both sides ("shots on target" == "ShotsOnTarget" == "shots target")
+STOP_WORDS = {"a", "an", "the", "of", "on", "at", "in", "to", "is", "are", "me", "my"}
+# Separate the column mentions in a query ("goals by team", "shots vs corners")
+BREAK_WORDS = {"by", "vs", "versus", "against", "and", "or", "per", "for", "across", "with",
+               "over", "between", "each", "from", "compared", "than", "where", "when"}
+# Request wording, ignored unless a column actually uses the word
+FILLER_WORDS = {"show", "plot", "chart", "graph", "draw", "create", "make", "give", "please", "display",
+                "bar", "line", "scatter", "pie", "histogram", "box", "heatmap", "area", "violin",
+                "sunburst", "treemap", "distribution", "proportion", "compare", "correlation",
+                "what", "how", "many", "much", "which", "who", "total", "average", "mean", "trend",
+                "count", "number", "records", "rows", "matches", "values"}
+
+# Query phrase -> column vocabulary it can stand for. Keys and values are
+# written naturally and stemmed when the index is built.
+COLUMN_SYNONYMS: Dict[str, List[str]] = {
+    "goals": ["full time goals"],
+    "scored": ["goals"],
+    "score": ["goals"],
+    "half time": ["ht"],
+    "full time": ["ft"],
+    "ht": ["half time"],
+    "ft": ["full time"],
+    "sot": ["shots on target"],
+    "shots on goal": ["shots on target"],
+    "yellows": ["yellow cards"],
+    "bookings": ["yellow cards"],
+    "reds": ["red cards"],
+    "sending offs": ["red cards"],
+    "result": ["full time result"],
+    "outcome": ["full time result"],
+    "date": ["match date"],
+    "day": ["date"],
+    "hosts": ["home team"],
+    "visitors": ["away team"],
+    "dob": ["date of birth"],
+    "birthday": ["date of birth"],
+    "email": ["email address"],
+    "phone": ["phone number"],
+    "zip": ["post code"],
+    "postcode": ["post code"],
+    "city": ["city or town"],
+    "town": ["city or town"],
+    "surname": ["last name"],
+}
+
+MIN_MATCH_SCORE = 0.5
+# For optional columns (e.g. a pie chart's values), where a loose match does more harm than none
+STRICT_MATCH_SCORE = 0.75
+SYNONYM_PENALTY = 0.95
+FUZZY_PENALTY = 0.9
+MIN_FUZZY_SIMILARITY = 0.35
+MAX_CACHED_INDEXES = 8
+MAX_CACHED_QUERIES = 256
+
+_lock = threading.Lock()
+_index_cache: "OrderedDict[Tuple[str, ...], ColumnIndex]" = OrderedDict()
+
+
+def _stem(token: str) -> str:
+    """Crude plural folding, applied identically to column and query tokens."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _tokens(text: str) -> List[str]:
+    return [_stem(t) for t in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class ColumnMatch:
+    column: str
+    score: float
+    position: int  # token offset of the mention in the query
+
+
+class ColumnIndex:
+    """
+    Resolves column mentions in free text against a fixed schema. Built once
+    per schema: column names are split into tokens (snake_case / CamelCase),
+    and an inverted index, a trigram index over the token vocabulary and a
+    compact-name lookup make each query cost proportional to its own length
+    rather than to the number of columns.
+    """
+
+    def __init__(self, columns: Sequence, synonyms: Optional[Dict[str, List[str]]] = None):
+        self.columns = [str(c) for c in columns]
+        self._originals = dict(zip(self.columns, columns))
+        self._column_tokens: List[FrozenSet[str]] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self._compact: Dict[str, int] = {}
+        for i, column in enumerate(self.columns):
+            words = [t for t in _tokens(normalize_column_name(column)) if t not in STOP_WORDS]
+            tokens = frozenset(words) or frozenset(_tokens(column))
+            self._column_tokens.append(tokens)
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(i)
+            # Names written as one word: "HomeTeam" -> "hometeam", "home_team" -> "hometeam"
+            for compact in (_stem(re.sub(r"[^a-z0-9]", "", column.lower())), "".join(words)):
+                self._compact.setdefault(compact, i)
+
+        self.vocabulary = set(self._postings)
+        self._trigram_index: Dict[str, Set[str]] = {}
+        self._trigram_counts: Dict[str, int] = {}
+        for token in self.vocabulary:
+            grams = _trigrams(token)
+            self._trigram_counts[token] = len(grams)
+            for gram in grams:
+                self._trigram_index.setdefault(gram, set()).add(token)
+
+        self._synonyms: Dict[Tuple[str, ...], List[List[str]]] = {}
+        for phrase, expansions in (synonyms if synonyms is not None else COLUMN_SYNONYMS).items():
+            key = tuple(_tokens(phrase))
+            self._synonyms[key] = [[t for t in _tokens(e) if t not in STOP_WORDS] for e in expansions]
+        self._max_synonym_length = max((len(k) for k in self._synonyms), default=1)
+
+        self._fuzzy_cache: Dict[str, Optional[str]] = {}
+        # Shared across sessions and threads (see get_column_index)
+        self._query_cache: "OrderedDict[str, List[ColumnMatch]]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+
+    def resolve(self, query: str, candidates: Optional[Iterable] = None, limit: Optional[int] = None,
+                min_score: float = MIN_MATCH_SCORE) -> List[ColumnMatch]:
+        """
+        Columns mentioned in the query, best match first. `candidates`
+        restricts the result to a subset of the schema (e.g. numeric columns).
+        """
+        with self._query_cache_lock:
+            matches = self._query_cache.get(query)
+            if matches is not None:
+                self._query_cache.move_to_end(query)
+        if matches is None:
+            matches = self._rank(query)
+            with self._query_cache_lock:
+                self._query_cache[query] = matches
+                while len(self._query_cache) > MAX_CACHED_QUERIES:
+                    self._query_cache.popitem(last=False)
+        allowed = None if candidates is None else {str(c) for c in candidates}
+        result = [m for m in matches if m.score >= min_score and (allowed is None or m.column in allowed)]
+        return result[:limit] if limit else result
+
+    def best(self, query: str, candidates: Optional[Iterable] = None, exclude: Iterable = (),
+             used_positions: Optional[Set[int]] = None, min_score: float = MIN_MATCH_SCORE) -> Optional[str]:
+        """
+        The best matching column (as it appears in the DataFrame), or None.
+        With `used_positions`, mentions already resolved to another column are
+        skipped and the chosen mention is added, so picking several columns
+        from one query never reads the same words twice ("goals by team").
+        """
+        excluded = {str(c) for c in exclude}
+        for match in self.resolve(query, candidates, min_score=min_score):
+            if match.column in excluded or (used_positions is not None and match.position in used_positions):
+                continue
+            if used_positions is not None:
+                used_positions.add(match.position)
+            return self._originals[match.column]
+        return None
+
+    def mentioned(self, query: str, candidates: Optional[Iterable] = None, min_score: float = MIN_MATCH_SCORE) -> List:
+        """
+        The columns the query refers to (as they appear in the DataFrame): the
+        best match for each mention, or every column tied for it.
+        """
+        best_at: Dict[int, float] = {}
+        matches = self.resolve(query, candidates, min_score=min_score)
+        for m in matches:
+            best_at[m.position] = max(best_at.get(m.position, 0.0), m.score)
+        return [self._originals[m.column] for m in matches if m.score == best_at[m.position]]
+
+    # --- Scoring ---
+
+    def _rank(self, query: str) -> List[ColumnMatch]:
+        scores: Dict[int, Tuple[float, int]] = {}
+        for position, segment in self._segments(query):
+            for i, score in self._score_segment(segment).items():
+                if score > scores.get(i, (0.0, 0))[0]:
+                    scores[i] = (score, position)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][0], item[1][1], item[0]))
+        return [ColumnMatch(self.columns[i], round(score, 4), position) for i, (score, position) in ranked]
+
+    def _segments(self, query: str) -> List[Tuple[int, List[str]]]:
+        """Splits the query into runs of content words between break words."""
+        segments, current, start = [], [], 0
+        for position, word in enumerate(re.findall(r"[a-z0-9]+", query.lower())):
+            token = _stem(word)
+            if word in BREAK_WORDS:
+                if current:
+                    segments.append((start, current))
+                current = []
+                continue
+            if word in STOP_WORDS or (word in FILLER_WORDS and token not in self.vocabulary):
+                continue
+            if not current:
+                start = position
+            current.append(token)
+        if current:
+            segments.append((start, current))
+        return segments
+
+    def _score_segment(self, segment: List[str]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        # Literal names, e.g. "hometeam", "fthome" or the whole of "home shots on target"
+        for words in [[token] for token in segment] + [segment]:
+            i = self._compact.get("".join(words))
+            if i is not None:
+                scores[i] = max(scores.get(i, 0.0), 1.0 + 0.01 * len(words))
+
+        for tokens, penalty in self._variants(segment):
+            candidates = set()
+            for token in tokens:
+                candidates |= self._postings.get(token, set())
+            for i in candidates:
+                column_tokens = self._column_tokens[i]
+                overlap = len(tokens & column_tokens)
+                # Dice coefficient, nudged towards columns that explain more of the query
+                score = penalty * (2 * overlap / (len(tokens) + len(column_tokens)) + 0.01 * overlap)
+                if score > scores.get(i, 0.0):
+                    scores[i] = score
+        return scores
+
+    def _variants(self, segment: List[str]) -> List[Tuple[FrozenSet[str], float]]:
+        """The segment's token set, plus variants with typos corrected and synonyms expanded."""
+        corrected, penalty = [], 1.0
+        for token in segment:
+            fixed = self._correct(token)
+            if fixed is not None and fixed != token:
+                penalty = FUZZY_PENALTY
+            corrected.append(fixed or token)
+        variants = [(frozenset(segment), 1.0)]
+        if penalty < 1.0:
+            variants.append((frozenset(corrected), penalty))
+        for n in range(1, min(self._max_synonym_length, len(corrected)) + 1):
+            for s in range(len(corrected) - n + 1):
+                for expansion in self._synonyms.get(tuple(corrected[s:s + n]), []):
+                    tokens = corrected[:s] + expansion + corrected[s + n:]
+                    variants.append((frozenset(tokens), penalty * SYNONYM_PENALTY))
+        return variants
+
+    def _correct(self, token: str) -> Optional[str]:
+        """Closest vocabulary token by trigram similarity, for misspelled words."""
+        if token in self.vocabulary:
+            return token
+        if len(token) < 4:
+            return None
+        if token not in self._fuzzy_cache:
+            grams = _trigrams(token)
+            counts: Dict[str, int] = {}
+            for gram in grams:
+                for candidate in self._trigram_index.get(gram, ()):
+                    counts[candidate] = counts.get(candidate, 0) + 1
+            best, best_similarity = None, MIN_FUZZY_SIMILARITY
+            for candidate, shared in counts.items():
+                similarity = shared / (len(grams) + self._trigram_counts[candidate] - shared)
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+            self._fuzzy_cache[token] = best
+        return self._fuzzy_cache[token]
+
+
+def get_column_index(columns: Sequence) -> ColumnIndex:
+    """Returns the shared ColumnIndex for a schema, building it on first use."""
+    key = tuple(str(c) for c in columns)
+    with _lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = ColumnIndex(columns)
+    with _lock:
+        _index_cache[key] = index
+        while len(_index_cache) > MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+    return index
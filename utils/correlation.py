@@ -0,0 +1,153 @@
+# utils/correlation.py
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.data_profiler import dataset_fingerprint
+
+CORRELATION_METHODS = {"pearson", "spearman"}
+CHUNK_ROWS = 200_000
+MIN_PERIODS = 2
+MAX_CACHED_MATRICES = 16
+
+_lock = threading.Lock()
+_matrix_cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+
+
+def _accumulate(values: np.ndarray, sums: dict):
+    """Adds one row chunk's pairwise-complete sums (float32 matmuls, float64 totals)."""
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0).astype(np.float32)
+    if present.all():
+        n = len(values)
+        col_sums = filled.sum(axis=0, dtype=np.float64)
+        sums["n"] += n
+        sums["x"] += col_sums[:, None]
+        sums["xx"] += (filled * filled).sum(axis=0, dtype=np.float64)[:, None]
+    else:
+        mask = present.astype(np.float32)
+        sums["n"] += mask.T @ mask
+        # x[i, j]: sum of column i over the rows where column j is also present
+        sums["x"] += filled.T @ mask
+        sums["xx"] += (filled * filled).T @ mask
+    sums["xy"] += filled.T @ filled
+
+
+def correlation_matrix_numpy(values: np.ndarray, min_periods: int = MIN_PERIODS) -> np.ndarray:
+    """
+    Pairwise-complete Pearson correlation of the columns of a 2D array with
+    NaNs. Equivalent to DataFrame.corr() but computed with a handful of
+    float32 matrix products over row chunks instead of a Python loop over
+    column pairs.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    p = values.shape[1]
+    # Centering first keeps the float32 products from cancelling catastrophically
+    with np.errstate(all="ignore"):
+        center = np.nanmean(values, axis=0) if len(values) else np.zeros(p)
+    center = np.nan_to_num(center)
+    sums = {"n": np.zeros((p, p)), "x": np.zeros((p, p)), "xx": np.zeros((p, p)), "xy": np.zeros((p, p))}
+    for start in range(0, len(values), CHUNK_ROWS):
+        _accumulate(values[start:start + CHUNK_ROWS] - center, sums)
+
+    n, sx = sums["n"], sums["x"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sums["xy"] - sx * sx.T / n
+        # var_x[i, j]: spread of column i over the rows where column j is present
+        var_x = sums["xx"] - sx * sx / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr = np.clip(corr, -1.0, 1.0)
+    corr[(n < min_periods) | ~np.isfinite(corr)] = np.nan
+    diagonal = np.diag(n) >= min_periods
+    corr[np.diag_indices(p)] = np.where(diagonal & (np.diag(var_x) > 0), 1.0, np.nan)
+    return corr
+
+
+def correlation_matrix(df: pd.DataFrame, method: str = "pearson", columns: Optional[Sequence] = None) -> pd.DataFrame:
+    """
+    Correlation matrix of the numeric columns, cached per dataset fingerprint.
+    Spearman correlation is Pearson on per-column ranks (ranks are taken over
+    each column's non-missing values).
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unsupported correlation method: {method}")
+    columns = list(columns) if columns is not None else df.select_dtypes(include=[np.number]).columns.tolist()
+    key = (dataset_fingerprint(df), method, tuple(str(c) for c in columns))
+    with _lock:
+        cached = _matrix_cache.get(key)
+        if cached is not None:
+            _matrix_cache.move_to_end(key)
+            return cached
+
+    numeric = df[columns]
+    if method == "spearman":
+        numeric = numeric.rank(method="average")
+    values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+    matrix = pd.DataFrame(correlation_matrix_numpy(values), index=columns, columns=columns)
+    logging.info(f"Computed {method} correlation matrix for {len(columns)} columns over {len(df)} rows.")
+
+    with _lock:
+        _matrix_cache[key] = matrix
+        while len(_matrix_cache) > MAX_CACHED_MATRICES:
+            _matrix_cache.popitem(last=False)
+    return matrix
+
+
+def strongest_pairs(matrix: pd.DataFrame, top_n: int = 20) -> pd.DataFrame:
+    """The top_n column pairs with the largest absolute correlation."""
+    values = matrix.to_numpy()
+    upper_i, upper_j = np.triu_indices(len(values), k=1)
+    pair_values = values[upper_i, upper_j]
+    valid = ~np.isnan(pair_values)
+    upper_i, upper_j, pair_values = upper_i[valid], upper_j[valid], pair_values[valid]
+    top_n = min(top_n, len(pair_values))
+    order = np.argpartition(-np.abs(pair_values), top_n - 1)[:top_n] if top_n else np.array([], dtype=int)
+    order = order[np.argsort(-np.abs(pair_values[order]), kind="stable")]
+    columns = matrix.columns
+    return pd.DataFrame({
+        "column_a": columns[upper_i[order]],
+        "column_b": columns[upper_j[order]],
+        "correlation": pair_values[order],
+    })
+
+
+def cluster_order(matrix: pd.DataFrame) -> List:
+    """
+    Orders columns so strongly correlated ones sit next to each other: a greedy
+    nearest-neighbour chain over the distance 1 - |r|, started from the column
+    with the strongest overall correlation.
+    """
+    strength = np.nan_to_num(np.abs(matrix.to_numpy()), nan=0.0)
+    p = len(strength)
+    if p < 3:
+        return list(matrix.columns)
+    np.fill_diagonal(strength, -1.0)
+    visited = np.zeros(p, dtype=bool)
+    current = int(np.argmax(strength.max(axis=1)))
+    order = [current]
+    visited[current] = True
+    for _ in range(p - 1):
+        candidates = np.where(visited, -np.inf, strength[current])
+        current = int(np.argmax(candidates))
+        visited[current] = True
+        order.append(current)
+    return [matrix.columns[i] for i in order]
+
+
+def select_columns_for_display(matrix: pd.DataFrame, max_columns: int) -> List:
+    """For wide tables, keeps the columns that take part in the strongest pairs."""
+    if len(matrix.columns) <= max_columns:
+        return list(matrix.columns)
+    selected: "OrderedDict[object, None]" = OrderedDict()
+    for a, b in strongest_pairs(matrix, top_n=max_columns * max_columns)[["column_a", "column_b"]].itertuples(index=False):
+        for column in (a, b):
+            if column not in selected and len(selected) < max_columns:
+                selected[column] = None
+        if len(selected) >= max_columns:
+            break
+    return list(selected)
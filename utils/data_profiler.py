@@ -0,0 +1,370 @@
+# utils/data_profiler.py
+
+import hashlib
+import logging
+import os
+import threading
+import warnings
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.sketches import HyperLogLog, ReservoirSample, RunningMoments, SpaceSaving, TDigest
+
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+MAX_CACHED_PROFILES = 16
+# Above this many rows get_profile() switches to streamed, sketch-based statistics
+APPROX_ROW_THRESHOLD = int(os.environ.get("PROFILE_APPROX_ROW_THRESHOLD", 1_000_000))
+APPROX_CHUNK_SIZE = 100_000
+
+_lock = threading.Lock()
+_profile_cache: "OrderedDict[tuple, DatasetProfile]" = OrderedDict()
+_fingerprint_memo: Dict[int, tuple] = {}
+
+
+@dataclass
+class ColumnProfile:
+    """Statistics for a single column."""
+    name: str
+    dtype: str
+    count: int
+    null_count: int
+    unique: int
+    top: Any = None
+    top_freq: int = 0
+    is_numeric: bool = False
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    min: Optional[float] = None
+    q25: Optional[float] = None
+    median: Optional[float] = None
+    q75: Optional[float] = None
+    max: Optional[float] = None
+
+
+@dataclass
+class DatasetProfile:
+    """
+    Column statistics for a whole DataFrame, computed once and shared by the
+    agents and the UI. Use get_profile() to obtain a cached instance.
+
+    Approximate profiles carry per-column error bounds and a reservoir sample
+    of rows that can be used as a preview.
+    """
+    fingerprint: str
+    rows: int
+    columns: List[str]
+    column_profiles: Dict[str, ColumnProfile] = field(default_factory=dict)
+    approximate: bool = False
+    error_bounds: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    sample: Optional[pd.DataFrame] = None
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return [c for c in self.columns if self.column_profiles[c].is_numeric]
+
+    @property
+    def categorical_columns(self) -> List[str]:
+        return [c for c in self.columns if self.column_profiles[c].dtype in ("object", "category", "str", "string")]
+
+    @property
+    def null_counts(self) -> Dict[str, int]:
+        return {c: self.column_profiles[c].null_count for c in self.columns}
+
+    @property
+    def completeness(self) -> float:
+        cells = self.rows * len(self.columns)
+        return 1 - (sum(self.null_counts.values()) / cells) if cells else 1.0
+
+    @property
+    def unique_ratio(self) -> float:
+        if not self.rows or not self.columns:
+            return 0.0
+        return float(np.mean([self.column_profiles[c].unique for c in self.columns])) / self.rows
+
+    def describe(self) -> pd.DataFrame:
+        """Equivalent of ``df[numeric_cols].describe()`` without touching the data."""
+        stats = {}
+        for c in self.numeric_columns:
+            p = self.column_profiles[c]
+            stats[c] = [p.count, p.mean, p.std, p.min, p.q25, p.median, p.q75, p.max]
+        return pd.DataFrame(stats, index=DESCRIBE_INDEX, dtype=float)
+
+    def dtype_table(self) -> pd.DataFrame:
+        """Column types with non-null and null counts, as shown in the UI."""
+        return pd.DataFrame({
+            "index": self.columns,
+            "Type": [self.column_profiles[c].dtype for c in self.columns],
+            "Non-Null Count": [self.column_profiles[c].count for c in self.columns],
+            "Null Count": [self.column_profiles[c].null_count for c in self.columns],
+        })
+
+    def top_values(self) -> Dict[str, Any]:
+        """Most common value of every categorical column."""
+        return {c: self.column_profiles[c].top for c in self.categorical_columns
+                if self.column_profiles[c].count > 0}
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {
+            "rows": self.rows,
+            "columns": list(self.columns),
+            "null_counts": self.null_counts,
+        }
+        if self.approximate:
+            summary["approximate"] = True
+        return summary
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content hash of a DataFrame (schema + values). Memoized per object, so
+    repeated calls on the same frame (e.g. on Streamlit reruns) are free.
+    Frames are assumed not to be mutated in place after they are profiled.
+    """
+    key = id(df)
+    with _lock:
+        memo = _fingerprint_memo.get(key)
+        if memo is not None and memo[0]() is df:
+            return memo[1]
+
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr((df.shape, [str(c) for c in df.columns], [str(t) for t in df.dtypes])).encode("utf-8"))
+    if len(df):
+        hasher.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    fingerprint = hasher.hexdigest()
+
+    with _lock:
+        _fingerprint_memo[key] = (weakref.ref(df, lambda _ref, k=key: _fingerprint_memo.pop(k, None)), fingerprint)
+    return fingerprint
+
+
+def build_profile(df: pd.DataFrame, fingerprint: Optional[str] = None) -> DatasetProfile:
+    """Computes all column statistics in one vectorized pass over the data."""
+    fingerprint = fingerprint or dataset_fingerprint(df)
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    null_counts = df.isnull().sum().to_numpy()
+    rows = len(df)
+
+    profiles: Dict[str, ColumnProfile] = {}
+    for i, c in enumerate(df.columns):
+        # value_counts gives distinct count and mode in the same hash pass
+        counts = df[c].value_counts(dropna=True, sort=False)
+        top, top_freq = (None, 0)
+        if len(counts):
+            top_pos = int(counts.to_numpy().argmax())
+            top, top_freq = counts.index[top_pos], int(counts.iloc[top_pos])
+        profiles[c] = ColumnProfile(
+            name=str(c), dtype=str(df[c].dtype), count=rows - int(null_counts[i]),
+            null_count=int(null_counts[i]), unique=len(counts), top=top, top_freq=top_freq,
+        )
+
+    if numeric_cols and rows:
+        values = df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        # All-NaN columns legitimately produce NaN statistics
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            means = np.nanmean(values, axis=0)
+            stds = np.nanstd(values, axis=0, ddof=1)
+            quantiles = np.nanpercentile(values, [0, 25, 50, 75, 100], axis=0)
+        for j, c in enumerate(numeric_cols):
+            p = profiles[c]
+            p.is_numeric = True
+            p.mean, p.std = _as_float(means[j]), _as_float(stds[j])
+            p.min, p.q25, p.median, p.q75, p.max = (_as_float(q) for q in quantiles[:, j])
+    else:
+        for c in numeric_cols:
+            profiles[c].is_numeric = True
+
+    return DatasetProfile(fingerprint=fingerprint, rows=rows, columns=list(df.columns), column_profiles=profiles)
+
+
+class StreamingStats:
+    """
+    Mergeable per-column accumulators behind approximate profiles. Null counts,
+    means, standard deviations, minima and maxima stay exact; distinct counts
+    (HyperLogLog), most common values (space-saving) and quartiles (t-digest)
+    are approximate. Two instances over disjoint rows can be merged, which is
+    what incremental (per-partition) recomputation builds on.
+    """
+
+    def __init__(self, sample_size: int = 1000):
+        self.rows = 0
+        self.columns: List[str] = []
+        self.numeric_columns: set = set()
+        self.dtypes: Dict[str, str] = {}
+        self.nulls: Dict[str, int] = {}
+        self.distinct: Dict[str, HyperLogLog] = {}
+        self.heavy: Dict[str, SpaceSaving] = {}
+        self.moments: Dict[str, RunningMoments] = {}
+        self.digests: Dict[str, TDigest] = {}
+        self.reservoir = ReservoirSample(sample_size)
+
+    def _init_columns(self, columns: List[str], numeric_columns: set, dtypes: Dict[str, str]):
+        self.columns = list(columns)
+        self.numeric_columns = set(numeric_columns)
+        self.dtypes = dict(dtypes)
+        self.nulls = dict.fromkeys(self.columns, 0)
+        self.distinct = {c: HyperLogLog() for c in self.columns}
+        self.heavy = {c: SpaceSaving() for c in self.columns}
+        self.moments = {c: RunningMoments() for c in self.numeric_columns}
+        self.digests = {c: TDigest() for c in self.numeric_columns}
+
+    def update(self, chunk: pd.DataFrame) -> "StreamingStats":
+        if not self.columns:
+            self._init_columns(list(chunk.columns), set(chunk.select_dtypes(include=[np.number]).columns),
+                               {c: str(chunk[c].dtype) for c in chunk.columns})
+        chunk_nulls = chunk.isnull().sum()
+        for c in self.columns:
+            self.nulls[c] += int(chunk_nulls[c])
+            # One hash pass per column and chunk; the sketches consume the distinct values
+            counts = chunk[c].value_counts(dropna=True)
+            self.distinct[c].update(pd.Series(counts.index))
+            self.heavy[c].update_counts(counts)
+            if c in self.numeric_columns:
+                self.moments[c].update(chunk[c].to_numpy(dtype=np.float64, na_value=np.nan))
+                self.digests[c].update(counts.index.to_numpy(dtype=np.float64), counts.to_numpy())
+        self.reservoir.update(chunk)
+        self.rows += len(chunk)
+        return self
+
+    def merge(self, other: "StreamingStats") -> "StreamingStats":
+        if not other.columns:
+            return self
+        if not self.columns:
+            self._init_columns(other.columns, other.numeric_columns, other.dtypes)
+        for c in self.columns:
+            self.nulls[c] += other.nulls[c]
+            self.distinct[c].merge(other.distinct[c])
+            self.heavy[c].merge(other.heavy[c])
+            if c in self.numeric_columns:
+                self.moments[c].merge(other.moments[c])
+                self.digests[c].merge(other.digests[c])
+        self.reservoir.merge(other.reservoir)
+        self.rows += other.rows
+        return self
+
+    def to_profile(self, fingerprint: str) -> DatasetProfile:
+        profiles: Dict[str, ColumnProfile] = {}
+        error_bounds: Dict[str, Dict[str, float]] = {}
+        for c in self.columns:
+            top = self.heavy[c].top(1)
+            profile = ColumnProfile(
+                name=str(c), dtype=self.dtypes[c], count=self.rows - self.nulls[c], null_count=self.nulls[c],
+                unique=int(round(self.distinct[c].estimate())),
+                top=top[0][0] if top else None, top_freq=top[0][1] if top else 0,
+                is_numeric=c in self.numeric_columns,
+            )
+            bounds = {
+                "unique_relative_error": self.distinct[c].relative_error,
+                "top_count_error": self.heavy[c].error_bound,
+            }
+            if c in self.numeric_columns and self.moments[c].n:
+                m, d = self.moments[c], self.digests[c]
+                profile.mean, profile.std, profile.min, profile.max = m.mean, m.std, m.min, m.max
+                profile.q25, profile.median, profile.q75 = d.quantile(0.25), d.quantile(0.5), d.quantile(0.75)
+                bounds["quantile_rank_error"] = max(d.rank_error(q) for q in (0.25, 0.5, 0.75))
+            profiles[c] = profile
+            error_bounds[c] = bounds
+
+        return DatasetProfile(
+            fingerprint=fingerprint, rows=self.rows, columns=list(self.columns), column_profiles=profiles,
+            approximate=True, error_bounds=error_bounds, sample=self.reservoir.sample,
+        )
+
+
+def build_approximate_profile(
+    chunks: Iterable[pd.DataFrame],
+    fingerprint: Optional[str] = None,
+    sample_size: int = 1000,
+) -> DatasetProfile:
+    """
+    Computes column statistics over a stream of chunks in bounded memory,
+    with per-column error bounds (see StreamingStats).
+    """
+    hasher = hashlib.blake2b(digest_size=16) if fingerprint is None else None
+    stats = StreamingStats(sample_size)
+    for chunk in chunks:
+        if hasher is not None:
+            hasher.update(pd.util.hash_pandas_object(chunk, index=True).to_numpy().tobytes())
+        stats.update(chunk)
+
+    if hasher is not None:
+        hasher.update(repr((stats.rows, stats.columns, [stats.dtypes.get(c) for c in stats.columns])).encode("utf-8"))
+        fingerprint = hasher.hexdigest()
+    return stats.to_profile(fingerprint)
+
+
+def iter_chunks(df: pd.DataFrame, chunk_size: int = APPROX_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def profile_csv(path: str, chunk_size: int = APPROX_CHUNK_SIZE) -> DatasetProfile:
+    """Streams a CSV file from disk into an approximate profile without loading it whole."""
+    return build_approximate_profile(pd.read_csv(path, chunksize=chunk_size, low_memory=False))
+
+
+def get_profile(df: pd.DataFrame, approximate: Optional[bool] = None) -> DatasetProfile:
+    """
+    Returns the cached profile for this dataset, building it on first use.
+    With approximate=None, sketch-based statistics are used automatically for
+    frames larger than APPROX_ROW_THRESHOLD rows.
+    """
+    fingerprint = dataset_fingerprint(df)
+    with _lock:
+        # In auto mode any cached profile will do (e.g. one kept up to date incrementally)
+        candidates = [(fingerprint, approximate)] if approximate is not None else [(fingerprint, False), (fingerprint, True)]
+        for key in candidates:
+            profile = _profile_cache.get(key)
+            if profile is not None:
+                _profile_cache.move_to_end(key)
+                return profile
+
+    if approximate is None:
+        approximate = len(df) > APPROX_ROW_THRESHOLD
+    key = (fingerprint, approximate)
+
+    if approximate:
+        profile = build_approximate_profile(iter_chunks(df), fingerprint)
+    else:
+        profile = build_profile(df, fingerprint)
+    logging.info(f"Built {'approximate' if approximate else 'exact'} dataset profile {fingerprint} "
+                 f"({profile.rows} rows, {len(profile.columns)} columns).")
+    with _lock:
+        _profile_cache[key] = profile
+        while len(_profile_cache) > MAX_CACHED_PROFILES:
+            _profile_cache.popitem(last=False)
+    return profile
+
+
+def _as_float(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def register_profile(profile: DatasetProfile):
+    """Stores a profile computed elsewhere (e.g. merged from partitions) in the shared cache."""
+    with _lock:
+        _profile_cache[(profile.fingerprint, profile.approximate)] = profile
+        while len(_profile_cache) > MAX_CACHED_PROFILES:
+            _profile_cache.popitem(last=False)
+
+
+def extend_fingerprint(base_fingerprint: str, delta: pd.DataFrame, combined: Optional[pd.DataFrame] = None) -> str:
+    """
+    Fingerprint of ``base + delta`` derived from the base fingerprint, so that
+    appending rows only hashes the new rows. If the combined frame is given,
+    the result is memoized for it.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(base_fingerprint.encode("utf-8"))
+    hasher.update(dataset_fingerprint(delta).encode("utf-8"))
+    fingerprint = hasher.hexdigest()
+    if combined is not None:
+        key = id(combined)
+        with _lock:
+            _fingerprint_memo[key] = (weakref.ref(combined, lambda _ref, k=key: _fingerprint_memo.pop(k, None)), fingerprint)
+    return fingerprint
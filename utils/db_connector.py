@@ -1,36 +1,55 @@
+import threading
 import streamlit as st
-import psycopg2
+from psycopg2 import pool as psycopg2_pool
 import pandas as pd
+from utils.tracing import span
+
+# Connections shared by all sessions; each fetch holds one for its duration
+MIN_CONNECTIONS = 1
+MAX_CONNECTIONS = 10
 
 class DBConnector:
     """
     Handles connections to the PostgreSQL database using Streamlit secrets.
+    Connections come from a thread-safe pool, so concurrent sessions never
+    run queries on the same connection or replace it under each other.
     """
     def __init__(self):
+        # psycopg2's pool raises when exhausted; callers wait for a free connection instead
+        self._available = threading.BoundedSemaphore(MAX_CONNECTIONS)
         try:
-            self.conn = self._get_connection()
+            self.pool = self._get_pool()
         except Exception as e:
             st.error(f"Database connection failed: {e}")
-            self.conn = None
+            self.pool = None
 
     @st.cache_resource
-    def _get_connection(_self):
-        """Caches the database connection."""
+    def _get_pool(_self):
+        """Caches the connection pool."""
         # This line reads the [postgres] section from your secrets.toml file
         # and passes all the key-value pairs (host, port, dbname, etc.)
         # directly to the connection function.
-        return psycopg2.connect(**st.secrets["postgres"])
+        return psycopg2_pool.ThreadedConnectionPool(MIN_CONNECTIONS, MAX_CONNECTIONS, **st.secrets["postgres"])
 
     def fetch_data(self, query: str) -> pd.DataFrame:
         """Fetches data from the database and returns a pandas DataFrame."""
-        if not self.conn:
+        if not self.pool:
             raise ConnectionError("No active database connection.")
         
-        try:
-            df = pd.read_sql_query(query, self.conn)
-            return df
-        except Exception as e:
-            # Attempt to reconnect on failure
-            self.conn = self._get_connection()
-            df = pd.read_sql_query(query, self.conn)
+        with span("db.fetch", sql_chars=len(query)) as fetch, self._available:
+            conn = self.pool.getconn()
+            try:
+                try:
+                    df = pd.read_sql_query(query, conn)
+                except Exception as e:
+                    # Drop the (possibly broken) connection and retry once on a fresh one
+                    fetch.set(reconnected=True)
+                    self.pool.putconn(conn, close=True)
+                    conn = None
+                    conn = self.pool.getconn()
+                    df = pd.read_sql_query(query, conn)
+            finally:
+                if conn is not None:
+                    self.pool.putconn(conn)
+            fetch.set(rows=len(df), bytes=int(df.memory_usage(deep=True).sum()))
             return df
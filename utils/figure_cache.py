@@ -0,0 +1,181 @@
+# utils/figure_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Config keys that describe a chart but do not change how it is drawn
+NON_RENDERING_KEYS = {"reason", "description", "score"}
+# Disk pruning removes the oldest figures until the tier is this fraction of its budget,
+# so a full directory is not scanned again on the very next write
+DISK_PRUNE_TARGET = 0.9
+
+
+def normalize_chart_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Drops empty and descriptive keys so equivalent configs share a cache key."""
+    normalized = {}
+    for key, value in config.items():
+        if key in NON_RENDERING_KEYS or value is None or value == [] or value == "":
+            continue
+        normalized[key] = value.lower() if key == "type" and isinstance(value, str) else value
+    return normalized
+
+
+class FigureCache:
+    """
+    LRU cache of serialized Plotly figures keyed on (dataset fingerprint,
+    normalized chart config, theme, reduction settings). The memory tier is
+    bounded by the total size of the stored JSON; an optional disk tier keeps
+    figures across processes and restarts. The disk tier's size is tracked in
+    memory, and the directory is only scanned when it goes over budget.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    @staticmethod
+    def make_key(fingerprint: str, config: Dict[str, Any], theme_key: str = "",
+                 settings: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Settings are the renderer's own limits (point budgets, thresholds and
+        so on) that change the figure drawn for the same config.
+        """
+        payload = json.dumps([fingerprint, normalize_chart_config(config), theme_key, settings or {}],
+                             sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[go.Figure]:
+        with self._lock:
+            serialized = self._entries.get(key)
+            if serialized is not None:
+                self._entries.move_to_end(key)
+        if serialized is None and self.disk_dir:
+            serialized = self._read_disk(key)
+            if serialized is not None:
+                self._store(key, serialized)
+        if serialized is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # A fresh Figure per hit, so callers can't mutate the cached copy
+        return pio.from_json(serialized, skip_invalid=True)
+
+    def put(self, key: str, fig: go.Figure):
+        serialized = fig.to_json()
+        self._store(key, serialized)
+        if self.disk_dir:
+            self._write_disk(key, serialized)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _store(self, key: str, serialized: str):
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = serialized
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                serialized = f.read()
+            os.utime(path)  # mark as recently used for pruning
+            return serialized
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning(f"Could not read cached figure {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, serialized: str):
+        path = self._disk_path(key)
+        try:
+            # Written to a temporary file first, so readers never see a partial figure
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(serialized)
+            size = os.path.getsize(tmp_path)
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_bytes += size - replaced
+                over_budget = self._disk_bytes > self.disk_max_bytes
+            if over_budget:
+                self._prune_disk()
+        except OSError as e:
+            logging.warning(f"Could not write cached figure {path}: {e}")
+
+    def _disk_entries(self) -> list:
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".json"):
+                try:
+                    stat = os.stat(os.path.join(self.disk_dir, name))
+                except FileNotFoundError:
+                    continue  # pruned by another process
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _prune_disk(self):
+        # The scan also corrects the tracked size for files other processes wrote or removed
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        target = self.disk_max_bytes * DISK_PRUNE_TARGET
+        for _, size, name in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+
+# Shared by every ChartGenerator in the process, so sessions reuse each other's charts
+shared_figure_cache = FigureCache(
+    max_bytes=int(os.environ.get("FIGURE_CACHE_MAX_MB", 64)) * 1024 * 1024,
+    disk_dir=os.environ.get("FIGURE_CACHE_DIR") or None,
+)
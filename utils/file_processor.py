@@ -1,10 +1,9 @@
 # utils/file_processor.py
 
 import pandas as pd
-import PyPDF2
-import docx
 import io
 from typing import Union, Optional
+from utils.tracing import span
 
 class FileProcessor:
     """
@@ -32,14 +31,19 @@ class FileProcessor:
             if file_extension not in self.supported_formats:
                 raise ValueError(f"Unsupported file format: {file_extension}")
             
-            if file_extension == 'csv':
-                return self._process_csv(uploaded_file)
-            elif file_extension in ['doc', 'docx']:
-                return self._process_word_document(uploaded_file)
-            elif file_extension == 'pdf':
-                return self._process_pdf(uploaded_file)
-            else:
-                raise ValueError(f"Unsupported file format: {file_extension}")
+            with span("file.parse", format=file_extension, bytes=getattr(uploaded_file, "size", None)) as parse:
+                if file_extension == 'csv':
+                    result = self._process_csv(uploaded_file)
+                    parse.set(rows=len(result))
+                elif file_extension in ['doc', 'docx']:
+                    result = self._process_word_document(uploaded_file)
+                    parse.set(chars=len(result))
+                elif file_extension == 'pdf':
+                    result = self._process_pdf(uploaded_file)
+                    parse.set(chars=len(result))
+                else:
+                    raise ValueError(f"Unsupported file format: {file_extension}")
+            return result
                 
         except Exception as e:
             raise Exception(f"Error processing file: {str(e)}")
@@ -57,6 +61,7 @@ class FileProcessor:
 
     def _process_word_document(self, uploaded_file) -> str:
         try:
+            import docx  # loaded on the first Word upload
             doc = docx.Document(uploaded_file)
             text_content = [p.text for p in doc.paragraphs if p.text.strip()]
             full_text = "\n".join(text_content)
@@ -68,6 +73,7 @@ class FileProcessor:
 
     def _process_pdf(self, uploaded_file) -> str:
         try:
+            import PyPDF2  # loaded on the first PDF upload
             pdf_reader = PyPDF2.PdfReader(uploaded_file)
             text_content = [page.extract_text() for page in pdf_reader.pages if page.extract_text()]
             full_text = "\n\n".join(text_content)
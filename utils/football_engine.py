@@ -0,0 +1,561 @@
+# utils/football_engine.py
+
+import copy
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.data_profiler import dataset_fingerprint
+
+# Canonical match columns and the names they have in epl_final.csv, the
+# epl_match table and the ucl_matches table (see seed_database.py).
+MATCH_COLUMN_ALIASES: Dict[str, List[str]] = {
+    "season": ["Season", "season"],
+    "date": ["MatchDate", "match_date"],
+    "stage": ["Division", "stage"],
+    "home_team": ["HomeTeam", "home_team"],
+    "away_team": ["AwayTeam", "away_team"],
+    "home_goals": ["FullTimeHomeGoals", "full_time_home_goals", "FTHome", "ft_home"],
+    "away_goals": ["FullTimeAwayGoals", "full_time_away_goals", "FTAway", "ft_away"],
+    "home_shots": ["HomeShots", "home_shots"],
+    "away_shots": ["AwayShots", "away_shots"],
+    "home_shots_on_target": ["HomeShotsOnTarget", "home_shots_on_target", "HomeTarget", "home_target"],
+    "away_shots_on_target": ["AwayShotsOnTarget", "away_shots_on_target", "AwayTarget", "away_target"],
+    "home_corners": ["HomeCorners", "home_corners"],
+    "away_corners": ["AwayCorners", "away_corners"],
+    "home_fouls": ["HomeFouls", "home_fouls"],
+    "away_fouls": ["AwayFouls", "away_fouls"],
+    "home_yellow": ["HomeYellowCards", "home_yellow_cards", "HomeYellow", "home_yellow"],
+    "away_yellow": ["AwayYellowCards", "away_yellow_cards", "AwayYellow", "away_yellow"],
+    "home_red": ["HomeRedCards", "home_red_cards", "HomeRed", "home_red"],
+    "away_red": ["AwayRedCards", "away_red_cards", "AwayRed", "away_red"],
+}
+REQUIRED_MATCH_COLUMNS = ["date", "home_team", "away_team", "home_goals", "away_goals"]
+# Seasons as written in questions: "2010/11", "2010-11", "2010/2011"
+SEASON_MENTION_PATTERN = re.compile(r"\b(\d{4})\s*[/-]\s*(\d{2}|\d{4})\b")
+# Per-side statistics carried into the team-indexed table as <stat>_for / <stat>_against
+SIDE_STATS = ["goals", "shots", "shots_on_target", "corners", "fouls", "yellow", "red"]
+
+ELO_INITIAL = 1500.0
+ELO_K = 20.0
+ELO_HOME_ADVANTAGE = 60.0
+MAX_CACHED_ENGINES = 4
+
+_lock = threading.Lock()
+_engine_cache: "OrderedDict[str, FootballAnalytics]" = OrderedDict()
+
+
+def map_match_columns(df: pd.DataFrame) -> Dict[str, str]:
+    """Maps canonical match column names to the columns present in df."""
+    present = set(df.columns)
+    mapping = {}
+    for canonical, aliases in MATCH_COLUMN_ALIASES.items():
+        # An already normalized table (see normalize_matches) maps onto itself
+        for alias in aliases + [canonical]:
+            if alias in present:
+                mapping[canonical] = alias
+                break
+    return mapping
+
+
+def is_match_table(df: Any) -> bool:
+    """True if df looks like a table of football matches (one row per match)."""
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return False
+    mapping = map_match_columns(df)
+    return all(c in mapping for c in REQUIRED_MATCH_COLUMNS)
+
+
+def normalize_matches(df: pd.DataFrame) -> pd.DataFrame:
+    """Renames a match table to the canonical schema and fills in derived columns."""
+    mapping = map_match_columns(df)
+    matches = pd.DataFrame({canonical: df[source].to_numpy() for canonical, source in mapping.items()})
+    matches["date"] = pd.to_datetime(matches["date"], errors="coerce")
+    if "season" not in matches:
+        # Seasons run August to May: a match in 2011-03 belongs to 2010/11
+        start = matches["date"].dt.year - (matches["date"].dt.month < 7)
+        matches["season"] = start.astype("Int64").astype(str) + "/" + (start + 1).astype("Int64").astype(str).str[-2:]
+    matches["season"] = matches["season"].astype(str)
+    if "stage" not in matches:
+        matches["stage"] = "League"
+    for stat in SIDE_STATS:
+        for side in ("home", "away"):
+            column = f"{side}_{stat}"
+            matches[column] = pd.to_numeric(matches[column], errors="coerce") if column in matches else np.nan
+    matches = matches.dropna(subset=["date", "home_goals", "away_goals"])
+    matches = matches.sort_values("date", kind="mergesort").reset_index(drop=True)
+    matches["match_id"] = np.arange(len(matches))
+    return matches
+
+
+def _season_key(season: Any) -> Optional[str]:
+    """Reduces '2010/11', '2010-11', '2010/2011' or 2010 to the start year '2010'."""
+    match = re.match(r"\s*(\d{4})", str(season))
+    return match.group(1) if match else None
+
+
+class FootballAnalytics:
+    """
+    Precomputed football analytics over a match table: league tables, home/away
+    splits, rolling form, head-to-head records and an Elo rating series.
+
+    Everything is derived once from a team-indexed long-format table (two rows
+    per match, one from each side's perspective) with vectorized groupby/cumsum
+    operations. Lookups by team and season then go through plain dictionaries.
+    Appended matches are kept as chunks, and the full frames (matches,
+    team_matches and the tables derived from the indexes) are only assembled
+    when they are read.
+    """
+
+    def __init__(self, df: pd.DataFrame, form_window: int = 5):
+        self.form_window = form_window
+        self._build(normalize_matches(df))
+
+    def _build(self, matches: pd.DataFrame):
+        team_matches = self._build_team_matches(matches)
+        self._add_form(team_matches)
+        self._add_elo(matches, team_matches)
+        self._match_chunks, self._team_match_chunks = [matches], [team_matches]
+        self._match_count, self._last_date = len(matches), matches["date"].max()
+
+        self._standings = self._build_standings(team_matches, ["season", "team"])
+        self._home_away = self._aggregate(team_matches, ["season", "team", "venue"])
+        self._head_to_head_table = self._aggregate(team_matches, ["team", "opponent"])
+        self._build_indexes()
+        logging.info(f"FootballAnalytics built: {len(matches)} matches, "
+                     f"{len(self._teams)} teams, {len(self._seasons)} seasons.")
+
+    # --- Frames (assembled from appended chunks on first read) ---
+
+    @property
+    def matches(self) -> pd.DataFrame:
+        if len(self._match_chunks) > 1:
+            self._match_chunks = [pd.concat(self._match_chunks, ignore_index=True)]
+        return self._match_chunks[0]
+
+    @property
+    def team_matches(self) -> pd.DataFrame:
+        if len(self._team_match_chunks) > 1:
+            self._team_match_chunks = [pd.concat(self._team_match_chunks, ignore_index=True)]
+        return self._team_match_chunks[0]
+
+    @property
+    def standings(self) -> pd.DataFrame:
+        if self._standings is None:
+            self._standings = pd.concat(list(self._season_tables.values()), ignore_index=True)
+        return self._standings
+
+    @property
+    def home_away(self) -> pd.DataFrame:
+        if self._home_away is None:
+            self._home_away = pd.DataFrame(list(self._split_index.values()))
+        return self._home_away
+
+    @property
+    def head_to_head_table(self) -> pd.DataFrame:
+        if self._head_to_head_table is None:
+            self._head_to_head_table = pd.DataFrame(list(self._h2h_index.values()))
+        return self._head_to_head_table
+
+    # --- Construction ---
+
+    @staticmethod
+    def _build_team_matches(matches: pd.DataFrame) -> pd.DataFrame:
+        n = len(matches)
+        venue = np.repeat(np.array(["home", "away"]), n)
+        data = {
+            "match_id": np.tile(matches["match_id"].to_numpy(), 2),
+            "season": np.tile(matches["season"].to_numpy(), 2),
+            "date": np.tile(matches["date"].to_numpy(), 2),
+            "stage": np.tile(matches["stage"].to_numpy(), 2),
+            "team": np.concatenate([matches["home_team"].to_numpy(), matches["away_team"].to_numpy()]),
+            "opponent": np.concatenate([matches["away_team"].to_numpy(), matches["home_team"].to_numpy()]),
+            "venue": venue,
+        }
+        for stat in SIDE_STATS:
+            home, away = matches[f"home_{stat}"].to_numpy(dtype=float), matches[f"away_{stat}"].to_numpy(dtype=float)
+            data[f"{stat}_for"] = np.concatenate([home, away])
+            data[f"{stat}_against"] = np.concatenate([away, home])
+
+        team_matches = pd.DataFrame(data)
+        diff = team_matches["goals_for"].to_numpy() - team_matches["goals_against"].to_numpy()
+        team_matches["result"] = np.select([diff > 0, diff < 0], ["W", "L"], default="D")
+        team_matches["points"] = np.select([diff > 0, diff < 0], [3, 0], default=1)
+        team_matches["goal_difference"] = diff
+        return team_matches.sort_values(["team", "date", "match_id"], kind="mergesort").reset_index(drop=True)
+
+    def _add_form(self, team_matches: pd.DataFrame):
+        grouped = team_matches.groupby("team", sort=False)
+        team_matches["match_number"] = grouped.cumcount() + 1
+        cumulative = grouped["points"].cumsum()
+        previous = cumulative.groupby(team_matches["team"], sort=False).shift(self.form_window, fill_value=0)
+        team_matches["cumulative_points"] = cumulative
+        team_matches[f"form_points_last_{self.form_window}"] = cumulative - previous
+        season_grouped = team_matches.groupby(["season", "team"], sort=False)
+        team_matches["season_points"] = season_grouped["points"].cumsum()
+        team_matches["season_goal_difference"] = season_grouped["goal_difference"].cumsum()
+
+    def _add_elo(self, matches: pd.DataFrame, team_matches: pd.DataFrame, initial: Optional[Dict[str, float]] = None):
+        # Elo is inherently sequential, but matches on the same date are
+        # independent, so ratings are updated one match day at a time in bulk.
+        teams, codes = np.unique(np.concatenate([matches["home_team"].to_numpy(), matches["away_team"].to_numpy()]).astype(str),
+                                 return_inverse=True)
+        n = len(matches)
+        home, away = codes[:n], codes[n:]
+        home_goals, away_goals = matches["home_goals"].to_numpy(dtype=float), matches["away_goals"].to_numpy(dtype=float)
+        score = np.select([home_goals > away_goals, home_goals < away_goals], [1.0, 0.0], default=0.5)
+        margin = np.log1p(np.abs(home_goals - away_goals)) + 1.0
+
+        initial = initial or {}
+        ratings = np.array([initial.get(t, ELO_INITIAL) for t in teams.tolist()])
+        home_pre, away_pre = np.empty(n), np.empty(n)
+        dates = matches["date"].to_numpy()
+        boundaries = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1], True])
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            h, a = home[start:end], away[start:end]
+            home_pre[start:end], away_pre[start:end] = ratings[h], ratings[a]
+            expected = 1.0 / (1.0 + 10 ** ((ratings[a] - ratings[h] - ELO_HOME_ADVANTAGE) / 400.0))
+            delta = ELO_K * margin[start:end] * (score[start:end] - expected)
+            np.add.at(ratings, h, delta)
+            np.add.at(ratings, a, -delta)
+
+        pre = pd.Series(np.concatenate([home_pre, away_pre]),
+                        index=pd.MultiIndex.from_arrays([np.tile(matches["match_id"].to_numpy(), 2),
+                                                         np.repeat(["home", "away"], n)]))
+        key = pd.MultiIndex.from_arrays([team_matches["match_id"].to_numpy(), team_matches["venue"].to_numpy()])
+        team_matches["elo_pre"] = pre.reindex(key).to_numpy()
+        post = team_matches.groupby("team", sort=False)["elo_pre"].shift(-1)
+        final = dict(zip(teams.tolist(), ratings.tolist()))
+        team_matches["elo_post"] = post.fillna(team_matches["team"].map(final))
+        self.final_elo = {**initial, **final}
+
+    @staticmethod
+    def _aggregate(team_matches: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        # Result counts come from one-hot columns so everything stays a plain sum
+        onehot = team_matches[keys + ["points", "goals_for", "goals_against"]].copy()
+        onehot["won"] = team_matches["result"].to_numpy() == "W"
+        onehot["drawn"] = team_matches["result"].to_numpy() == "D"
+        onehot["lost"] = team_matches["result"].to_numpy() == "L"
+        onehot["played"] = 1
+        table = onehot.groupby(keys, sort=False, observed=True).sum().reset_index()
+        table["goal_difference"] = table["goals_for"] - table["goals_against"]
+        ordered = keys + ["played", "won", "drawn", "lost", "goals_for", "goals_against", "goal_difference", "points"]
+        return table[ordered].astype({c: int for c in ["played", "won", "drawn", "lost", "points"]})
+
+    def _build_standings(self, team_matches: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        table = self._aggregate(team_matches, keys)
+        table = table.sort_values(["season", "points", "goal_difference", "goals_for"],
+                                  ascending=[True, False, False, False], kind="mergesort")
+        table["position"] = table.groupby("season", sort=False).cumcount() + 1
+        return table.reset_index(drop=True)
+
+    def _build_indexes(self):
+        self._teams = {str(t).lower(): t for t in self.team_matches["team"].unique()}
+        self._seasons = {}
+        for season in self.standings["season"].unique():
+            self._seasons.setdefault(_season_key(season), season)
+
+        records = lambda table, keys: {tuple(row[:len(keys)]): dict(zip(table.columns, row))
+                                       for row in table.itertuples(index=False, name=None)}
+        self._standings_index = records(self.standings, ["season", "team"])
+        self._split_index = records(self.home_away, ["season", "team", "venue"])
+        self._h2h_index = records(self.head_to_head_table, ["team", "opponent"])
+        career = self._aggregate(self.team_matches, ["team"])
+        self._career_index = records(career, ["team"])
+        career_split = self._aggregate(self.team_matches, ["team", "venue"])
+        self._career_split_index = records(career_split, ["team", "venue"])
+        self._season_tables = {s: t.reset_index(drop=True) for s, t in self.standings.groupby("season", sort=False)}
+
+        # Row positions of each team's matches in the long table, in date order
+        team_codes = self.team_matches["team"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, team_codes[1:] != team_codes[:-1]])
+        ends = np.r_[starts[1:], len(team_codes)]
+        self._team_positions = {team_codes[s]: np.arange(s, e) for s, e in zip(starts, ends)}
+        self._team_tails = {}
+        self._update_tails(self.team_matches)
+
+    def _update_tails(self, team_matches: pd.DataFrame):
+        """
+        Each team's match number, cumulative points and last form-window
+        points, from which appended rows continue without reading the history.
+        """
+        numbers = team_matches["match_number"].to_numpy()
+        totals = team_matches["cumulative_points"].to_numpy()
+        points = team_matches["points"].to_numpy()
+        for team, positions in team_matches.groupby("team", sort=False).indices.items():
+            previous = self._team_tails.get(team, (0, 0, np.empty(0, dtype=points.dtype)))[2]
+            recent = np.concatenate([previous, points[positions]])[-self.form_window:]
+            self._team_tails[team] = (int(numbers[positions[-1]]), int(totals[positions[-1]]), recent)
+
+    # --- Incremental updates ---
+
+    def append(self, new_matches: pd.DataFrame) -> "FootballAnalytics":
+        """
+        Adds newly played matches. Only the seasons and teams that appear in the
+        new rows are touched: Elo continues from the current ratings, running
+        totals continue from each team's last row, and the aggregate tables are
+        updated by adding the aggregates of the new rows. Falls back to a full
+        rebuild if the new rows predate matches already loaded.
+        """
+        delta = normalize_matches(new_matches)
+        if delta.empty:
+            return self
+        if delta["date"].min() < self._last_date:
+            logging.info("Appended matches predate loaded history; rebuilding FootballAnalytics.")
+            combined = pd.concat([self.matches.drop(columns=["match_id"]), delta.drop(columns=["match_id"])],
+                                 ignore_index=True)
+            self._build(normalize_matches(combined))
+            return self
+
+        delta["match_id"] += self._match_count
+        delta_tm = self._build_team_matches(delta)
+        self._extend_form(delta_tm)
+        self._add_elo(delta, delta_tm, initial=self.final_elo)
+
+        offset = sum(len(chunk) for chunk in self._team_match_chunks)
+        self._match_chunks = self._match_chunks + [delta]
+        self._team_match_chunks = self._team_match_chunks + [delta_tm]
+        self._match_count, self._last_date = self._match_count + len(delta), delta["date"].max()
+        for team, positions in delta_tm.groupby("team", sort=False).indices.items():
+            previous = self._team_positions.get(team, np.empty(0, dtype=np.int64))
+            self._team_positions[team] = np.concatenate([previous, positions + offset])
+            self._teams.setdefault(str(team).lower(), team)
+        self._update_tails(delta_tm)
+
+        # One aggregate of the delta at the finest grain; the coarser tables are roll-ups of it
+        fine = self._aggregate(delta_tm, ["season", "team", "venue", "opponent"])
+        measures = list(fine.columns[4:])
+        roll_up = lambda keys: fine.groupby(keys, sort=False)[measures].sum().reset_index()
+        self._merge_records(self._split_index, roll_up(["season", "team", "venue"]), 3)
+        self._merge_records(self._h2h_index, roll_up(["team", "opponent"]), 2)
+        self._merge_records(self._career_index, roll_up(["team"]), 1)
+        self._merge_records(self._career_split_index, roll_up(["team", "venue"]), 2)
+        self._merge_records(self._standings_index, roll_up(["season", "team"]), 2)
+        for season, teams in delta_tm.groupby("season", sort=False)["team"]:
+            self._seasons.setdefault(_season_key(season), season)
+            table = self._season_tables.get(season)
+            self._rerank_season(season, set(teams) | (set(table["team"]) if table is not None else set()))
+
+        self._standings = self._home_away = self._head_to_head_table = None
+        logging.info(f"FootballAnalytics appended {len(delta)} matches "
+                     f"({delta_tm['season'].nunique()} season(s) updated).")
+        return self
+
+    def appended(self, new_matches: pd.DataFrame) -> "FootballAnalytics":
+        """
+        A new engine with the matches appended; this one is left unchanged, as
+        other sessions may hold it through the shared cache. Frames and index
+        records are shared: append adds chunks and replaces the records it
+        changes (copy-on-write), so only the dictionaries themselves are copied.
+        """
+        engine = copy.copy(self)
+        for name in ("_teams", "_seasons", "_team_positions", "_team_tails", "_season_tables", "_standings_index",
+                     "_split_index", "_h2h_index", "_career_index", "_career_split_index"):
+            setattr(engine, name, dict(getattr(self, name)))
+        return engine.append(new_matches)
+
+    def _extend_form(self, delta_tm: pd.DataFrame):
+        """Running per-team columns for new rows, continued from each team's last known row."""
+        grouped = delta_tm.groupby("team", sort=False)
+        tails = {team: self._team_tails[team] for team in grouped.indices if team in self._team_tails}
+        last_number = {t: number for t, (number, _, _) in tails.items()}
+        last_total = {t: total for t, (_, total, _) in tails.items()}
+        teams = delta_tm["team"]
+
+        delta_tm["match_number"] = grouped.cumcount() + 1 + teams.map(last_number).fillna(0).astype(int)
+        delta_tm["cumulative_points"] = grouped["points"].cumsum() + teams.map(last_total).fillna(0).astype(int)
+        # The rolling window may reach back into the previous rows of the team
+        form = np.empty(len(delta_tm), dtype=np.int64)
+        for team, positions in grouped.indices.items():
+            points = np.concatenate([tails[team][2] if team in tails else np.empty(0, dtype=np.int64),
+                                     delta_tm["points"].to_numpy()[positions]])
+            cumulative = np.cumsum(points)
+            shifted = np.concatenate([np.zeros(self.form_window, dtype=cumulative.dtype), cumulative])[:len(cumulative)]
+            form[positions] = (cumulative - shifted)[-len(positions):]
+        delta_tm[f"form_points_last_{self.form_window}"] = form
+
+        season_grouped = delta_tm.groupby(["season", "team"], sort=False)
+        keys = list(zip(delta_tm["season"], delta_tm["team"]))
+        base_points = [self._standings_index.get(k, {}).get("points", 0) for k in keys]
+        base_gd = [self._standings_index.get(k, {}).get("goal_difference", 0) for k in keys]
+        delta_tm["season_points"] = season_grouped["points"].cumsum() + np.array(base_points)
+        delta_tm["season_goal_difference"] = season_grouped["goal_difference"].cumsum() + np.array(base_gd)
+
+    @staticmethod
+    def _merge_records(index: Dict[tuple, Dict[str, Any]], delta_table: pd.DataFrame, n_keys: int):
+        # Records are replaced, never changed in place: an engine copied by appended() shares them
+        measures = list(delta_table.columns[n_keys:])
+        for row in delta_table.itertuples(index=False, name=None):
+            key, record = tuple(row[:n_keys]), dict(zip(delta_table.columns, row))
+            existing = index.get(key)
+            if existing is not None:
+                record = {**existing, **{m: existing[m] + record[m] for m in measures}}
+            index[key] = record
+
+    def _rerank_season(self, season: str, teams: set):
+        records = [self._standings_index[(season, team)] for team in teams]
+        table = pd.DataFrame(records).drop(columns=["position"], errors="ignore")
+        table = table.sort_values(["points", "goal_difference", "goals_for"], ascending=False, kind="mergesort")
+        table["position"] = np.arange(1, len(table) + 1)
+        table = table.reset_index(drop=True)
+        for row in table.itertuples(index=False):
+            key = (season, row.team)
+            self._standings_index[key] = {**self._standings_index[key], "position": int(row.position)}
+        self._season_tables[season] = table
+
+    # --- Lookups ---
+
+    @property
+    def teams(self) -> List[str]:
+        return sorted(self._teams.values())
+
+    @property
+    def seasons(self) -> List[str]:
+        return list(self._season_tables)
+
+    def resolve_team(self, name: str) -> Optional[str]:
+        return self._teams.get(str(name).strip().lower())
+
+    def resolve_season(self, season: Any) -> Optional[str]:
+        return self._seasons.get(_season_key(season))
+
+    def league_table(self, season: Any) -> Optional[pd.DataFrame]:
+        resolved = self.resolve_season(season)
+        return self._season_tables.get(resolved) if resolved else None
+
+    def team_record(self, team: str, season: Any = None, venue: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Played/won/drawn/lost/goals/points for a team, optionally by season and venue ('home'/'away')."""
+        team = self.resolve_team(team)
+        if team is None:
+            return None
+        if season is None:
+            return self._career_split_index.get((team, venue)) if venue else self._career_index.get((team,))
+        season = self.resolve_season(season)
+        if venue:
+            return self._split_index.get((season, team, venue))
+        return self._standings_index.get((season, team))
+
+    def form(self, team: str, last_n: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Results of a team's last N matches (default: the form window)."""
+        team = self.resolve_team(team)
+        if team is None:
+            return None
+        last_n = last_n or self.form_window
+        recent = self.team_matches.iloc[self._team_positions[team][-last_n:]]
+        return {
+            "team": team,
+            "form": "".join(recent["result"]),
+            "points": int(recent["points"].sum()),
+            "goals_for": float(recent["goals_for"].sum()),
+            "goals_against": float(recent["goals_against"].sum()),
+            "matches": recent[["date", "opponent", "venue", "goals_for", "goals_against", "result"]].to_dict("records"),
+        }
+
+    def head_to_head(self, team: str, opponent: str, season: Any = None) -> Optional[Dict[str, Any]]:
+        team, opponent = self.resolve_team(team), self.resolve_team(opponent)
+        if team is None or opponent is None:
+            return None
+        if season is None:
+            return self._h2h_index.get((team, opponent))
+        season = self.resolve_season(season)
+        rows = self.team_matches.iloc[self._team_positions[team]]
+        rows = rows[(rows["opponent"].to_numpy() == opponent) & (rows["season"].to_numpy() == season)]
+        if rows.empty:
+            return None
+        return self._aggregate(rows, ["team", "opponent"]).iloc[0].to_dict()
+
+    def elo_rating(self, team: str) -> Optional[float]:
+        team = self.resolve_team(team)
+        return float(self.final_elo[team]) if team is not None else None
+
+    def elo_series(self, team: str) -> Optional[pd.DataFrame]:
+        team = self.resolve_team(team)
+        if team is None:
+            return None
+        return self.team_matches.iloc[self._team_positions[team]][["date", "season", "opponent", "venue", "result", "elo_pre", "elo_post"]]
+
+    def team_mentions(self, text: str) -> List[Tuple[int, int, str]]:
+        """Every (start, end, team) span of free text that names a team, in order of appearance."""
+        text = text.lower()
+        hits = []
+        for lower, team in self._teams.items():
+            for match in re.finditer(r"(?<!\w)" + re.escape(lower) + r"(?!\w)", text):
+                hits.append((match.start(), match.end(), team))
+        return sorted(hits)
+
+    def find_teams(self, text: str) -> List[str]:
+        """Teams named in free text, in order of appearance."""
+        return list(dict.fromkeys(team for _, _, team in self.team_mentions(text)))
+
+    def season_mentions(self, text: str) -> List[Tuple[int, int, str]]:
+        """Every (start, end, season) span of free text that names a season ('2010/11', '2010-11', '2010/2011')."""
+        hits = []
+        for match in SEASON_MENTION_PATTERN.finditer(text):
+            season = self.resolve_season(match.group(1))
+            if season:
+                hits.append((match.start(), match.end(), season))
+        return hits
+
+    def find_seasons(self, text: str) -> List[str]:
+        """Seasons named in free text ('2010/11', '2010-11', '2010/2011')."""
+        return list(dict.fromkeys(season for _, _, season in self.season_mentions(text)))
+
+    def context_for_query(self, query: str) -> Dict[str, Any]:
+        """
+        Precomputed facts relevant to a question: records for the teams and
+        seasons it names, home/away splits, recent form and head-to-head.
+        """
+        query_lower = query.lower()
+        teams, seasons = self.find_teams(query), self.find_seasons(query)
+        venue = "home" if re.search(r"\bhome\b", query_lower) else "away" if re.search(r"\baway\b", query_lower) else None
+        context: Dict[str, Any] = {}
+        for team in teams:
+            facts: Dict[str, Any] = {}
+            for season in seasons or [None]:
+                label = season or "all seasons"
+                facts[label] = self.team_record(team, season, venue) if venue else self.team_record(team, season)
+            if re.search(r"\b(form|last|recent)\b", query_lower):
+                recent = self.form(team)
+                facts["recent_form"] = {k: recent[k] for k in ("form", "points", "goals_for", "goals_against")}
+            facts["elo_rating"] = round(self.elo_rating(team), 1)
+            context[team] = facts
+        if len(teams) >= 2:
+            context["head_to_head"] = self.head_to_head(teams[0], teams[1], seasons[0] if seasons else None)
+        if not teams and seasons:
+            table = self.league_table(seasons[0])
+            context[f"{seasons[0]} league table"] = table.drop(columns=["season"]).to_dict("records")
+        return context
+
+
+def get_football_analytics(df: Any) -> Optional[FootballAnalytics]:
+    """
+    Returns the precomputed FootballAnalytics for a match table, cached by
+    dataset fingerprint, or None if df is not a match table.
+    """
+    if not is_match_table(df):
+        return None
+    fingerprint = dataset_fingerprint(df)
+    with _lock:
+        engine = _engine_cache.get(fingerprint)
+        if engine is not None:
+            _engine_cache.move_to_end(fingerprint)
+            return engine
+    engine = FootballAnalytics(df)
+    with _lock:
+        _engine_cache[fingerprint] = engine
+        while len(_engine_cache) > MAX_CACHED_ENGINES:
+            _engine_cache.popitem(last=False)
+    return engine
+
+
+def register_football_analytics(fingerprint: str, engine: FootballAnalytics):
+    """Caches an engine built elsewhere (e.g. by FootballAnalytics.appended) under its dataset's fingerprint."""
+    with _lock:
+        _engine_cache[fingerprint] = engine
+        while len(_engine_cache) > MAX_CACHED_ENGINES:
+            _engine_cache.popitem(last=False)
@@ -0,0 +1,86 @@
+# utils/incremental.py
+
+import logging
+from typing import Any, Dict, Hashable, Optional
+
+import pandas as pd
+
+from utils.data_profiler import (
+    APPROX_ROW_THRESHOLD, DatasetProfile, StreamingStats, dataset_fingerprint, extend_fingerprint, register_profile,
+)
+from utils.football_engine import FootballAnalytics, get_football_analytics, register_football_analytics
+
+PARTITION_COLUMN_CANDIDATES = ["Season", "season"]
+
+
+class IncrementalAnalytics:
+    """
+    Keeps mergeable partial aggregates for a dataset, keyed by partition
+    (season by default), so that appending rows only updates the partitions
+    the new rows fall into. Derived results (the dataset profile and the
+    football tables) are refreshed at a cost proportional to the delta and the
+    number of partitions, not to the size of the history.
+    """
+
+    def __init__(self, data: pd.DataFrame, partition_column: Optional[str] = None):
+        self.partition_column = partition_column or next(
+            (c for c in PARTITION_COLUMN_CANDIDATES if c in data.columns), None)
+        self.data = data
+        self.fingerprint = dataset_fingerprint(data)
+        self.partitions: Dict[Hashable, StreamingStats] = {}
+        self._total: Optional[StreamingStats] = None
+        self._update_partitions(data)
+        self.football: Optional[FootballAnalytics] = get_football_analytics(data)
+
+    def append(self, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Appends rows and returns the combined DataFrame. The combined frame's
+        football analytics (and, above the approximate threshold, its profile)
+        are registered in the shared caches, so agents that receive it do not
+        recompute them from scratch.
+        """
+        if new_rows.empty:
+            return self.data
+        new_rows = new_rows[list(self.data.columns)]
+        combined = pd.concat([self.data, new_rows], ignore_index=True)
+        fingerprint = extend_fingerprint(self.fingerprint, new_rows, combined)
+
+        touched = self._update_partitions(new_rows)
+
+        if self.football is not None:
+            # A copy: the engine of the original data is shared with other sessions through the cache
+            self.football = self.football.appended(new_rows)
+            register_football_analytics(fingerprint, self.football)
+
+        self.data, self.fingerprint = combined, fingerprint
+        # Merged partials carry sketch-based estimates; smaller tables keep get_profile's exact statistics
+        if len(combined) > APPROX_ROW_THRESHOLD:
+            register_profile(self.profile())
+        logging.info(f"IncrementalAnalytics appended {len(new_rows)} rows; "
+                     f"{len(touched)} of {len(self.partitions)} partition(s) updated.")
+        return combined
+
+    def profile(self) -> DatasetProfile:
+        """Dataset profile merged from the partition aggregates."""
+        if self._total is None:
+            self._total = StreamingStats()
+            for stats in self.partitions.values():
+                self._total.merge(stats)
+        return self._total.to_profile(self.fingerprint)
+
+    def partition_profile(self, key: Any) -> Optional[DatasetProfile]:
+        stats = self.partitions.get(key)
+        return stats.to_profile(f"{self.fingerprint}:{key}") if stats is not None else None
+
+    def _update_partitions(self, rows: pd.DataFrame) -> list:
+        """Aggregates the rows once per partition and merges the result everywhere it is needed."""
+        if self.partition_column is None:
+            groups = {None: rows}
+        else:
+            groups = dict(tuple(rows.groupby(self.partition_column, sort=False, dropna=False)))
+        for key, part in groups.items():
+            delta = StreamingStats().update(part)
+            self.partitions.setdefault(key, StreamingStats()).merge(delta)
+            if self._total is not None:
+                self._total.merge(delta)
+        return list(groups)
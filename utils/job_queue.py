@@ -0,0 +1,307 @@
+# utils/job_queue.py
+
+import atexit
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import pandas as pd
+
+from utils.data_profiler import dataset_fingerprint
+from utils.tracing import span
+
+# Jobs run at once; the rest wait in the queue
+JOB_WORKERS = 4
+# Workers for jobs submitted with process=True (pure, picklable functions)
+JOB_PROCESSES = 2
+# Finished jobs (and so cached results) kept, least recently used dropped first
+MAX_FINISHED_JOBS = 64
+# How often a job waiting on a worker process checks whether it was cancelled (seconds)
+CANCEL_POLL_INTERVAL = 0.25
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job (by JobContext.progress) once it has been cancelled."""
+
+
+def input_fingerprint(*inputs: Any) -> str:
+    """
+    Digest of a job's inputs: DataFrames by their content fingerprint, plotly
+    figures by their JSON, lists element-wise and anything else as JSON.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for value in inputs:
+        if isinstance(value, pd.DataFrame):
+            part = dataset_fingerprint(value)
+        elif isinstance(value, (list, tuple)):
+            part = input_fingerprint(*value)
+        elif hasattr(value, "to_plotly_json"):
+            part = value.to_json()
+        else:
+            part = json.dumps(value, sort_keys=True, default=str)
+        digest.update(type(value).__name__.encode("utf-8"))
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    key: str
+    status: str = QUEUED
+    progress: float = 0.0
+    stage: str = "Queued"
+    result: Any = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.monotonic)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    future: Optional[Future] = field(default=None, repr=False)
+    callbacks: List[Callable[["Job"], None]] = field(default_factory=list, repr=False)
+    # Who is waiting for the result (e.g. session ids); the job is only cancelled once all of them leave
+    subscribers: Set[str] = field(default_factory=set, repr=False)
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+class JobContext:
+    """Handed to a running job: reports its progress and tells it when it was cancelled."""
+
+    def __init__(self, queue: "JobQueue", job: Job):
+        self._queue = queue
+        self._job = job
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job.cancel_requested
+
+    def progress(self, fraction: float, stage: Optional[str] = None):
+        """Records progress (0..1); raises JobCancelled if the job was cancelled, so long jobs stop here."""
+        if self._job.cancel_requested:
+            raise JobCancelled()
+        self._queue._update(self._job, progress=min(1.0, max(0.0, fraction)), stage=stage or self._job.stage)
+
+
+class JobQueue:
+    """
+    Local queue for long-running work (reports, document indexing, exports),
+    so it survives Streamlit reruns instead of running inline in the script.
+    Jobs are keyed by kind and input fingerprint: submitting the same work
+    again joins the job in flight, or returns the finished one and its cached
+    result. Callers poll jobs by id; the work reports progress through its
+    JobContext and is cancelled once every subscriber has cancelled it.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, processes: int = JOB_PROCESSES,
+                 max_finished: int = MAX_FINISHED_JOBS):
+        self.processes = processes
+        self.max_finished = max_finished
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    # --- Public API ---
+
+    def submit(self, kind: str, func: Callable, *args, fingerprint: Optional[str] = None, process: bool = False,
+               on_progress: Optional[Callable[[Job], None]] = None, subscriber: Optional[str] = None, **kwargs) -> Job:
+        """
+        Queues func(context, *args, **kwargs) and returns its Job, or the
+        identical job already queued, running or finished. The fingerprint
+        defaults to one of the arguments. With process=True, func(*args,
+        **kwargs) runs in a worker process instead (it must be picklable and
+        gets no context, so it reports no progress). `subscriber` (e.g. a
+        session id) is recorded, so its cancel() leaves others' work running.
+        """
+        if fingerprint is None:
+            fingerprint = input_fingerprint(*args, sorted(kwargs.items()))
+        key = f"{kind}:{fingerprint}"
+        subscriber = subscriber or uuid.uuid4().hex
+        with self._lock:
+            job = self._by_key.get(key)
+            # A job being cancelled is about to end as CANCELLED: start over rather than join it
+            if job is not None and job.status not in (FAILED, CANCELLED) and not job.cancel_requested:
+                self._jobs.move_to_end(job.id)
+                job.subscribers.add(subscriber)
+                if on_progress is not None:
+                    job.callbacks.append(on_progress)
+                return job
+            job = Job(id=uuid.uuid4().hex[:12], kind=kind, key=key, subscribers={subscriber})
+            if on_progress is not None:
+                job.callbacks.append(on_progress)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            job.future = self._threads.submit(self._run, job, func, args, kwargs, process)
+        logging.info(f"Job {job.id} ({kind}) queued.")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job, or None once it was forgotten (only finished jobs are)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs.move_to_end(job_id)
+            return job
+
+    def cancel(self, job_id: str, subscriber: Optional[str] = None) -> bool:
+        """
+        Withdraws a subscriber from a job (or, without one, everybody) and
+        cancels the job once nobody waits for it any more: a queued job never
+        starts; a running one stops at its next progress report, and its
+        result is discarded either way. Returns whether the job was cancelled.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            if subscriber is None:
+                job.subscribers.clear()
+            else:
+                job.subscribers.discard(subscriber)
+            if job.subscribers:
+                logging.info(f"Job {job.id} ({job.kind}) kept running for {len(job.subscribers)} other subscriber(s).")
+                return False
+            job.cancel_event.set()
+        if job.future.cancel():
+            self._finish(job, CANCELLED, stage="Cancelled")
+        else:
+            self._update(job, stage="Cancelling")
+        logging.info(f"Job {job.id} ({job.kind}) cancelled.")
+        return True
+
+    def jobs(self, kind: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if kind is None or job.kind == kind]
+
+    def close(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            if self._process_pool is not None:
+                self._discard_process_pool(self._process_pool)
+
+    # --- Internals ---
+
+    def _run(self, job: Job, func: Callable, args: tuple, kwargs: dict, process: bool):
+        if job.cancel_requested:
+            self._finish(job, CANCELLED, stage="Cancelled")
+            return
+        job.started = time.monotonic()
+        self._update(job, status=RUNNING, stage="Running")
+        try:
+            with span(f"job.{job.kind}", job_id=job.id, in_process=process):
+                if process:
+                    result = self._run_in_process(job, func, args, kwargs)
+                else:
+                    result = func(JobContext(self, job), *args, **kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED, stage="Cancelled")
+        except Exception as e:
+            logging.error(f"Job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+            self._finish(job, FAILED, stage="Failed", error=str(e))
+        else:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED, stage="Cancelled")
+            else:
+                self._finish(job, DONE, stage="Done", result=result, progress=1.0)
+                logging.info(f"Job {job.id} ({job.kind}) done in {job.elapsed:.1f}s.")
+
+    def _run_in_process(self, job: Job, func: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            try:
+                pool = self._worker_processes()
+                future = pool.submit(func, *args, **kwargs)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for running out of memory) since the last job
+                self._discard_process_pool(pool)
+                pool = self._worker_processes()
+                future = pool.submit(func, *args, **kwargs)
+        while True:
+            finished, _ = wait([future], timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if finished:
+                try:
+                    return future.result()
+                except BrokenProcessPool:
+                    with self._lock:
+                        self._discard_process_pool(pool)  # the next process job starts a new pool
+                    raise
+            if job.cancel_requested:
+                future.cancel()  # a process already running it finishes, and its result is dropped
+                raise JobCancelled()
+
+    def _worker_processes(self) -> ProcessPoolExecutor:
+        # Called with the lock held
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self._process_pool
+
+    def _discard_process_pool(self, pool: ProcessPoolExecutor):
+        # Called with the lock held; a pool already replaced is left alone
+        if pool is self._process_pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    def _update(self, job: Job, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            callbacks = list(job.callbacks)
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception as e:
+                logging.warning(f"Progress callback of job {job.id} failed: {e}")
+
+    def _finish(self, job: Job, status: str, **changes):
+        self._update(job, status=status, finished=time.monotonic(), **changes)
+        with self._lock:
+            finished = [j for j in self._jobs.values() if j.done]
+            # Least recently used first; jobs still queued or running are never dropped
+            for old in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[old.id]
+                if self._by_key.get(old.key) is old:
+                    del self._by_key[old.key]
+
+
+_shared_queue: Optional[JobQueue] = None
+_shared_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """The process-wide job queue, shared by all sessions so identical work is never run twice."""
+    global _shared_queue
+    with _shared_lock:
+        if _shared_queue is None:
+            _shared_queue = JobQueue()
+            atexit.register(_shared_queue.close)
+        return _shared_queue
@@ -0,0 +1,30 @@
+# utils/lazy.py
+
+import threading
+from typing import Any, Callable
+
+
+class lazy_property:
+    """
+    Like functools.cached_property: the value is built on first access and then
+    stored on the instance, so later accesses are plain attribute lookups. The
+    first build is done under a lock, so concurrent first accesses (e.g. two
+    sessions starting at once) still build the value only once.
+    """
+
+    def __init__(self, func: Callable[[Any], Any]):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+        self._lock = threading.RLock()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with self._lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.func(instance)
+        return instance.__dict__[self.name]
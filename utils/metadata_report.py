@@ -0,0 +1,238 @@
+# utils/metadata_report.py
+
+import atexit
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import pandas as pd
+
+from utils.data_profiler import dataset_fingerprint
+
+# Tables up to this many cells (rows x columns) are profiled in full; larger
+# ones on a row sample sized to fit it, so wide tables get fewer rows
+PROFILE_CELL_BUDGET = int(os.environ.get("PROFILE_CELL_BUDGET", 2_000_000))
+# ...but never fewer rows than this
+MIN_SAMPLE_ROWS = 5_000
+SAMPLE_SEED = 0
+# Rendered reports are kept on disk (shared by sessions, processes and restarts)
+# and the most recent ones in memory
+REPORT_CACHE_DIR = os.environ.get("PROFILE_REPORT_DIR", os.path.join(tempfile.gettempdir(), "metadata_reports"))
+MAX_CACHED_REPORTS = 8
+
+# Set in the worker process by _init_worker
+_progress_queue = None
+
+
+def sample_rows(data: pd.DataFrame, cell_budget: int = PROFILE_CELL_BUDGET) -> int:
+    """Rows to profile: all of them when the table fits the cell budget, else a budget-sized sample."""
+    budget_rows = max(MIN_SAMPLE_ROWS, cell_budget // max(1, data.shape[1]))
+    return min(len(data), budget_rows)
+
+
+def sample_for_profile(data: pd.DataFrame, cell_budget: int = PROFILE_CELL_BUDGET) -> pd.DataFrame:
+    """A reproducible uniform row sample (in the original row order) for profiling."""
+    rows = sample_rows(data, cell_budget)
+    if rows >= len(data):
+        return data
+    return data.sample(n=rows, random_state=SAMPLE_SEED).sort_index()
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _report_progress(key: str, fraction: float, stage: str):
+    if _progress_queue is not None:
+        _progress_queue.put((key, fraction, stage))
+
+
+def _build_report(key: str, sample: pd.DataFrame, title: str) -> str:
+    """Worker: profiles the sample and renders the report to HTML."""
+    from ydata_profiling import ProfileReport
+
+    _report_progress(key, 0.1, "Describing columns")
+    report = ProfileReport(sample, title=title, minimal=True, progress_bar=False)
+    report.get_description()
+    _report_progress(key, 0.7, "Rendering report")
+    html = report.to_html()
+    _report_progress(key, 1.0, "Done")
+    return html
+
+
+@dataclass
+class ReportJob:
+    key: str
+    total_rows: int
+    sampled_rows: int
+    future: Future
+    progress: float = 0.0
+    stage: str = "Queued"
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def sampled(self) -> bool:
+        return self.sampled_rows < self.total_rows
+
+
+class MetadataReports:
+    """
+    Builds ydata-profiling reports in a worker process, so a large table never
+    blocks the app. Tables above the cell budget are profiled on a row
+    sample. Rendered HTML is cached by dataset fingerprint and sample size in
+    memory and on disk; a report requested again while it is being built
+    joins the running job.
+    """
+
+    def __init__(self, cache_dir: str = REPORT_CACHE_DIR, cell_budget: int = PROFILE_CELL_BUDGET):
+        self.cache_dir = cache_dir
+        self.cell_budget = cell_budget
+        self._jobs: Dict[str, ReportJob] = {}
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+
+    # --- Public API ---
+
+    def key(self, data: pd.DataFrame) -> str:
+        return f"{dataset_fingerprint(data)}-{sample_rows(data, self.cell_budget)}"
+
+    def cached(self, data: pd.DataFrame) -> Optional[str]:
+        """The rendered report for the data, if one was built before (by any session)."""
+        key = self.key(data)
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                return html
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        self._remember(key, html)
+        return html
+
+    def job(self, data: pd.DataFrame) -> Optional[ReportJob]:
+        """The job building the data's report, if one was started and not yet collected."""
+        with self._lock:
+            return self._jobs.get(self.key(data))
+
+    def submit(self, data: pd.DataFrame, title: str = "Metadata Report") -> ReportJob:
+        """Starts building the report in the background (or returns the job already doing so)."""
+        key = self.key(data)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not (job.future.done() and job.future.exception() is not None):
+                return job
+            sample = sample_for_profile(data, self.cell_budget)
+            try:
+                future = self._worker_pool().submit(_build_report, key, sample, title)
+            except BrokenProcessPool:
+                # The worker died (e.g. killed for running out of memory) before we noticed
+                self._discard_pool(self._pool)
+                future = self._worker_pool().submit(_build_report, key, sample, title)
+            job = self._jobs[key] = ReportJob(key, total_rows=len(data), sampled_rows=len(sample), future=future)
+            pool = self._pool
+        future.add_done_callback(lambda f: self._collect(job, f, pool))
+        logging.info(f"Metadata report queued for {job.sampled_rows} of {job.total_rows} rows.")
+        return job
+
+    def close(self):
+        with self._lock:
+            self._discard_pool(self._pool)
+
+    # --- Internals ---
+
+    def _worker_pool(self) -> ProcessPoolExecutor:
+        # Called with the lock held
+        if self._pool is None:
+            self._progress_queue = multiprocessing.Queue()
+            self._pool = ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                             initargs=(self._progress_queue,))
+            threading.Thread(target=self._listen, args=(self._progress_queue,), daemon=True,
+                             name="report-progress").start()
+        return self._pool
+
+    def _discard_pool(self, pool: Optional[ProcessPoolExecutor]):
+        # Called with the lock held. The next submit starts a new worker (and progress channel).
+        if pool is None or pool is not self._pool:
+            return
+        pool.shutdown(wait=False, cancel_futures=True)
+        self._progress_queue.put(None)  # stops its listener
+        self._pool = self._progress_queue = None
+
+    def _listen(self, progress_queue):
+        """Copies progress messages from the worker onto the jobs."""
+        while True:
+            try:
+                message = progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            key, fraction, stage = message
+            with self._lock:
+                job = self._jobs.get(key)
+                if job is not None:
+                    job.progress, job.stage = fraction, stage
+
+    def _collect(self, job: ReportJob, future: Future, pool: ProcessPoolExecutor):
+        if future.cancelled() or future.exception() is not None:
+            error = "cancelled" if future.cancelled() else future.exception()
+            logging.error(f"Metadata report failed: {error}")
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._discard_pool(pool)
+            job.stage = "Failed"
+            return
+        html = future.result()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Written to a temporary file first, so readers never see a partial report
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp_path, self._path(job.key))
+        except OSError as e:
+            logging.warning(f"Could not cache the metadata report on disk: {e}")
+        self._remember(job.key, html)
+        with self._lock:
+            job.progress, job.stage = 1.0, "Done"
+            # The cache serves it from now on
+            self._jobs.pop(job.key, None)
+        logging.info(f"Metadata report built in {time.monotonic() - job.started:.1f}s.")
+
+    def _remember(self, key: str, html: str):
+        with self._lock:
+            self._cache[key] = html
+            self._cache.move_to_end(key)
+            while len(self._cache) > MAX_CACHED_REPORTS:
+                self._cache.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.html")
+
+
+_shared_reports: Optional[MetadataReports] = None
+_shared_lock = threading.Lock()
+
+
+def get_metadata_reports() -> MetadataReports:
+    """The process-wide report builder, whose worker process is started on first use."""
+    global _shared_reports
+    with _shared_lock:
+        if _shared_reports is None:
+            _shared_reports = MetadataReports()
+            atexit.register(_shared_reports.close)
+        return _shared_reports
@@ -0,0 +1,522 @@
+# utils/query_engine.py
+
+import re
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from utils.chart_reduction import as_temporal
+
+# Whitelisted operations. A plan may only use these, which keeps execution
+# sandboxed: nothing from the query (or the LLM) is ever passed to eval/query.
+ALLOWED_FILTER_OPS = {"==", "!=", ">", ">=", "<", "<=", "in", "contains", "between"}
+ALLOWED_AGGREGATIONS = {"sum", "mean", "median", "min", "max", "count", "nunique", "std", "size"}
+
+AGGREGATION_KEYWORDS = [
+    (r"\b(average|avg|mean)\b", "mean"),
+    (r"\b(total|sum)\b", "sum"),
+    (r"\bmedian\b", "median"),
+    (r"\b(how many|number of|count)\b", "count"),
+    (r"\b(distinct|unique)\b", "nunique"),
+    (r"\b(max|maximum|highest|most)\b", "max"),
+    (r"\b(min|minimum|lowest|least|fewest)\b", "min"),
+]
+SUMMARY_PATTERN = re.compile(r"\b(summari[sz]e|summary|overview|describe|preview|show (me )?the data)\b")
+TOP_K_PATTERN = re.compile(r"\b(top|bottom|first|last)\s+(\d+)\b")
+GROUP_BY_PATTERN = re.compile(r"\b(?:by|per|for each|each)\s+([a-z0-9_ /]+)")
+# "Chelsea at home": a value found in both a home and an away column is matched in the named side only
+VENUE_PATTERNS = [(re.compile(r"\b(at home|home)\b"), "home"), (re.compile(r"\b(away|on the road)\b"), "away")]
+# A noun phrase, up to the verb or preposition that ends it
+NOUN_PHRASE = r"([a-z]+(?:\s+(?!(?:did|do|does|was|were|is|are|has|have|had|in|at|for|by|on|of|per)\b)[a-z]+){0,2})"
+# "how many goals ...": the counted thing
+COUNT_NOUN_PATTERN = re.compile(r"\b(?:how many|number of)\s+" + NOUN_PHRASE)
+# "total goals by season", "the most yellow cards": the aggregated thing
+AGGREGATED_NOUN_PATTERN = re.compile(
+    r"\b(?:total|sum of|average|avg|mean|median|most|fewest|least|highest|lowest)\s+(?:number of\s+)?" + NOUN_PHRASE)
+# "top 3 seasons by goals": the ranking key
+RANK_KEY_PATTERN = re.compile(r"\bby\s+" + NOUN_PHRASE)
+ROW_WORDS = {"rows", "records", "entries", "matches", "games", "fixtures", "times"}
+# Match outcomes, read from a result column of H/D/A codes together with the venue
+RESULT_PATTERNS = [
+    (re.compile(r"\b(wins?|won|winning|victories)\b"), "win"),
+    (re.compile(r"\b(draws?|drew|drawn)\b"), "draw"),
+    (re.compile(r"\b(lose|loses|losing|loss|losses|lost|defeats?)\b"), "loss"),
+]
+RESULT_CODES = {"H", "D", "A"}
+OUTCOME_CODES = {("win", "home"): "H", ("win", "away"): "A", ("loss", "home"): "A", ("loss", "away"): "H"}
+# "last 5 games" is ordered by the date column these names mark
+DATE_NAME_WORDS = {"date", "datetime", "timestamp"}
+# The other side's measure ("goals conceded"), which a single venue column cannot answer
+OPPONENT_PATTERN = re.compile(r"\b(conced\w*|against|allowed)\b")
+NUMERIC_FILTER_PATTERN = re.compile(
+    r"(more than|greater than|over|above|at least|less than|fewer than|under|below|at most|>=|<=|>|<|=)\s*(-?\d+(?:\.\d+)?)"
+)
+NUMERIC_FILTER_OPS = {
+    "more than": ">", "greater than": ">", "over": ">", "above": ">", ">": ">",
+    "at least": ">=", ">=": ">=",
+    "less than": "<", "fewer than": "<", "under": "<", "below": "<", "<": "<",
+    "at most": "<=", "<=": "<=",
+    "=": "==",
+}
+
+
+def normalize_column_name(name: str) -> str:
+    """Splits snake_case and CamelCase column names into lower-case words."""
+    spaced = re.sub(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", " ", str(name))
+    return re.sub(r"[_\-\s]+", " ", spaced).strip().lower()
+
+
+@dataclass
+class QueryPlan:
+    """
+    A restricted, validated description of a DataFrame query.
+
+    Filters are ANDed together; a filter whose ``column`` is a list matches
+    when any of the listed columns satisfies it. An aggregation whose
+    ``column`` is a list aggregates the row-wise sum of those columns
+    (home plus away goals).
+    """
+    filters: List[Dict[str, Any]] = field(default_factory=list)
+    group_by: List[str] = field(default_factory=list)
+    aggregations: List[Dict[str, str]] = field(default_factory=list)
+    sort_by: Optional[str] = None
+    ascending: bool = False
+    limit: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class QueryEngine:
+    """
+    Turns natural language questions into QueryPlans and executes them as
+    vectorized pandas operations, returning only a small result table.
+    """
+
+    def __init__(self, max_result_rows: int = 50, preview_rows: int = 10, max_filter_cardinality: int = 1000):
+        self.max_result_rows = max_result_rows
+        self.preview_rows = preview_rows
+        self.max_filter_cardinality = max_filter_cardinality
+
+    # --- Planning ---
+
+    def parse(self, query: str, df: pd.DataFrame) -> Optional[QueryPlan]:
+        """
+        Rule-based planner. Returns None when the question cannot be mapped
+        onto the data, so callers can fall back to an LLM-generated plan.
+        """
+        query_lower = query.lower()
+        mentioned = self._match_columns(query_lower, df)
+        filters = self._match_value_filters(query_lower, df) + self._match_numeric_filters(query_lower, df, mentioned)
+        result_filter = self._match_result_filter(query_lower, df, filters)
+        if result_filter is False:
+            return None  # an outcome the plan's filters cannot express ("how many matches did Arsenal win")
+        if result_filter is not None:
+            filters.append(result_filter)
+
+        if not mentioned and not filters:
+            if SUMMARY_PATTERN.search(query_lower):
+                return QueryPlan(limit=self.preview_rows)
+            return None
+
+        group_by = self._match_group_by(query_lower, df)
+        filter_columns = {c for f in filters for c in (f["column"] if isinstance(f["column"], list) else [f["column"]])}
+        if any(c not in group_by and c not in filter_columns and not pd.api.types.is_numeric_dtype(df[c])
+               for c in mentioned):
+            # "top 5 HomeTeam by FullTimeHomeGoals": with a categorical column named, "by <measure>"
+            # is the ranking key, not a grouping
+            group_by = [c for c in group_by if not pd.api.types.is_numeric_dtype(df[c])]
+        targets: List[Any] = [c for c in mentioned
+                              if c not in group_by and c not in filter_columns and pd.api.types.is_numeric_dtype(df[c])]
+        top_k = TOP_K_PATTERN.search(query_lower)
+        named = COUNT_NOUN_PATTERN.search(query_lower) or AGGREGATED_NOUN_PATTERN.search(query_lower)
+        rank_key = RANK_KEY_PATTERN.search(query_lower)
+        noun = named.group(1) if named else rank_key.group(1) if rank_key else None
+        if not targets and noun and not self._counts_rows(noun):
+            # "how many goals did Chelsea score at home", "top 3 seasons by goals": the noun is a
+            # measure to sum, not the number of rows. None when no column (or pair of home and
+            # away columns) answers it; a "by" clause that is no measure is the grouping.
+            sided = any(isinstance(f["column"], list) for f in filters)
+            measure = self._match_measure(noun, self._venue(query_lower), query_lower, df, combine=not sided)
+            if measure:
+                targets = [measure]
+            elif named or measure is False:
+                return None
+        if not group_by and targets:
+            # "top 5 HomeTeam by goals": a named categorical column is the grouping key
+            group_by = [c for c in mentioned
+                        if c not in filter_columns and not pd.api.types.is_numeric_dtype(df[c])][:1]
+        if not self._narrow_to_measure_side(filters, targets):
+            return None
+
+        func = None
+        for pattern, agg in AGGREGATION_KEYWORDS:
+            if re.search(pattern, query_lower):
+                func = agg
+                break
+
+        plan = QueryPlan(filters=filters, group_by=group_by)
+        if top_k:
+            plan.limit = int(top_k.group(2))
+            plan.ascending = top_k.group(1) in ("bottom", "last")
+
+        ranking = func in ("max", "min")
+        if group_by or (func and not ranking):
+            if not targets:
+                plan.aggregations = [{"column": "*", "func": "size", "alias": "count"}]
+            else:
+                # "how many goals" and "most goals by team" both mean summing the measure
+                agg = "sum" if func in (None, "count", "max", "min") else func
+                plan.aggregations = [{"column": c, "func": agg, "alias": f"{agg}_{self._alias(c, noun)}"} for c in targets]
+            if group_by:
+                plan.sort_by = plan.aggregations[0]["alias"]
+                plan.ascending = func == "min" or (plan.ascending and not ranking)
+        elif targets and ranking:
+            if isinstance(targets[0], list):
+                return None  # rows are ranked by a column, not by a sum of columns
+            plan.sort_by = targets[0]
+            plan.ascending = func == "min"
+            plan.limit = plan.limit or self.preview_rows
+        elif top_k and top_k.group(1) in ("first", "last"):
+            # "last 5 Arsenal games": the latest rows by date, newest first
+            dates = self._date_columns(df)
+            if not dates:
+                return None
+            plan.sort_by, plan.ascending = dates[0], top_k.group(1) == "first"
+        elif ranking or (top_k and rank_key):
+            return None  # a ranking without anything to rank by
+        elif not filters:
+            plan.limit = plan.limit or self.preview_rows
+
+        return self.validate(plan, df)
+
+    def plan_from_dict(self, raw_plan: Dict[str, Any], df: pd.DataFrame) -> QueryPlan:
+        """Builds a QueryPlan from untrusted input (e.g. LLM JSON) and validates it."""
+        if not isinstance(raw_plan, dict):
+            raise ValueError("Query plan must be a JSON object.")
+        plan = QueryPlan(
+            filters=list(raw_plan.get("filters") or []),
+            group_by=list(raw_plan.get("group_by") or []),
+            aggregations=list(raw_plan.get("aggregations") or []),
+            sort_by=raw_plan.get("sort_by"),
+            ascending=bool(raw_plan.get("ascending", False)),
+            limit=raw_plan.get("limit"),
+        )
+        return self.validate(plan, df)
+
+    def validate(self, plan: QueryPlan, df: pd.DataFrame) -> QueryPlan:
+        """Checks every column and operation against the schema and the whitelists."""
+        columns = set(df.columns)
+
+        for f in plan.filters:
+            filter_cols = f.get("column")
+            filter_cols = filter_cols if isinstance(filter_cols, list) else [filter_cols]
+            missing = [c for c in filter_cols if c not in columns]
+            if missing:
+                raise ValueError(f"Unknown filter column(s): {missing}")
+            if f.get("op") not in ALLOWED_FILTER_OPS:
+                raise ValueError(f"Unsupported filter operation: {f.get('op')}")
+            if f["op"] == "between" and (not isinstance(f.get("value"), (list, tuple)) or len(f["value"]) != 2):
+                raise ValueError("'between' filters need a [low, high] value.")
+
+        for c in plan.group_by:
+            if c not in columns:
+                raise ValueError(f"Unknown group-by column: {c}")
+
+        aliases = set()
+        for agg in plan.aggregations:
+            if agg.get("func") not in ALLOWED_AGGREGATIONS:
+                raise ValueError(f"Unsupported aggregation: {agg.get('func')}")
+            agg_cols = agg.get("column") if isinstance(agg.get("column"), list) else [agg.get("column")]
+            if agg["func"] != "size" and (not agg_cols or any(c not in columns for c in agg_cols)):
+                raise ValueError(f"Unknown aggregation column: {agg.get('column')}")
+            agg.setdefault("alias", f"{agg['func']}_{self._alias(agg.get('column'), None)}")
+            aliases.add(agg["alias"])
+
+        if plan.sort_by is not None and plan.sort_by not in columns | aliases:
+            raise ValueError(f"Unknown sort column: {plan.sort_by}")
+
+        limit = plan.limit if plan.limit is not None else self.max_result_rows
+        plan.limit = max(1, min(int(limit), self.max_result_rows))
+        return plan
+
+    # --- Execution ---
+
+    def execute(self, plan: QueryPlan, df: pd.DataFrame) -> pd.DataFrame:
+        """Executes a validated plan with vectorized pandas/NumPy operations."""
+        mask = np.ones(len(df), dtype=bool)
+        for f in plan.filters:
+            filter_cols = f["column"] if isinstance(f["column"], list) else [f["column"]]
+            col_mask = np.zeros(len(df), dtype=bool)
+            for c in filter_cols:
+                col_mask |= self._filter_mask(df[c], f["op"], f.get("value"))
+            mask &= col_mask
+        result = df[mask] if not mask.all() else df
+
+        if plan.aggregations:
+            if plan.group_by:
+                keys = [result[c] for c in plan.group_by]
+                parts = {
+                    agg["alias"]: result.groupby(keys, observed=True, sort=False).size() if agg["func"] == "size"
+                    else self._aggregated_values(result, agg).groupby(keys, observed=True, sort=False).agg(agg["func"])
+                    for agg in plan.aggregations
+                }
+                result = pd.DataFrame(parts).reset_index()
+            else:
+                row = {
+                    agg["alias"]: len(result) if agg["func"] == "size" else self._aggregated_values(result, agg).agg(agg["func"])
+                    for agg in plan.aggregations
+                }
+                result = pd.DataFrame([row])
+
+        if plan.sort_by is not None:
+            if plan.limit and len(result) > plan.limit and pd.api.types.is_numeric_dtype(result[plan.sort_by]):
+                pick = result.nsmallest if plan.ascending else result.nlargest
+                result = pick(plan.limit, plan.sort_by)
+            elif plan.sort_by in self._date_columns(result):
+                # Text dates sort as dates ("9/1/2020" after "10/12/2019")
+                result = result.sort_values(plan.sort_by, ascending=plan.ascending,
+                                            key=lambda column: self._temporal_or_self(column))
+            else:
+                result = result.sort_values(plan.sort_by, ascending=plan.ascending)
+
+        return result.head(plan.limit or self.max_result_rows).reset_index(drop=True)
+
+    def run(self, query: str, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Parses and executes a query. Returns None if no rule-based plan applies."""
+        plan = self.parse(query, df)
+        if plan is None:
+            return None
+        logging.info(f"QueryEngine executing plan: {plan.to_dict()}")
+        return self.execute(plan, df)
+
+    def schema_description(self, df: pd.DataFrame) -> Dict[str, str]:
+        """Compact column -> dtype mapping used when asking the LLM for a plan."""
+        return {str(c): str(t) for c, t in df.dtypes.items()}
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _aggregated_values(df: pd.DataFrame, agg: Dict[str, Any]) -> pd.Series:
+        if isinstance(agg["column"], list):
+            return df[agg["column"]].sum(axis=1, min_count=1)
+        return df[agg["column"]]
+
+    @staticmethod
+    def _alias(column: Any, noun: Optional[str]) -> str:
+        if isinstance(column, list):
+            return re.sub(r"\W+", "_", noun or "_".join(map(str, column)))
+        return str(column)
+
+    @staticmethod
+    def _date_columns(df: pd.DataFrame) -> List[str]:
+        return [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c]) or
+                (not pd.api.types.is_numeric_dtype(df[c]) and
+                 normalize_column_name(c).split()[-1:] and normalize_column_name(c).split()[-1] in DATE_NAME_WORDS)]
+
+    @staticmethod
+    def _temporal_or_self(column: pd.Series) -> pd.Series:
+        parsed = as_temporal(column)
+        return parsed if parsed is not None else column
+
+    def _filter_mask(self, series: pd.Series, op: str, value: Any) -> np.ndarray:
+        if op == "==":
+            mask = series == value
+        elif op == "!=":
+            mask = series != value
+        elif op == ">":
+            mask = series > value
+        elif op == ">=":
+            mask = series >= value
+        elif op == "<":
+            mask = series < value
+        elif op == "<=":
+            mask = series <= value
+        elif op == "in":
+            mask = series.isin(value if isinstance(value, (list, tuple, set)) else [value])
+        elif op == "contains":
+            mask = series.astype(str).str.contains(str(value), case=False, regex=False)
+        else:  # between
+            mask = series.between(value[0], value[1])
+        return mask.fillna(False).to_numpy(dtype=bool)
+
+    def _match_columns(self, query_lower: str, df: pd.DataFrame) -> List[str]:
+        """Columns named in the query (raw or normalized), in order of appearance."""
+        hits = []
+        for c in df.columns:
+            for name in {str(c).lower(), normalize_column_name(c)}:
+                pos = query_lower.find(name)
+                if pos >= 0:
+                    hits.append((pos, -len(name), c))
+                    break
+        hits.sort()
+        matched, covered = [], []
+        for pos, neg_len, c in hits:
+            span = (pos, pos - neg_len)
+            # Skip a column whose match lies inside a longer, already matched one
+            if any(s <= span[0] and span[1] <= e for s, e in covered):
+                continue
+            covered.append(span)
+            matched.append(c)
+        return matched
+
+    def _match_value_filters(self, query_lower: str, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Equality filters for categorical values that appear verbatim in the query."""
+        value_columns: Dict[str, List[str]] = {}
+        value_raw: Dict[str, Any] = {}
+        for c in df.select_dtypes(include=["object", "category"]).columns:
+            uniques = df[c].dropna().unique()
+            if len(uniques) > self.max_filter_cardinality:
+                continue
+            for v in uniques:
+                v_lower = str(v).lower()
+                if len(v_lower) < 3:
+                    continue
+                if re.search(r"(?<![\w/])" + re.escape(v_lower) + r"(?![\w/])", query_lower):
+                    value_columns.setdefault(v_lower, []).append(c)
+                    value_raw[v_lower] = v
+
+        venue = self._venue(query_lower)
+        filters = []
+        for v_lower, cols in value_columns.items():
+            # Drop values that are only part of a longer matched value ("man" in "man city")
+            if any(v_lower != other and v_lower in other for other in value_columns):
+                continue
+            if venue and len(cols) > 1:
+                sided = [c for c in cols if venue in normalize_column_name(c).split()]
+                cols = sided if len(sided) == 1 else cols
+            filters.append({"column": cols if len(cols) > 1 else cols[0], "op": "==", "value": value_raw[v_lower]})
+        return filters
+
+    def _match_numeric_filters(self, query_lower: str, df: pd.DataFrame, mentioned: List[str]) -> List[Dict[str, Any]]:
+        """Comparison filters of the form '<column> more than 3'."""
+        filters = []
+        numeric_mentioned = [c for c in mentioned if pd.api.types.is_numeric_dtype(df[c])]
+        for match in NUMERIC_FILTER_PATTERN.finditer(query_lower):
+            prefix = query_lower[:match.start()]
+            # The filter applies to the closest numeric column named before it
+            best, best_pos = None, -1
+            for c in numeric_mentioned:
+                for name in (str(c).lower(), normalize_column_name(c)):
+                    pos = prefix.rfind(name)
+                    if pos > best_pos:
+                        best, best_pos = c, pos
+            if best is not None:
+                filters.append({"column": best, "op": NUMERIC_FILTER_OPS[match.group(1)], "value": float(match.group(2))})
+        return filters
+
+    def _match_result_filter(self, query_lower: str, df: pd.DataFrame, filters: List[Dict[str, Any]]):
+        """
+        A filter on the match result column for "win"/"draw"/"lose" (home wins
+        are "H", away defeats are "H" too). None if the query names no
+        outcome; False if it does but the plan cannot express it: no result
+        column, or a win or defeat without a side (a team's wins are H at home
+        and A away, which ANDed filters cannot say).
+        """
+        outcomes = {outcome for pattern, outcome in RESULT_PATTERNS if pattern.search(query_lower)}
+        if not outcomes:
+            return None
+        columns = [c for c in df.select_dtypes(include=["object", "category"]).columns
+                   if "result" in normalize_column_name(c).split() and set(df[c].dropna().unique()) <= RESULT_CODES]
+        # FullTimeResult unless the question is about the half-time score
+        columns = [c for c in columns if ("half" in normalize_column_name(c)) == ("half" in query_lower)] or columns
+        if len(outcomes) > 1 or len(columns) != 1:
+            return False
+        outcome = outcomes.pop()
+        if outcome == "draw":
+            return {"column": columns[0], "op": "==", "value": "D"}
+        if any(isinstance(f["column"], list) for f in filters):
+            return False
+        venue = self._venue(query_lower)
+        return {"column": columns[0], "op": "==", "value": OUTCOME_CODES[(outcome, venue)]} if venue else False
+
+    @staticmethod
+    def _counts_rows(noun: str) -> bool:
+        """Whether a counted noun stands for rows ("matches", "home wins") rather than a measure."""
+        return bool(set(noun.split()) & ROW_WORDS) or any(pattern.search(noun) for pattern, _ in RESULT_PATTERNS)
+
+    @staticmethod
+    def _narrow_to_measure_side(filters: List[Dict[str, Any]], targets: List[Any]) -> bool:
+        """
+        "Total HomeCorners for Arsenal": a value matched in both the home and
+        the away column is narrowed to the side the measure belongs to, since
+        the other side's rows hold the opponent's numbers. False when the
+        measures belong to different sides, which one filter cannot serve.
+        """
+        if not any(isinstance(f["column"], list) for f in filters):
+            return True
+        sides = set()
+        for target in targets:
+            for c in (target if isinstance(target, list) else [target]):
+                sides |= {"home", "away"} & set(normalize_column_name(c).split())
+        if len(sides) > 1:
+            return False
+        if not sides:
+            return True
+        side = sides.pop()
+        for f in filters:
+            if isinstance(f["column"], list):
+                sided = [c for c in f["column"] if side in normalize_column_name(c).split()]
+                if len(sided) == 1:
+                    f["column"] = sided[0]
+        return True
+
+    @staticmethod
+    def _venue(query_lower: str) -> Optional[str]:
+        return next((side for pattern, side in VENUE_PATTERNS if pattern.search(query_lower)), None)
+
+    def _match_measure(self, noun: str, venue: Optional[str], query_lower: str, df: pd.DataFrame, combine: bool = False):
+        """
+        The numeric column a counted noun stands for ("goals" at home ->
+        FullTimeHomeGoals). With `combine`, a noun that matches a home and an
+        away column equally ("goals") stands for both, as a list to be summed.
+        None if the noun is not a measure; False if it is one but no single
+        column answers it (e.g. home and away goals tie without a venue).
+        """
+        from utils.column_index import get_column_index  # column_index imports this module
+
+        numeric = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        index = get_column_index(df.columns)
+        if not index.resolve(noun, numeric):
+            return None
+        if OPPONENT_PATTERN.search(query_lower):
+            return False
+        phrase = f"{venue} {noun}" if venue else noun
+        matches = index.resolve(phrase, numeric)
+        if not matches:
+            return False
+        tied = [m.column for m in matches if m.score >= matches[0].score]
+        if len(tied) == 1:
+            return index.best(phrase, numeric)
+        words = [normalize_column_name(c).split() for c in tied]
+        sides = [{"home", "away"} & set(w) for w in words]
+        unsided = [[t for t in w if t not in ("home", "away")] for w in words]
+        if combine and len(tied) == 2 and unsided[0] == unsided[1] and sides[0] | sides[1] == {"home", "away"}:
+            originals = {str(c): c for c in numeric}
+            return [originals[c] for c in tied]
+        return False
+
+    def _match_group_by(self, query_lower: str, df: pd.DataFrame) -> List[str]:
+        group_by = []
+        for match in GROUP_BY_PATTERN.finditer(query_lower):
+            tail = match.group(1)
+            for c in self._match_columns(tail, df):
+                if tail.find(normalize_column_name(c)) == 0 or tail.find(str(c).lower()) == 0:
+                    if c not in group_by:
+                        group_by.append(c)
+                    break
+        return group_by
+
+
+def result_to_markdown(result: Union[pd.DataFrame, str], max_rows: int = 50) -> str:
+    """Renders a (small) query result for the LLM prompt."""
+    if isinstance(result, str):
+        return result
+    table = result.head(max_rows)
+    try:
+        return table.to_markdown(index=False) or ""
+    except ImportError:
+        return table.to_string(index=False)
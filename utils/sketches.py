@@ -0,0 +1,287 @@
+# utils/sketches.py
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _hash_values(values) -> np.ndarray:
+    """64-bit hashes of arbitrary values (vectorized, stable across chunks)."""
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    return pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Exact bit length of uint64 values (float64 alone would round above 2**53)."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch. Uses 2**precision registers (16 KB at the default
+    precision of 14) with a relative standard error of 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18.")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values) -> "HyperLogLog":
+        hashes = _hash_values(values)
+        if not len(hashes):
+            return self
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return self.m * math.log(self.m / zeros)
+        return float(raw)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+
+class SpaceSaving:
+    """
+    Heavy-hitter sketch keeping at most `capacity` counters. Each reported
+    count over-estimates the true count by at most its `error`, and any value
+    more frequent than total / capacity is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+        self.errors: Dict[Any, int] = {}
+        self.total = 0
+
+    def update(self, values) -> "SpaceSaving":
+        series = values if isinstance(values, pd.Series) else pd.Series(values)
+        return self.update_counts(series.value_counts(dropna=True))
+
+    def update_counts(self, chunk_counts: pd.Series) -> "SpaceSaving":
+        """Adds pre-aggregated counts (a value_counts() result, sorted descending)."""
+        other = SpaceSaving(self.capacity)
+        # Counts within a chunk are exact; values dropped from the chunk summary
+        # are bounded by its smallest kept count (see _floor)
+        other.counts = {k: int(v) for k, v in chunk_counts.head(self.capacity).items()}
+        other.errors = dict.fromkeys(other.counts, 0)
+        other.total = int(chunk_counts.sum())
+        return self.merge(other)
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        own_floor = self._floor()
+        other_floor = other._floor()
+        merged_counts, merged_errors = {}, {}
+        for value in set(self.counts) | set(other.counts):
+            merged_counts[value] = self.counts.get(value, own_floor) + other.counts.get(value, other_floor)
+            merged_errors[value] = (self.errors.get(value, own_floor) + other.errors.get(value, other_floor))
+        keep = sorted(merged_counts, key=merged_counts.get, reverse=True)[:self.capacity]
+        self.counts = {v: merged_counts[v] for v in keep}
+        self.errors = {v: merged_errors[v] for v in keep}
+        self.total += other.total
+        return self
+
+    def top(self, k: int = 10) -> List[Tuple[Any, int, int]]:
+        """Returns up to k (value, estimated count, max over-count) tuples."""
+        ranked = sorted(self.counts, key=self.counts.get, reverse=True)[:k]
+        return [(v, self.counts[v], self.errors[v]) for v in ranked]
+
+    @property
+    def error_bound(self) -> float:
+        return self.total / self.capacity if self.capacity else float("inf")
+
+    def _floor(self) -> int:
+        # A full summary may have under-counted any untracked value by its minimum counter
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest with the k1 scale function).
+    Memory is bounded by roughly `compression` centroids regardless of input size.
+    """
+
+    def __init__(self, compression: float = 200):
+        self.compression = compression
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values, weights=None) -> "TDigest":
+        """Adds values, optionally with integer weights (e.g. from value_counts())."""
+        values = np.asarray(values, dtype=np.float64)
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+        valid = ~np.isnan(values)
+        values, weights = values[valid], weights[valid]
+        if not len(values):
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self._compress(np.concatenate([self.means, values]),
+                              np.concatenate([self.weights, weights]))
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        if not len(other.means):
+            return self
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self._compress(np.concatenate([self.means, other.means]),
+                              np.concatenate([self.weights, other.weights]))
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not len(self.means):
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        cumulative = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], cumulative, [self.count]])
+        points = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q * self.count, positions, points))
+
+    def rank_error(self, q: float) -> float:
+        """Upper bound on the rank error at q: half the weight of the centroid covering it."""
+        if not len(self.means):
+            return 0.0
+        cumulative = np.cumsum(self.weights)
+        i = min(int(np.searchsorted(cumulative, q * self.count)), len(self.weights) - 1)
+        return float(self.weights[i] / 2 / self.count)
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> "TDigest":
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Bucket points by the integer part of the k1 scale at their left edge;
+        # every bucket spans at most one unit of k, which bounds centroid size.
+        q_left = (np.cumsum(weights) - weights) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * np.clip(q_left, 0, 1) - 1)
+        bucket = np.floor(k).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        new_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / new_weights
+        self.weights = new_weights
+        return self
+
+
+class ReservoirSample:
+    """Uniform fixed-size sample of rows from a stream (Algorithm R, vectorized per chunk)."""
+
+    def __init__(self, size: int = 1000, seed: Optional[int] = 0):
+        self.size = size
+        self.seen = 0
+        self.sample: Optional[pd.DataFrame] = None
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame) -> "ReservoirSample":
+        n = len(chunk)
+        if not n:
+            return self
+        positions = np.arange(self.seen, self.seen + n)
+        slots = np.where(positions < self.size, positions, self._rng.integers(0, positions + 1))
+        accepted = slots < self.size
+        # If several rows land in the same slot, the later one wins
+        slot_rows = pd.Series(np.flatnonzero(accepted), index=slots[accepted])
+        slot_rows = slot_rows[~slot_rows.index.duplicated(keep="last")]
+
+        incoming = chunk.iloc[slot_rows.to_numpy()]
+        if self.sample is None:
+            self.sample = incoming
+        else:
+            replaced = slot_rows.index.to_numpy()
+            keep = np.ones(len(self.sample), dtype=bool)
+            keep[replaced[replaced < len(self.sample)]] = False
+            self.sample = pd.concat([self.sample[keep], incoming])
+        self.seen += n
+        return self
+
+    def merge(self, other: "ReservoirSample") -> "ReservoirSample":
+        """Combines two samples of disjoint streams, weighting each by the rows it has seen."""
+        if other.sample is None:
+            return self
+        if self.sample is None:
+            self.sample, self.seen = other.sample, other.seen
+            return self
+        total = self.seen + other.seen
+        take = min(self.size, len(self.sample) + len(other.sample))
+        from_self = int(self._rng.hypergeometric(self.seen, other.seen, take))
+        from_self = min(max(from_self, take - len(other.sample)), len(self.sample))
+        own = self.sample.iloc[self._rng.choice(len(self.sample), from_self, replace=False)]
+        theirs = other.sample.iloc[self._rng.choice(len(other.sample), take - from_self, replace=False)]
+        self.sample = pd.concat([own, theirs])
+        self.seen = total
+        return self
+
+
+class RunningMoments:
+    """
+    Exact count, mean, variance, min and max that can be updated chunk by chunk
+    and merged (Chan et al. parallel variance), without keeping the values.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values) -> "RunningMoments":
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        other = RunningMoments()
+        other.n = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min, other.max = float(values.min()), float(values.max())
+        return self.merge(other)
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    @property
+    def sum(self) -> float:
+        return self.mean * self.n
+
+    @property
+    def std(self) -> Optional[float]:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else None
@@ -0,0 +1,233 @@
+# utils/tracing.py
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Spans are appended here (one OTLP-style JSON object per line) when set
+TRACE_EXPORT_ENV = "TRACE_EXPORT_PATH"
+# Finished traces kept in memory for the debug panel
+MAX_TRACES = 50
+# Latest durations kept per span name for the rolling percentiles
+STATS_WINDOW = 1000
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int  # wall clock, for export and the waterfall
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    end_ns: Optional[int] = None
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0  # CPU time of the thread that ran the span
+    status: str = "ok"
+
+    def set(self, **attributes):
+        """Adds attributes (rows, bytes, tokens...) to the span."""
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON field naming, so collectors and viewers can import the file."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)}
+                           for k, v in {**self.attributes, "cpu_ms": round(self.cpu_ms, 3)}.items()],
+            "status": {"code": 1 if self.status == "ok" else 2},
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, (bool, np.bool_)):
+        return {"boolValue": bool(value)}
+    if isinstance(value, (int, np.integer)):
+        return {"intValue": str(int(value))}
+    if isinstance(value, (float, np.floating)):
+        return {"doubleValue": float(value)}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """
+    Lightweight in-process tracer. Spans nest through a context variable, so a
+    span opened inside another becomes its child - across threads too when the
+    work is submitted with bind(). Each span records wall time, the CPU time of
+    its thread and free-form attributes (rows, bytes, tokens). Finished traces
+    are kept in memory for the debug panel, durations feed rolling
+    percentiles per span name, and spans are optionally exported as JSONL.
+    """
+
+    def __init__(self, export_path: Optional[str] = None, max_traces: int = MAX_TRACES, window: int = STATS_WINDOW):
+        self.export_path = export_path
+        self.max_traces = max_traces
+        self.window = window
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._durations: Dict[str, deque] = {}
+        self._unexported: List[Span] = []
+        self._lock = threading.Lock()
+
+    # --- Recording ---
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Times the enclosed block as a span, a child of the current span if there is one."""
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+        )
+        span.set(**attributes)
+        token = _current_span.set(span)
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.wall_ms = (time.perf_counter() - wall_start) * 1000
+            span.cpu_ms = (time.thread_time() - cpu_start) * 1000
+            span.end_ns = span.start_ns + int(span.wall_ms * 1e6)
+            _current_span.reset(token)
+            self._finish(span, is_root=parent is None)
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """Decorator: runs every call of the function in a span (named after the function by default)."""
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def bind(func: Callable) -> Callable:
+        """func bound to the current context, so spans it opens on a worker thread nest under the current span."""
+        context = contextvars.copy_context()
+        return functools.partial(context.run, func)
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current_span.get()
+
+    def _finish(self, span: Span, is_root: bool):
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            spans.append(span)
+            self._durations.setdefault(span.name, deque(maxlen=self.window)).append(span.wall_ms)
+            if self.export_path:
+                self._unexported.append(span)
+                # Written once per request, when its root span ends, rather than per span
+                if is_root:
+                    self._export()
+
+    def _export(self):
+        spans, self._unexported = self._unexported, []
+        try:
+            directory = os.path.dirname(self.export_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.export_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(s.to_otlp()) + "\n" for s in spans)
+        except OSError as e:
+            logging.warning(f"Could not export {len(spans)} span(s) to {self.export_path}: {e}")
+
+    # --- Reporting ---
+
+    def traces(self) -> List[Dict[str, Any]]:
+        """Recent traces, newest first: trace id, root span name, start and duration."""
+        with self._lock:
+            traces = [(trace_id, list(spans)) for trace_id, spans in self._traces.items()]
+        rows = []
+        for trace_id, spans in reversed(traces):
+            root = next((s for s in spans if s.parent_id is None), None)
+            if root is not None:
+                rows.append({"trace_id": trace_id, "name": root.name, "start_ns": root.start_ns,
+                             "wall_ms": root.wall_ms, "spans": len(spans)})
+        return rows
+
+    def waterfall(self, trace_id: str) -> pd.DataFrame:
+        """
+        The spans of one trace in start order, with their offset from the start
+        of the trace and nesting depth: the data of a waterfall chart.
+        """
+        with self._lock:
+            spans = list(self._traces.get(trace_id, []))
+        columns = ["name", "depth", "offset_ms", "wall_ms", "cpu_ms", "status", "attributes"]
+        if not spans:
+            return pd.DataFrame(columns=columns)
+        by_id = {s.span_id: s for s in spans}
+
+        def depth(span: Span) -> int:
+            level = 0
+            while span.parent_id in by_id:
+                span, level = by_id[span.parent_id], level + 1
+            return level
+
+        start = min(s.start_ns for s in spans)
+        rows = [{
+            "name": s.name,
+            "depth": depth(s),
+            "offset_ms": (s.start_ns - start) / 1e6,
+            "wall_ms": s.wall_ms,
+            "cpu_ms": s.cpu_ms,
+            "status": s.status,
+            "attributes": s.attributes,
+        } for s in sorted(spans, key=lambda s: s.start_ns)]
+        return pd.DataFrame(rows, columns=columns)
+
+    def latency_summary(self) -> pd.DataFrame:
+        """Rolling p50/p95/p99 wall time (ms) per span name, over the latest `window` spans of each."""
+        with self._lock:
+            durations = {name: np.array(values) for name, values in self._durations.items()}
+        rows = [{
+            "span": name,
+            "count": len(values),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "p99_ms": float(np.percentile(values, 99)),
+        } for name, values in sorted(durations.items()) if len(values)]
+        return pd.DataFrame(rows, columns=["span", "count", "p50_ms", "p95_ms", "p99_ms"])
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+            self._durations.clear()
+
+
+# The process-wide tracer used by the agents and utilities
+tracer = Tracer(export_path=os.environ.get(TRACE_EXPORT_ENV))
+span = tracer.span
+traced = tracer.traced
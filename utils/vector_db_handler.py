@@ -1,8 +1,10 @@
 # utils/vector_db_handler.py (Definitive Fix)
 
 import os
-import uuid
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from typing import List, Optional
 from pydantic import SecretStr
 
@@ -11,11 +13,19 @@ from langchain_community.vectorstores import Chroma
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
+from utils.tracing import span
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Open collections kept in memory; older ones are reopened from disk on demand
+MAX_OPEN_COLLECTIONS = 32
+
 class VectorDBHandler:
     """
-    Handles all interactions with the Chroma vector database.
+    Handles all interactions with the Chroma vector database. One handler is
+    shared by all sessions: each document gets its own collection, named after
+    a digest of its text, and queries name the collection they search, so
+    sessions never see or replace each other's documents.
     """
     def __init__(self, api_key: str):
         self.embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=SecretStr(api_key))
@@ -27,33 +37,67 @@ class VectorDBHandler:
         os.makedirs(self.db_dir, exist_ok=True)
         # --- END OF FIX ---
         
-        self.vectorstore: Optional[Chroma] = None
+        self._stores: "OrderedDict[str, Chroma]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def collection_name(text_content: str, collection_prefix: str) -> str:
+        """The collection a text is stored in (the same text always maps to the same collection)."""
+        return f"{collection_prefix}_{hashlib.blake2b(text_content.encode('utf-8'), digest_size=16).hexdigest()}"
 
-    def process_text(self, text_content: str, collection_prefix: str) -> None:
-        """Processes text and stores it in a new Chroma collection."""
-        collection_name = f"{collection_prefix}_{uuid.uuid5(uuid.NAMESPACE_DNS, text_content[:100]).hex}"
+    def process_text(self, text_content: str, collection_prefix: str) -> Optional[str]:
+        """Processes text and stores it in its Chroma collection; returns the collection name (None on failure)."""
+        collection_name = self.collection_name(text_content, collection_prefix)
+        with self._lock:
+            if collection_name in self._stores:
+                return collection_name
         documents = [Document(page_content=chunk) for chunk in self.text_splitter.split_text(text_content)]
         
         try:
-            self.vectorstore = Chroma.from_documents(
-                documents=documents,
-                embedding=self.embeddings,
-                persist_directory=self.db_dir, # Use the correct /tmp path here
-                collection_name=collection_name
-            )
-            self.vectorstore.persist()
+            # Embedding happens inside from_documents, so this span is dominated by the embedding calls
+            with span("vectordb.index", chunks=len(documents), bytes=len(text_content.encode("utf-8"))):
+                vectorstore = Chroma.from_documents(
+                    documents=documents,
+                    embedding=self.embeddings,
+                    persist_directory=self.db_dir, # Use the correct /tmp path here
+                    collection_name=collection_name
+                )
+                vectorstore.persist()
+            self._remember(collection_name, vectorstore)
             logging.info(f"Text processed into Chroma collection: {collection_name} at {self.db_dir}")
+            return collection_name
         except Exception as e:
             logging.error(f"Error processing text for RAG: {e}", exc_info=True)
-            self.vectorstore = None
+            return None
+
+    def _remember(self, collection_name: str, vectorstore: Chroma):
+        with self._lock:
+            self._stores[collection_name] = vectorstore
+            self._stores.move_to_end(collection_name)
+            while len(self._stores) > MAX_OPEN_COLLECTIONS:
+                self._stores.popitem(last=False)
+
+    def _store(self, collection_name: str) -> Chroma:
+        with self._lock:
+            vectorstore = self._stores.get(collection_name)
+            if vectorstore is not None:
+                self._stores.move_to_end(collection_name)
+                return vectorstore
+        # Evicted from memory but still persisted on disk
+        vectorstore = Chroma(collection_name=collection_name, embedding_function=self.embeddings,
+                             persist_directory=self.db_dir)
+        self._remember(collection_name, vectorstore)
+        return vectorstore
 
-    def get_context(self, query: str) -> List[str]:
-        """Retrieves context chunks from the active vector store."""
-        if not self.vectorstore:
+    def get_context(self, query: str, collection_name: Optional[str]) -> List[str]:
+        """Retrieves context chunks from a document's collection."""
+        if not collection_name:
             return []
         try:
-            retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
-            retrieved_docs = retriever.invoke(query)
+            with span("vectordb.retrieve") as retrieve:
+                retriever = self._store(collection_name).as_retriever(search_kwargs={"k": 3})
+                retrieved_docs = retriever.invoke(query)
+                retrieve.set(chunks=len(retrieved_docs))
             return [doc.page_content for doc in retrieved_docs]
         except Exception as e:
             logging.error(f"Error retrieving RAG context: {e}", exc_info=True)